@@ -1,22 +1,24 @@
 from logging.config import fileConfig
-
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool
+import os
 
 from alembic import context
 
 # Import our models and database
 from database import Base
 import models  # noqa: F401  # Import models for Base registration
+from sqlalchemy import engine_from_config, pool
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
 # Override sqlalchemy.url with environment variable if present
-import os
-if os.getenv("DATABASE_POSTGRES_URL"):
-    config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_POSTGRES_URL"))
+database_url = os.getenv("DATABASE_POSTGRES_URL")
+if database_url:
+    # Handle Render's postgres URL format, as start.py does
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+    config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -0,0 +1,44 @@
+"""add_expense_keyset_indexes
+
+Revision ID: 3b8f2a9c41d7
+Revises: c0f59c807e22
+Create Date: 2026-10-17 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8f2a9c41d7'
+down_revision: Union[str, None] = 'c0f59c807e22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add (date, id) indexes used by cursor pagination on expenses."""
+    inspector = sa.inspect(op.get_bind())
+    existing_indexes = [
+        idx['name'] for idx in inspector.get_indexes('expenses')
+    ]
+
+    if 'ix_expenses_transaction_date_id' not in existing_indexes:
+        op.create_index(
+            'ix_expenses_transaction_date_id',
+            'expenses',
+            ['transaction_date', 'id'],
+        )
+
+    if 'ix_expenses_billing_date_id' not in existing_indexes:
+        op.create_index(
+            'ix_expenses_billing_date_id', 'expenses', ['billing_date', 'id']
+        )
+
+
+def downgrade() -> None:
+    """Drop the cursor pagination indexes."""
+    op.drop_index('ix_expenses_billing_date_id', table_name='expenses')
+    op.drop_index('ix_expenses_transaction_date_id', table_name='expenses')
@@ -0,0 +1,43 @@
+"""add_card_billing_configs
+
+Revision ID: 5c8e2d47a1f6
+Revises: e62b7f0d9a13
+Create Date: 2026-10-17 15:08:37.529140
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e2d47a1f6'
+down_revision: Union[str, None] = 'e62b7f0d9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create card_billing_configs (per-card credit card billing cycles)."""
+    inspector = sa.inspect(op.get_bind())
+    if 'card_billing_configs' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'card_billing_configs',
+        sa.Column('card_last_four', sa.String(length=4), primary_key=True),
+        sa.Column('credit_card_billing_day', sa.Integer(), nullable=False),
+        sa.Column('timezone', sa.String(length=64), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+        ),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Drop card_billing_configs; every card falls back to the default day."""
+    op.drop_table('card_billing_configs')
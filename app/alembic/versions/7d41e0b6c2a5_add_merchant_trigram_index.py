@@ -0,0 +1,42 @@
+"""add_merchant_trigram_index
+
+Revision ID: 7d41e0b6c2a5
+Revises: 3b8f2a9c41d7
+Create Date: 2026-10-17 10:03:18.774120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d41e0b6c2a5'
+down_revision: Union[str, None] = '3b8f2a9c41d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm and add a GIN trigram index on expenses.merchant."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    inspector = sa.inspect(op.get_bind())
+    existing_indexes = [
+        idx['name'] for idx in inspector.get_indexes('expenses')
+    ]
+
+    if 'ix_expenses_merchant_trgm' not in existing_indexes:
+        op.create_index(
+            'ix_expenses_merchant_trgm',
+            'expenses',
+            ['merchant'],
+            postgresql_using='gin',
+            postgresql_ops={'merchant': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Drop the trigram index (the extension is left installed)."""
+    op.drop_index('ix_expenses_merchant_trgm', table_name='expenses')
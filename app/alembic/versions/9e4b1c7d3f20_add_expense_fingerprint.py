@@ -0,0 +1,120 @@
+"""add_expense_fingerprint
+
+Revision ID: 9e4b1c7d3f20
+Revises: 5c8e2d47a1f6
+Create Date: 2026-10-17 15:52:10.218644
+
+"""
+from datetime import timezone
+from typing import Sequence, Union
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b1c7d3f20'
+down_revision: Union[str, None] = '5c8e2d47a1f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 5000
+
+
+def fingerprint(
+    source_email, raw_hash, amount, transaction_date, merchant, card_last_four
+) -> str:
+    # Same key as raw_payloads.webhook_fingerprint at the time of writing;
+    # rows have a raw payload or a source email (see the query below)
+    if raw_hash:
+        parts = (source_email or '', raw_hash, f'{float(amount):.2f}')
+    else:
+        if transaction_date.tzinfo is not None:
+            transaction_date = transaction_date.astimezone(timezone.utc).replace(
+                tzinfo=None
+            )
+        parts = (
+            source_email,
+            f'{float(amount):.2f}',
+            transaction_date.isoformat(),
+            merchant,
+            card_last_four or '',
+        )
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def upgrade() -> None:
+    """Add expenses.fingerprint with a unique index, and backfill it."""
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    columns = [col['name'] for col in inspector.get_columns('expenses')]
+    if 'fingerprint' not in columns:
+        op.add_column(
+            'expenses', sa.Column('fingerprint', sa.String(length=64), nullable=True)
+        )
+
+    # Backfill rows that look like webhook deliveries, so a mailbox re-read
+    # of an old email is recognised too. Only the first row of each group
+    # of existing duplicates gets the fingerprint; the others keep NULL.
+    seen = set(
+        connection.execute(
+            sa.text("SELECT fingerprint FROM expenses WHERE fingerprint IS NOT NULL")
+        ).scalars()
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(
+                "SELECT expenses.id, expenses.source_email, "
+                "expense_raw.content_hash, expenses.amount, "
+                "expenses.transaction_date, expenses.merchant, "
+                "expenses.card_last_four "
+                "FROM expenses "
+                "LEFT JOIN expense_raw ON expense_raw.id = expenses.raw_id "
+                "WHERE expenses.id > :last_id AND expenses.fingerprint IS NULL "
+                "AND (expenses.source_email IS NOT NULL "
+                "OR expenses.raw_id IS NOT NULL) "
+                "ORDER BY expenses.id LIMIT :limit"
+            ),
+            {'last_id': last_id, 'limit': BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            key = fingerprint(
+                row.source_email,
+                row.content_hash,
+                row.amount,
+                row.transaction_date,
+                row.merchant,
+                row.card_last_four,
+            )
+            if key not in seen:
+                seen.add(key)
+                updates.append({'expense_id': row.id, 'fingerprint': key})
+        if updates:
+            connection.execute(
+                sa.text(
+                    "UPDATE expenses SET fingerprint = :fingerprint "
+                    "WHERE id = :expense_id"
+                ),
+                updates,
+            )
+
+    indexes = {index['name'] for index in inspector.get_indexes('expenses')}
+    if 'ix_expenses_fingerprint' not in indexes:
+        op.create_index(
+            'ix_expenses_fingerprint', 'expenses', ['fingerprint'], unique=True
+        )
+
+
+def downgrade() -> None:
+    """Drop the fingerprint column and its index."""
+    op.drop_index('ix_expenses_fingerprint', table_name='expenses')
+    op.drop_column('expenses', 'fingerprint')
@@ -0,0 +1,82 @@
+"""add_monthly_rollups
+
+Revision ID: a4c9e31f7b28
+Revises: 7d41e0b6c2a5
+Create Date: 2026-10-17 11:42:05.318764
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e31f7b28'
+down_revision: Union[str, None] = '7d41e0b6c2a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_SQL = """
+    INSERT INTO monthly_rollups (
+        month, category_id, payment_method, date_basis,
+        total_amount, transaction_count
+    )
+    SELECT
+        date_trunc('month', timezone('UTC', {column}))::date,
+        COALESCE(category_id, 0),
+        payment_method,
+        '{basis}',
+        SUM(amount),
+        COUNT(id)
+    FROM expenses
+    GROUP BY 1, 2, 3
+"""
+
+
+def upgrade() -> None:
+    """Create monthly_rollups and fill it from the existing expenses."""
+
+    # Create the DateBasis enum type (skip if exists)
+    connection = op.get_bind()
+    result = connection.execute(sa.text(
+        "SELECT 1 FROM pg_type WHERE typname = 'datebasis'"
+    ))
+    if not result.fetchone():
+        sa.Enum('TRANSACTION', 'BILLING', name='datebasis').create(connection)
+
+    inspector = sa.inspect(connection)
+    if 'monthly_rollups' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'monthly_rollups',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'payment_method',
+            postgresql.ENUM(name='paymentmethod', create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            'date_basis',
+            postgresql.ENUM(name='datebasis', create_type=False),
+            nullable=False,
+        ),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            'month', 'category_id', 'payment_method', 'date_basis'
+        ),
+    )
+
+    op.execute(BACKFILL_SQL.format(column='transaction_date', basis='TRANSACTION'))
+    op.execute(BACKFILL_SQL.format(column='billing_date', basis='BILLING'))
+
+
+def downgrade() -> None:
+    """Drop monthly_rollups and the DateBasis enum type."""
+    op.drop_table('monthly_rollups')
+    sa.Enum(name='datebasis').drop(op.get_bind())
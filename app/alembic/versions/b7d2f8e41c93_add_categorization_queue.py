@@ -0,0 +1,45 @@
+"""add_categorization_queue
+
+Revision ID: b7d2f8e41c93
+Revises: 9e4b1c7d3f20
+Create Date: 2026-10-17 17:08:43.511920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f8e41c93'
+down_revision: Union[str, None] = '9e4b1c7d3f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the categorization_queue table used by async categorization."""
+    inspector = sa.inspect(op.get_bind())
+    if 'categorization_queue' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'categorization_queue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('expense_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'enqueued_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(['expense_id'], ['expenses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('expense_id'),
+    )
+
+
+def downgrade() -> None:
+    """Drop the categorization_queue table."""
+    op.drop_table('categorization_queue')
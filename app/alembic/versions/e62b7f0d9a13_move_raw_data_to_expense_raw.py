@@ -0,0 +1,117 @@
+"""move_raw_data_to_expense_raw
+
+Revision ID: e62b7f0d9a13
+Revises: a4c9e31f7b28
+Create Date: 2026-10-17 14:26:51.402317
+
+"""
+from typing import Sequence, Union
+import hashlib
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e62b7f0d9a13'
+down_revision: Union[str, None] = 'a4c9e31f7b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Move expenses.raw_data into expense_raw, compressed and deduplicated."""
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    if 'expense_raw' not in inspector.get_table_names():
+        op.create_table(
+            'expense_raw',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+            sa.Column(
+                'created_at',
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+            ),
+            sa.UniqueConstraint('content_hash'),
+        )
+
+    columns = [col['name'] for col in inspector.get_columns('expenses')]
+    if 'raw_id' not in columns:
+        op.add_column(
+            'expenses',
+            sa.Column(
+                'raw_id', sa.Integer(), sa.ForeignKey('expense_raw.id'), nullable=True
+            ),
+        )
+    if 'raw_data' not in columns:
+        return
+
+    # Compression happens here in Python (Postgres has no zlib), one batch
+    # of expenses at a time in id order
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(
+                "SELECT id, raw_data FROM expenses "
+                "WHERE id > :last_id AND raw_data IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {'last_id': last_id, 'limit': BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        hashes = {
+            row.id: hashlib.sha256(row.raw_data.encode()).hexdigest()
+            for row in rows
+        }
+        payloads = {hashes[row.id]: row.raw_data for row in rows}
+        connection.execute(
+            sa.text(
+                "INSERT INTO expense_raw (content_hash, data) "
+                "VALUES (:content_hash, :data) "
+                "ON CONFLICT (content_hash) DO NOTHING"
+            ),
+            [
+                {'content_hash': digest, 'data': zlib.compress(text.encode())}
+                for digest, text in payloads.items()
+            ],
+        )
+        connection.execute(
+            sa.text(
+                "UPDATE expenses SET raw_id = expense_raw.id "
+                "FROM expense_raw "
+                "WHERE expenses.id = :expense_id "
+                "AND expense_raw.content_hash = :content_hash"
+            ),
+            [
+                {'expense_id': expense_id, 'content_hash': digest}
+                for expense_id, digest in hashes.items()
+            ],
+        )
+
+    op.drop_column('expenses', 'raw_data')
+
+
+def downgrade() -> None:
+    """Copy payloads back into expenses.raw_data and drop expense_raw."""
+    connection = op.get_bind()
+    op.add_column('expenses', sa.Column('raw_data', sa.Text(), nullable=True))
+
+    rows = connection.execute(sa.text("SELECT id, data FROM expense_raw"))
+    for row in rows.all():
+        connection.execute(
+            sa.text("UPDATE expenses SET raw_data = :raw_data WHERE raw_id = :raw_id"),
+            {'raw_data': zlib.decompress(row.data).decode(), 'raw_id': row.id},
+        )
+
+    op.drop_column('expenses', 'raw_id')
+    op.drop_table('expense_raw')
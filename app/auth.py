@@ -0,0 +1,186 @@
+"""
+API key authentication
+
+ApiKeyMiddleware is pure ASGI: it reads the x-api-key header from the
+scope and either rejects the request or hands it on untouched, so
+streaming responses are not wrapped or buffered. Keys are kept as SHA-256
+digests and compared in constant time. Every key has a scope:
+
+    all      every endpoint (the API_KEY variable)
+    read     GET and HEAD requests
+    webhook  the webhook ingestion endpoints
+    mcp      the MCP server and the operations it exposes as tools
+
+API_KEYS adds keys as comma-separated scope:digest pairs; print the
+digest of a key with `python app/auth.py <key>`.
+"""
+import hashlib
+import hmac
+import os
+import sys
+
+from starlette.responses import JSONResponse
+
+SCOPES = ("all", "read", "webhook", "mcp")
+
+# Served without a key
+PUBLIC_PATHS = frozenset({"/docs", "/redoc", "/openapi.json", "/health", "/metrics"})
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+WEBHOOK_PATHS = frozenset(
+    {
+        "/expenses/webhook",
+        "/expenses/webhook/batch",
+        "/expenses/webhook/raw",
+        "/expenses/webhook/raw/batch",
+    }
+)
+MCP_PATH = "/mcp"
+
+
+def hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def load_api_keys(environ=os.environ) -> list[tuple[bytes, str]]:
+    """(digest, scope) of every configured key, from API_KEY and API_KEYS."""
+    keys = []
+    if environ.get("API_KEY"):
+        keys.append((hashlib.sha256(environ["API_KEY"].encode()).digest(), "all"))
+
+    for raw_entry in environ.get("API_KEYS", "").split(","):
+        entry = raw_entry.strip()
+        if not entry:
+            continue
+        scope, _, digest = entry.partition(":")
+        try:
+            digest_bytes = bytes.fromhex(digest)
+        except ValueError:
+            digest_bytes = b""
+        if scope not in SCOPES or len(digest_bytes) != 32:
+            # The entry itself is left out in case a raw key was pasted
+            raise ValueError(
+                f"Invalid API_KEYS entry for scope {scope!r}: expected "
+                f"<scope>:<sha256 hex digest>, scope one of {', '.join(SCOPES)}"
+            )
+        keys.append((digest_bytes, scope))
+
+    if not keys:
+        raise ValueError("API_KEY or API_KEYS environment variable is required")
+    return keys
+
+
+def operation_routes(api, operation_ids) -> frozenset[tuple[str, str]]:
+    """
+    (method, path) of the routes with the given operation ids.
+
+    The MCP server calls the operations it exposes as tools through the app
+    with the caller's key, so the mcp scope must reach exactly these routes.
+    """
+    routes = set()
+    missing = set(operation_ids)
+    for route in api.routes:
+        if getattr(route, "operation_id", None) in operation_ids:
+            missing.discard(route.operation_id)
+            routes.update((method, route.path) for method in route.methods)
+    if missing:
+        raise ValueError(f"No route for operations: {', '.join(sorted(missing))}")
+    return frozenset(routes)
+
+
+def scope_allows(
+    scope: str,
+    method: str,
+    path: str,
+    mcp_operations: frozenset[tuple[str, str]] = frozenset(),
+) -> bool:
+    if scope == "all":
+        return True
+    if scope == "read":
+        return method in READ_METHODS
+    if scope == "webhook":
+        return method == "POST" and path in WEBHOOK_PATHS
+    if scope == "mcp":
+        return (
+            path == MCP_PATH
+            or path.startswith(MCP_PATH + "/")
+            or (method, path) in mcp_operations
+        )
+    return False
+
+
+class ApiKeyMiddleware:
+    """Validate x-api-key and the key's scope before the request reaches a route."""
+
+    def __init__(
+        self,
+        app,
+        keys: list[tuple[bytes, str]],
+        public_paths=PUBLIC_PATHS,
+        api=None,
+        mcp_operation_ids=(),
+    ):
+        self.app = app
+        self.keys = keys
+        self.public_paths = public_paths
+        # Starlette builds the middleware stack on the first request, once
+        # every router of `api` is included
+        self.mcp_operations = (
+            operation_routes(api, mcp_operation_ids) if api else frozenset()
+        )
+
+    def match(self, api_key: bytes) -> str | None:
+        """Scope of the key, or None. Compares against every key, match or not."""
+        digest = hashlib.sha256(api_key).digest()
+        matched = None
+        for key_digest, scope in self.keys:
+            if hmac.compare_digest(digest, key_digest):
+                matched = scope
+        return matched
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.public_paths:
+            await self.app(scope, receive, send)
+            return
+
+        api_key = None
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                api_key = value
+                break
+
+        if not api_key:
+            response = JSONResponse(
+                status_code=401,
+                content={
+                    "detail": "API key is required. Please provide 'x-api-key' header."
+                },
+            )
+        else:
+            key_scope = self.match(api_key)
+            if key_scope is None:
+                response = JSONResponse(
+                    status_code=403, content={"detail": "Invalid API key."}
+                )
+            elif not scope_allows(
+                key_scope, scope["method"], scope["path"], self.mcp_operations
+            ):
+                response = JSONResponse(
+                    status_code=403,
+                    content={
+                        "detail": f"API key scope '{key_scope}' does not allow "
+                        "this endpoint."
+                    },
+                )
+            else:
+                scope.setdefault("state", {})["api_key_scope"] = key_scope
+                await self.app(scope, receive, send)
+                return
+
+        await response(scope, receive, send)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python app/auth.py <api key>")
+    print(hash_key(sys.argv[1]))
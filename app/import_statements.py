@@ -0,0 +1,76 @@
+"""
+Bank statement import script.
+This script loads expenses from CSV or OFX statement exports, categorizing
+them and calculating billing dates the same way the API does.
+
+Usage: python import_statements.py statement.csv [more files...]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the current directory to sys.path to allow imports from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from models import PaymentMethod
+from services.statements import import_statement
+
+
+def import_file(path: str, args) -> bool:
+    """Import one statement file and print its report."""
+    statement_format = args.format
+    if statement_format is None:
+        statement_format = "ofx" if path.lower().endswith((".ofx", ".qfx")) else "csv"
+
+    print(f"Importing {path} ({statement_format})...")
+    db = SessionLocal()
+    try:
+        with open(path, encoding=args.encoding, newline="") as lines:
+            result = import_statement(
+                db,
+                lines,
+                statement_format,
+                PaymentMethod(args.payment_method) if args.payment_method else None,
+                args.card_last_four,
+                args.batch_size,
+            )
+    except Exception as e:
+        print(f"Error importing {path}: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+    print(
+        f"Imported {result['imported']} expenses in {result['elapsed_seconds']}s "
+        f"({result['rows_per_second']} rows/s), rejected {result['rejected']}"
+    )
+    for row in result["rejected_rows"]:
+        print(f"  line {row['line']}: {row['reason']}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import expenses from CSV or OFX bank statements"
+    )
+    parser.add_argument("paths", nargs="+", help="Statement files to import")
+    parser.add_argument("--format", choices=["csv", "ofx"], help="Defaults to the file extension")
+    parser.add_argument(
+        "--payment-method",
+        choices=[method.value for method in PaymentMethod],
+        help="Payment method for rows that do not state one",
+    )
+    parser.add_argument("--card-last-four", help="Card digits for rows that do not state them")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = [import_file(path, args) for path in args.paths]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,31 @@ import os
 # This is necessary for Vercel deployment where the script is run from the root
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import Base, engine
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+
+from auth import ApiKeyMiddleware, load_api_keys
+from database import get_async_db, get_pool_status
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.openapi.utils import get_openapi
-from fastapi_mcp import FastApiMCP
-from routers import categories, expenses, merchant_rules
+from mcp_server import MCP_OPERATIONS, LazyMCPServer
+from metrics import MetricsMiddleware, metrics_response
+from routers import billing_configs, categories, expenses, merchant_rules
+from services import categorization_queue
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Tables are created by start.py / Alembic migrations, not on import: a
+# serverless cold start must not wait on the database
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Categorization workers only run when ASYNC_CATEGORIZATION is on
+    if categorization_queue.ASYNC_CATEGORIZATION:
+        categorization_queue.workers.start()
+    yield
+    categorization_queue.workers.stop()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Expense Tracker API",
@@ -23,17 +38,16 @@ app = FastAPI(
         "authentication"
     ),
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-mcp = FastApiMCP(app,
-                 name="Expense Tracker MCP",
-                 include_operations=["get_expenses",
-                                     "get_categories", 
-                                     "create_merchant_rule",
-                                     "get_merchant_rules"],
-                 headers=['x-api-key'],
-                 describe_all_responses=True,
-                 describe_full_response_schema=True)
+# Built on the first /mcp request rather than at import
+mcp = LazyMCPServer(app,
+                    name="Expense Tracker MCP",
+                    include_operations=list(MCP_OPERATIONS),
+                    headers=['x-api-key'],
+                    describe_all_responses=True,
+                    describe_full_response_schema=True)
 mcp.mount()
 
 
@@ -71,37 +85,16 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
-# Get API key from environment variable
-API_KEY = os.getenv("API_KEY")
-if not API_KEY:
-    raise ValueError("API_KEY environment variable is required")
-
-
-@app.middleware("http")
-async def api_key_middleware(request: Request, call_next):
-    """Middleware to validate API key for all requests."""
-    if request.url.path in ["/docs", "/redoc", "/openapi.json", "/health"]:
-        return await call_next(request)
-    
-    api_key = request.headers.get("x-api-key")
-    if not api_key:
-        return JSONResponse(
-            status_code=401,
-            content={
-                "detail": (
-                    "API key is required. Please provide 'x-api-key' header."
-                )
-            }
-        )
-
-    if api_key != API_KEY:
-        return JSONResponse(
-            status_code=403,
-            content={"detail": "Invalid API key."}
-        )
-    
-    response = await call_next(request)
-    return response
+# API keys (API_KEY, plus scoped keys in API_KEYS) from the environment;
+# raises if none is configured. The mcp scope reaches the routes of the MCP
+# operations, looked up when the middleware stack is built (after the
+# routers below are included).
+app.add_middleware(
+    ApiKeyMiddleware,
+    keys=load_api_keys(),
+    api=app,
+    mcp_operation_ids=MCP_OPERATIONS,
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -112,10 +105,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so rejected and failed requests are measured too
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(expenses.router)
 app.include_router(categories.router)
 app.include_router(merchant_rules.router)
+app.include_router(billing_configs.router)
 
 
 @app.get("/")
@@ -136,7 +133,23 @@ def health_check():
     return {"status": "healthy"}
 
 
-mcp.setup_server()
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus metrics (unauthenticated, like /health)."""
+    return metrics_response()
+
+
+@app.get("/health/pool")
+def pool_status():
+    """Database pool profile, size and checkout wait statistics."""
+    return get_pool_status()
+
+
+@app.get("/health/categorization-queue")
+async def categorization_queue_status(db: AsyncSession = Depends(get_async_db)):
+    """Async categorization queue depth and the age of its oldest job."""
+    return await db.run_sync(categorization_queue.queue_stats)
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,53 @@
+"""
+MCP server, built on its first request
+
+fastapi_mcp takes a while to import and turns the OpenAPI schema into
+tools when FastApiMCP is constructed. Doing that while importing main.py
+made every cold start pay for it, MCP client or not; LazyMCPServer does it
+when /mcp is first requested instead.
+"""
+from fastapi import FastAPI
+
+# Operation ids exposed as MCP tools. The mcp API key scope is derived from
+# this list too (auth.operation_routes).
+MCP_OPERATIONS = (
+    "get_expenses",
+    "get_expenses_compact",
+    "get_categories",
+    "create_merchant_rule",
+    "get_merchant_rules",
+)
+
+
+class LazyMCPServer:
+    """ASGI app serving the MCP endpoints of `api`, created on first use."""
+
+    def __init__(self, api: FastAPI, mount_path: str = "/mcp", **options):
+        self.api = api
+        self.mount_path = mount_path
+        self.options = options
+        self._app = None
+
+    def build(self) -> FastAPI:
+        from fastapi_mcp import FastApiMCP
+
+        # Built after every router is included, so one pass finds all the
+        # operations (no setup_server() re-run needed)
+        mcp = FastApiMCP(self.api, **self.options)
+        server_app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+        mcp.mount(server_app, mount_path=self.mount_path)
+        return server_app
+
+    def mount(self) -> None:
+        """Route the MCP paths of the API to this server."""
+        # Plain routes rather than a Mount: the scope keeps its full path,
+        # which is what the server app's routes and the SSE messages URL use
+        for path in (self.mount_path, f"{self.mount_path}/messages/"):
+            self.api.add_route(path, self, include_in_schema=False)
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            # No await before the assignment, so concurrent first requests
+            # cannot build it twice
+            self._app = self.build()
+        await self._app(scope, receive, send)
@@ -0,0 +1,190 @@
+"""
+Request metrics for Prometheus and Server-Timing headers
+
+MetricsMiddleware records per-route latency and response size histograms
+and the number of requests in flight. Code running inside a request adds
+the time it spends in a phase (database, categorization) with add_timing()
+or timed(); the totals go out in the response's Server-Timing header and
+into a per-phase histogram.
+
+Each worker process keeps its own metrics unless PROMETHEUS_MULTIPROC_DIR
+points at a directory shared by the workers (see DEPLOYMENT.md). The
+categorization queue workers report the queue depth and lag here as well.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+
+# Phase name -> seconds spent in it during the current request
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+# Server-Timing descriptions of the phases
+TIMING_PHASES = {"db": "Database", "categorization": "Categorization"}
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending its last body chunk",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size",
+    ["method", "route", "status"],
+    buckets=SIZE_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+PHASE_DURATION = Histogram(
+    "http_request_phase_seconds",
+    "Time spent per request in each phase (database, categorization)",
+    ["method", "route", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+CATEGORIZATION_QUEUE_DEPTH = Gauge(
+    "categorization_queue_depth",
+    "Expenses waiting for the categorization workers",
+    multiprocess_mode="mostrecent",
+)
+CATEGORIZATION_QUEUE_LAG = Gauge(
+    "categorization_queue_lag_seconds",
+    "Age of the oldest expense waiting for the categorization workers",
+    multiprocess_mode="mostrecent",
+)
+CATEGORIZATION_JOBS = Counter(
+    "categorization_jobs_total",
+    "Queued expenses processed by the categorization workers",
+)
+CATEGORIZATION_DELAY = Histogram(
+    "categorization_delay_seconds",
+    "Time from enqueueing an expense to its categorization",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def add_timing(phase: str, seconds: float) -> None:
+    """Add time spent in a phase to the current request, if there is one."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase: str):
+    """Count the time spent in the block towards a phase of the request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(phase, time.perf_counter() - start)
+
+
+def server_timing(timings: dict[str, float], total: float) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    entries = [
+        f'{phase};desc="{TIMING_PHASES.get(phase, phase)}";dur={seconds * 1000:.1f}'
+        for phase, seconds in timings.items()
+    ]
+    entries.append(f'app;desc="Total";dur={total * 1000:.1f}')
+    return ", ".join(entries)
+
+
+def _route_label(scope) -> str:
+    # The route template, not the path, so ids don't explode the label set
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    # Plain Starlette routes (docs, MCP) leave only the endpoint; their
+    # paths are fixed
+    if "endpoint" in scope:
+        return scope["path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: streaming bodies are measured to the last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (
+                        b"server-timing",
+                        server_timing(timings, time.perf_counter() - start).encode(),
+                    )
+                )
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            _request_timings.reset(token)
+
+            route = _route_label(scope)
+            labels = (method, route, str(status))
+            REQUESTS.labels(*labels).inc()
+            REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - start)
+            RESPONSE_SIZE.labels(*labels).observe(size)
+            for phase, seconds in timings.items():
+                PHASE_DURATION.labels(method, route, phase).observe(seconds)
+
+
+def metrics_response() -> Response:
+    """The Prometheus text exposition of this process (or all workers)."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        data = generate_latest(registry)
+    else:
+        data = generate_latest()
+    return Response(content=data, media_type=CONTENT_TYPE_LATEST)
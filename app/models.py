@@ -1,16 +1,22 @@
 from database import Base
 from sqlalchemy import (
+    DDL,
     Boolean,
     Column,
+    Date,
     DateTime,
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
+    event,
 )
 import enum
+import zlib
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -22,6 +28,11 @@ class PaymentMethod(enum.Enum):
     CASH = "CASH"
 
 
+class DateBasis(enum.Enum):
+    TRANSACTION = "TRANSACTION"
+    BILLING = "BILLING"
+
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -77,7 +88,12 @@ class Expense(Base):
 
     # Source information (for n8n integration)
     source_email = Column(String(255))  # Which email this came from
-    raw_data = Column(Text)  # Store original email content if needed
+    # Original email content, stored compressed outside this hot table
+    raw_id = Column(Integer, ForeignKey("expense_raw.id"))
+    # Webhook idempotency key (see raw_payloads.webhook_fingerprint); NULL
+    # for expenses that did not come through a webhook, or came with
+    # neither raw data nor a source email
+    fingerprint = Column(String(64))
 
     # Categorization metadata
     auto_categorized = Column(Boolean, default=False)
@@ -89,3 +105,100 @@ class Expense(Base):
 
     # Relationships
     category = relationship("Category", back_populates="expenses")
+    raw = relationship("ExpenseRaw")
+
+    @property
+    def raw_data(self) -> str | None:
+        """Original email content (load `raw` eagerly in async code)."""
+        return self.raw.text if self.raw is not None else None
+
+    __table_args__ = (
+        # Keyset pagination seeks on (date, id) in either date basis
+        Index("ix_expenses_transaction_date_id", "transaction_date", "id"),
+        Index("ix_expenses_billing_date_id", "billing_date", "id"),
+        # A redelivered webhook payload hits this instead of inserting again
+        Index("ix_expenses_fingerprint", "fingerprint", unique=True),
+        # Substring (ILIKE) and similarity search on merchant names
+        Index(
+            "ix_expenses_merchant_trgm",
+            "merchant",
+            postgresql_using="gin",
+            postgresql_ops={"merchant": "gin_trgm_ops"},
+        ),
+    )
+
+
+# The trigram index needs pg_trgm, so enable it before create_all on Postgres
+event.listen(
+    Expense.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+class ExpenseRaw(Base):
+    """Original payload of an expense, zlib-compressed and deduplicated."""
+
+    __tablename__ = "expense_raw"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)  # sha256 hex
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed UTF-8 text
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.data).decode()
+
+
+class CardBillingConfig(Base):
+    """Billing cycle of one credit card, overriding the service-wide day."""
+
+    __tablename__ = "card_billing_configs"
+
+    card_last_four = Column(String(4), primary_key=True)
+    credit_card_billing_day = Column(Integer, nullable=False)
+    timezone = Column(String(64), nullable=False)  # IANA name, e.g. America/Santiago
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class MonthlyRollup(Base):
+    """Expense totals per month, kept in step with writes to expenses."""
+
+    __tablename__ = "monthly_rollups"
+
+    month = Column(Date, primary_key=True)  # First day of the month (UTC)
+    # 0 stands for uncategorized so the key never contains NULL
+    category_id = Column(Integer, primary_key=True, default=0)
+    payment_method = Column(Enum(PaymentMethod), primary_key=True)
+    date_basis = Column(Enum(DateBasis), primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+
+class CategorizationJob(Base):
+    """An expense waiting for the categorization workers."""
+
+    __tablename__ = "categorization_queue"
+
+    id = Column(Integer, primary_key=True)
+    expense_id = Column(
+        Integer,
+        ForeignKey("expenses.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    enqueued_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _backfill_monthly_rollups(target, connection, tables=(), **kw):
+    # create_all() on a database that already has expenses must not leave a
+    # freshly created rollup table empty
+    if MonthlyRollup.__table__ in tables:
+        from services.rollups import rebuild_rollups
+
+        rebuild_rollups(connection)
@@ -0,0 +1,36 @@
+"""
+Monthly rollup rebuild script.
+This script recomputes the monthly_rollups table from the expenses table,
+repairing any drift between the two.
+"""
+
+import os
+import sys
+
+# Add the current directory to sys.path to allow imports from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from models import MonthlyRollup
+from services.rollups import rebuild_rollups
+from sqlalchemy import func, select
+
+
+def rebuild():
+    """Rebuild every monthly rollup row in a single transaction."""
+    print("Rebuilding monthly rollups...")
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+        db.commit()
+        row_count = db.scalar(select(func.count()).select_from(MonthlyRollup))
+        print(f"Rebuilt {row_count} monthly rollup rows")
+    except Exception as e:
+        print(f"Error during rollup rebuild: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,93 @@
+from database import get_async_db
+from fastapi import APIRouter, Depends, HTTPException, Path
+from models import CardBillingConfig
+from schemas import BillingConfig, CardBillingConfigResult
+from schemas import CardBillingConfig as CardBillingConfigSchema
+from services.billing import billing_service
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter(prefix="/billing-configs", tags=["billing-configs"])
+
+CARD_LAST_FOUR = Path(..., pattern=r"^\d{4}$")
+
+
+@router.get("/", response_model=list[CardBillingConfigSchema])
+async def get_billing_configs(db: AsyncSession = Depends(get_async_db)):
+    """Get the billing cycle of every configured card."""
+    configs = await db.scalars(
+        select(CardBillingConfig).order_by(CardBillingConfig.card_last_four)
+    )
+    return configs.all()
+
+
+@router.get("/{card_last_four}", response_model=CardBillingConfigSchema)
+async def get_billing_config(
+    card_last_four: str = CARD_LAST_FOUR, db: AsyncSession = Depends(get_async_db)
+):
+    """Get the billing cycle of a card."""
+    config = await db.get(CardBillingConfig, card_last_four)
+    if not config:
+        raise HTTPException(status_code=404, detail="Billing config not found")
+    return config
+
+
+@router.put("/{card_last_four}", response_model=CardBillingConfigResult)
+async def set_billing_config(
+    billing_config: BillingConfig,
+    card_last_four: str = CARD_LAST_FOUR,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Create or update the billing cycle of a card.
+
+    When the billing day or timezone changes, the billing dates of the
+    card's credit card expenses are recomputed in the same transaction.
+    """
+    config = await db.get(CardBillingConfig, card_last_four)
+    if config is None:
+        config = CardBillingConfig(card_last_four=card_last_four)
+        db.add(config)
+        changed = True
+    else:
+        changed = (config.credit_card_billing_day, config.timezone) != (
+            billing_config.credit_card_billing_day,
+            billing_config.timezone,
+        )
+
+    config.credit_card_billing_day = billing_config.credit_card_billing_day
+    config.timezone = billing_config.timezone
+    await db.flush()
+
+    updated_expenses = 0
+    if changed:
+        updated_expenses = await db.run_sync(
+            billing_service.recompute_billing_dates, card_last_four
+        )
+    await db.commit()
+    billing_service.invalidate_card_configs()
+    await db.refresh(config)
+    return {"config": config, "updated_expenses": updated_expenses}
+
+
+@router.delete("/{card_last_four}", response_model=CardBillingConfigResult)
+async def delete_billing_config(
+    card_last_four: str = CARD_LAST_FOUR, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Delete the billing cycle of a card.
+
+    The card's credit card expenses go back to the default billing day.
+    """
+    config = await db.get(CardBillingConfig, card_last_four)
+    if not config:
+        raise HTTPException(status_code=404, detail="Billing config not found")
+
+    await db.delete(config)
+    await db.flush()
+    updated_expenses = await db.run_sync(
+        billing_service.recompute_billing_dates, card_last_four
+    )
+    await db.commit()
+    billing_service.invalidate_card_configs()
+    return {"config": None, "updated_expenses": updated_expenses}
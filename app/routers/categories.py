@@ -1,18 +1,38 @@
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
-from models import Category
+from database import get_async_db
+from fastapi import APIRouter, Depends, HTTPException, Request
+from models import Category, Expense
+from pydantic import TypeAdapter
 from schemas import Category as CategorySchema
 from schemas import CategoryCreate, CategoryUpdate
-from sqlalchemy.orm import Session
+from services.response_cache import (
+    cached_response,
+    categories_cache,
+    merchant_rules_cache,
+)
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+_category_list = TypeAdapter(list[CategorySchema])
+
+
+def _invalidate_category_reads() -> None:
+    categories_cache.bump()
+    merchant_rules_cache.bump()
+
+
+async def _get_category_by_name(db: AsyncSession, name: str) -> Category | None:
+    return await db.scalar(select(Category).where(Category.name == name))
+
 
 @router.post("/", response_model=CategorySchema)
-def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+async def create_category(
+    category: CategoryCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Create a new expense category."""
     # Check if category name already exists
-    existing = db.query(Category).filter(Category.name == category.name).first()
+    existing = await _get_category_by_name(db, category.name)
     if existing:
         raise HTTPException(
             status_code=400, detail="Category with this name already exists"
@@ -23,42 +43,53 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
     )
 
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    await db.commit()
+    _invalidate_category_reads()
+    await db.refresh(db_category)
     return db_category
 
 
 @router.get("/", response_model=list[CategorySchema],
             operation_id="get_categories")
-def get_categories(db: Session = Depends(get_db)):
-    """Get all expense categories."""
-    categories = db.query(Category).order_by(Category.name).all()
-    return categories
+async def get_categories(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get all expense categories.
+
+    Served from the serialized cache with an ETag; If-None-Match gets a 304.
+    """
+    cached = categories_cache.get()
+    if cached is None:
+        version = categories_cache.version
+        categories = await db.scalars(select(Category).order_by(Category.name))
+        body = _category_list.dump_json(
+            _category_list.validate_python(categories.all(), from_attributes=True)
+        )
+        cached = categories_cache.put(version, body)
+    return cached_response(request, cached)
 
 
 @router.get("/{category_id}", response_model=CategorySchema)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+async def get_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific category by ID."""
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
 
 
 @router.put("/{category_id}", response_model=CategorySchema)
-def update_category(
-    category_id: int, category_update: CategoryUpdate, db: Session = Depends(get_db)
+async def update_category(
+    category_id: int,
+    category_update: CategoryUpdate,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update a category."""
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     # Check if new name conflicts with existing category
     if category_update.name and category_update.name != category.name:
-        existing = (
-            db.query(Category).filter(Category.name == category_update.name).first()
-        )
+        existing = await _get_category_by_name(db, category_update.name)
         if existing:
             raise HTTPException(
                 status_code=400, detail="Category with this name already exists"
@@ -68,28 +99,30 @@ def update_category(
     for field, value in category_update.model_dump(exclude_unset=True).items():
         setattr(category, field, value)
 
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    _invalidate_category_reads()
+    await db.refresh(category)
     return category
 
 
 @router.delete("/{category_id}")
-def delete_category(category_id: int, db: Session = Depends(get_db)):
+async def delete_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a category."""
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     # Check if category has associated expenses
-    from models import Expense
-
-    expense_count = db.query(Expense).filter(Expense.category_id == category_id).count()
+    expense_count = await db.scalar(
+        select(func.count(Expense.id)).where(Expense.category_id == category_id)
+    )
     if expense_count > 0:
         raise HTTPException(
             status_code=400,
             detail=f"Cannot delete category with {expense_count} associated expenses",
         )
 
-    db.delete(category)
-    db.commit()
+    await db.delete(category)
+    await db.commit()
+    _invalidate_category_reads()
     return {"message": "Category deleted successfully"}
@@ -1,91 +1,232 @@
+import base64
+import csv
 from datetime import datetime
+import enum
+import io
+import json
+from typing import Literal
 
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException, Query
-from models import Expense, PaymentMethod
+from database import SessionLocal, dialect_insert, get_async_db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from models import Category, Expense, ExpenseRaw, PaymentMethod
 from schemas import Expense as ExpenseSchema
 from schemas import (
+    ExpenseCompact,
+    ExpenseCompactPage,
     ExpenseCreate,
+    ExpenseListItem,
+    ExpensePage,
     ExpenseSummary,
     ExpenseUpdate,
+    RawEmailWebhook,
+    StatementImportResult,
+    WebhookBatchItemResult,
+    WebhookBatchResult,
     WebhookExpense,
 )
-from services.categorization import ExpenseCategorizationService
+from services import (
+    analytics,
+    categorization_queue,
+    email_parser,
+    raw_payloads,
+    rollups,
+    statements,
+)
 from services.billing import billing_service
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from services.categorization import (
+    FUZZY_THRESHOLD,
+    ExpenseCategorizationService,
+    categorize_merchant,
+    get_compiled_rules,
+)
+from sqlalchemy import desc, func, insert, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
 
-@router.post("/", response_model=ExpenseSchema)
-def create_expense(expense: ExpenseCreate, db: Session = Depends(get_db)):
-    """Create a new expense with automatic billing date calculation."""
-    categorization_service = ExpenseCategorizationService(db)
+def _expense_values(
+    expense: ExpenseCreate,
+    category_id: int | None,
+    auto_categorized: bool,
+    confidence_score: float | None,
+) -> dict:
+    """Column values for a new expense, calculating the billing date if needed."""
+    billing_date = expense.billing_date
+    if not billing_date:
+        billing_date = billing_service.calculate_billing_date(
+            expense.transaction_date,
+            expense.payment_method,
+            expense.card_last_four,
+        )
+
+    return {
+        "amount": expense.amount,
+        "merchant": expense.merchant,
+        "description": expense.description,
+        "transaction_date": expense.transaction_date,
+        "category_id": category_id,
+        "payment_method": expense.payment_method,
+        "billing_date": billing_date,
+        "card_last_four": expense.card_last_four,
+        "source_email": expense.source_email,
+        "raw_data": expense.raw_data,
+        "auto_categorized": auto_categorized,
+        "confidence_score": confidence_score,
+    }
+
 
+def _count_in_rollups(db: Session, rows: list[dict], sign: int = 1) -> None:
+    # Sync rollup maintenance, run through AsyncSession.run_sync
+    rollups.apply_rollup_deltas(
+        db, [delta for values in rows for delta in rollups.expense_deltas(values, sign)]
+    )
+
+
+async def _get_expense(db: AsyncSession, expense_id: int) -> Expense | None:
+    """Load an expense with its category and raw payload, refreshing stale copies."""
+    return await db.scalar(
+        select(Expense)
+        .options(selectinload(Expense.category), selectinload(Expense.raw))
+        .where(Expense.id == expense_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+def _categorize_later() -> bool:
+    # ASYNC_CATEGORIZATION: new expenses go in uncategorized and queued
+    return categorization_queue.ASYNC_CATEGORIZATION
+
+
+async def _enqueue_uncategorized(db: AsyncSession, rows: list[dict]) -> None:
+    """Queue inserted rows (with their "id") that still need a category."""
+    if _categorize_later():
+        await db.run_sync(
+            categorization_queue.enqueue,
+            [values["id"] for values in rows if values["category_id"] is None],
+        )
+
+
+async def _new_expense_values(db: AsyncSession, expense: ExpenseCreate) -> dict:
+    """Categorize (unless a category is given or queued) and bill a new expense."""
     # Auto-categorize if no category is provided
     category_id = expense.category_id
     auto_categorized = False
     confidence_score = None
 
-    if not category_id:
-        category_id, auto_categorized, confidence_score = (
-            categorization_service.categorize_expense(expense.merchant)
+    if not category_id and not _categorize_later():
+        # Fuzzy matching is CPU-bound: keep it off the event loop
+        rules = await db.run_sync(get_compiled_rules)
+        category_id, auto_categorized, confidence_score = await run_in_threadpool(
+            categorize_merchant, rules, expense.merchant
         )
 
-    # Calculate billing date if not provided
-    billing_date = expense.billing_date
-    if not billing_date:
-        billing_date = billing_service.calculate_billing_date(
-            expense.transaction_date,
-            expense.payment_method,
-            expense.card_last_four,
+    await db.run_sync(billing_service.load_card_configs)
+    values = _expense_values(expense, category_id, auto_categorized, confidence_score)
+    await db.run_sync(raw_payloads.attach_raw_ids, [values])
+    return values
+
+
+def _fingerprint(expense: ExpenseCreate) -> str | None:
+    return raw_payloads.webhook_fingerprint(
+        expense.source_email,
+        expense.raw_data,
+        expense.amount,
+        expense.transaction_date,
+        expense.merchant,
+        expense.card_last_four,
+    )
+
+
+async def _find_fingerprints(
+    db: AsyncSession, fingerprints
+) -> dict[str, tuple[int, int | None]]:
+    """Map fingerprints already stored to (expense id, category id)."""
+    rows = await db.execute(
+        select(Expense.fingerprint, Expense.id, Expense.category_id).where(
+            Expense.fingerprint.in_(set(fingerprints))
         )
+    )
+    return {
+        fingerprint: (expense_id, category_id)
+        for fingerprint, expense_id, category_id in rows
+    }
 
-    db_expense = Expense(
-        amount=expense.amount,
-        merchant=expense.merchant,
-        description=expense.description,
-        transaction_date=expense.transaction_date,
-        category_id=category_id,
-        payment_method=expense.payment_method,
-        billing_date=billing_date,
-        card_last_four=expense.card_last_four,
-        source_email=expense.source_email,
-        raw_data=expense.raw_data,
-        auto_categorized=auto_categorized,
-        confidence_score=confidence_score,
+
+def _insert_webhook_expenses(db):
+    """INSERT of fingerprinted rows that skips payloads already stored."""
+    return (
+        dialect_insert(db)(Expense)
+        .on_conflict_do_nothing(index_elements=["fingerprint"])
+        .returning(Expense.fingerprint, Expense.id)
     )
 
+
+@router.post("/", response_model=ExpenseSchema)
+async def create_expense(
+    expense: ExpenseCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new expense with automatic billing date calculation."""
+    values = await _new_expense_values(db, expense)
+    db_expense = Expense(**values)
+
     db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
-    return db_expense
+    await db.run_sync(_count_in_rollups, [values])
+    await db.flush()
+    await _enqueue_uncategorized(db, [{**values, "id": db_expense.id}])
+    await db.commit()
+    categorization_queue.notify()
+    return await _get_expense(db, db_expense.id)
 
 
-@router.get("/", response_model=list[ExpenseSchema], 
-            operation_id="get_expenses")
-def get_expenses(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
+def _encode_cursor(date_value: datetime, expense_id: int, use_billing_date: bool) -> str:
+    """Opaque cursor pointing just past the given (date, id) position."""
+    payload = {
+        "b": use_billing_date,
+        "d": date_value.isoformat(),
+        "i": expense_id,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_cursor(cursor: str, use_billing_date: bool) -> tuple[datetime, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        position = datetime.fromisoformat(payload["d"]), int(payload["i"])
+        cursor_uses_billing_date = bool(payload["b"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+    if cursor_uses_billing_date != use_billing_date:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor was issued for a different use_billing_date value",
+        )
+    return position
+
+
+def _filter_expenses(
+    query,
+    *,
     category_id: int | None = None,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     merchant: str | None = None,
     payment_method: PaymentMethod | None = None,
-    use_billing_date: bool = Query(
-        False, description="Filter by billing date instead of transaction date"
-    ),
-    db: Session = Depends(get_db),
+    use_billing_date: bool = False,
+    merchant_search: Literal["contains", "similar"] = "contains",
 ):
-    """Get expenses with optional filtering by payment method and billing dates."""
-    query = db.query(Expense)
-
+    """Apply the get_expenses filters and newest-first ordering to a query."""
     if category_id:
-        query = query.filter(Expense.category_id == category_id)
+        query = query.where(Expense.category_id == category_id)
 
     if payment_method:
-        query = query.filter(Expense.payment_method == payment_method)
+        query = query.where(Expense.payment_method == payment_method)
 
     # Choose between transaction date and billing date for filtering
     date_field = (
@@ -93,44 +234,362 @@ def get_expenses(
     )
 
     if start_date:
-        query = query.filter(date_field >= start_date)
+        query = query.where(date_field >= start_date)
 
     if end_date:
-        query = query.filter(date_field <= end_date)
+        query = query.where(date_field <= end_date)
+
+    if merchant and merchant_search == "similar":
+        # Rows whose word similarity to the search term reaches
+        # pg_trgm.word_similarity_threshold, served by the trigram GIN index
+        query = query.where(Expense.merchant.op("%>")(merchant)).order_by(
+            desc(func.word_similarity(merchant, Expense.merchant))
+        )
+    elif merchant:
+        # Escape LIKE wildcards so user input stays a literal substring;
+        # the trigram index serves the ILIKE for terms of 3+ characters
+        escaped = (
+            merchant.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        query = query.where(Expense.merchant.ilike(f"%{escaped}%", escape="\\"))
+
+    # Expense.id breaks ties between equal dates so pages never overlap
+    return query.order_by(desc(date_field), desc(Expense.id))
+
+
+class ExpenseListParams:
+    """Filter and paging query parameters shared by the expense lists."""
+
+    def __init__(
+        self,
+        *,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000),
+        category_id: int | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        merchant: str | None = None,
+        payment_method: PaymentMethod | None = None,
+        use_billing_date: bool = Query(
+            False, description="Filter by billing date instead of transaction date"
+        ),
+        merchant_search: Literal["contains", "similar"] = Query(
+            "contains",
+            description=(
+                "contains: case-insensitive substring match. similar: trigram "
+                "word-similarity match ranked by closeness (tolerates typos)"
+            ),
+        ),
+        use_cursor: bool = Query(
+            False,
+            description=(
+                "Return a page object with next_cursor instead of a plain list"
+            ),
+        ),
+        cursor: str | None = Query(
+            None,
+            description=(
+                "next_cursor from the previous page; implies use_cursor. "
+                "Keep the other filters unchanged between pages"
+            ),
+        ),
+    ):
+        self.skip = skip
+        self.limit = limit
+        self.filters = {
+            "category_id": category_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "merchant": merchant,
+            "payment_method": payment_method,
+            "use_billing_date": use_billing_date,
+            "merchant_search": merchant_search,
+        }
+        self.use_billing_date = use_billing_date
+        self.paged = use_cursor or cursor is not None
+        self.cursor = cursor
+
+        if merchant and merchant_search == "similar" and self.paged:
+            raise HTTPException(
+                status_code=400,
+                detail="Similarity search is ranked and cannot use cursor paging",
+            )
+        if skip and self.paged:
+            raise HTTPException(
+                status_code=400, detail="skip cannot be combined with cursor paging"
+            )
+
+    @property
+    def date_field(self):
+        return "billing_date" if self.use_billing_date else "transaction_date"
+
+
+async def _list_expenses(
+    db: AsyncSession, query, params: ExpenseListParams, entities: bool = True
+) -> tuple[list, str | None]:
+    """Run a filtered list query with offset or cursor paging.
+
+    query selects either Expense entities or rows holding at least id and
+    the date column. Returns the rows and the next cursor, if any.
+    """
+    query = _filter_expenses(query, **params.filters)
+    execute = db.scalars if entities else db.execute
+
+    if not params.paged:
+        rows = await execute(query.offset(params.skip).limit(params.limit))
+        return rows.all(), None
+
+    date_field = getattr(Expense, params.date_field)
+    if params.cursor:
+        cursor_date, cursor_id = _decode_cursor(params.cursor, params.use_billing_date)
+        query = query.where(
+            tuple_(date_field, Expense.id) < tuple_(cursor_date, cursor_id)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await execute(query.limit(params.limit + 1))).all()
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[: params.limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(
+            getattr(last, params.date_field), last.id, params.use_billing_date
+        )
+    return rows, next_cursor
+
+
+# Columns selectable with ?fields=; category_name and raw_data come from joins
+EXPENSE_FIELDS = {
+    **{column.name: column for column in Expense.__table__.columns},
+    "category_name": Category.name.label("category_name"),
+    "raw_data": ExpenseRaw.data.label("raw_data"),
+}
+
+
+def _parse_fields(fields: str) -> list[str]:
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    names = list(dict.fromkeys(names))
+    unknown = [name for name in names if name not in EXPENSE_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                f"Available: {', '.join(EXPENSE_FIELDS)}"
+            ),
+        )
+    return names
+
+
+def _projection_query(names: list[str], date_field: str):
+    """SELECT of the named columns, plus id and the date column for paging."""
+    selected = dict.fromkeys([*names, "id", date_field])
+    query = select(*(EXPENSE_FIELDS[name] for name in selected))
+    if "category_name" in names:
+        query = query.outerjoin(Category, Expense.category_id == Category.id)
+    if "raw_data" in names:
+        query = query.outerjoin(ExpenseRaw, Expense.raw_id == ExpenseRaw.id)
+    return query
+
+
+@router.get("/", response_model=list[ExpenseListItem] | ExpensePage,
+            operation_id="get_expenses")
+async def get_expenses(
+    params: ExpenseListParams = Depends(),
+    fields: str | None = Query(
+        None,
+        description=(
+            "Comma-separated columns to return, e.g. id,amount,transaction_date "
+            "(category_name for the category). Only these columns are read"
+        ),
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get expenses with optional filtering by payment method and billing dates.
+
+    Pages with skip/limit by default. Cursor mode seeks from the last
+    (date, id) seen instead of skipping rows, so deep pages stay fast.
+    raw_data is not loaded for lists; request it with fields= if needed.
+    """
+    if fields is None:
+        query = select(Expense).options(selectinload(Expense.category))
+        expenses, next_cursor = await _list_expenses(db, query, params)
+        if not params.paged:
+            return expenses
+        return ExpensePage(items=expenses, next_cursor=next_cursor)
+
+    names = _parse_fields(fields)
+    rows, next_cursor = await _list_expenses(
+        db, _projection_query(names, params.date_field), params, entities=False
+    )
+    items = [{name: row._mapping[name] for name in names} for row in rows]
+    if "raw_data" in names:
+        for item in items:
+            item["raw_data"] = raw_payloads.decompress(item["raw_data"])
+    content = {"items": items, "next_cursor": next_cursor} if params.paged else items
+    return JSONResponse(jsonable_encoder(content))
+
+
+@router.get("/compact", response_model=list[ExpenseCompact] | ExpenseCompactPage,
+            operation_id="get_expenses_compact")
+async def get_expenses_compact(
+    params: ExpenseListParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List expenses as compact rows (the MCP get_expenses_compact tool).
+
+    Same filters and paging as GET /expenses/, returning only amount,
+    merchant, dates, payment method and category name.
+    """
+    query = select(
+        Expense.id,
+        Expense.amount,
+        Expense.merchant,
+        Expense.transaction_date,
+        Expense.billing_date,
+        Expense.payment_method,
+        Category.name.label("category"),
+    ).outerjoin(Category, Expense.category_id == Category.id)
+
+    rows, next_cursor = await _list_expenses(db, query, params, entities=False)
+    items = [ExpenseCompact.model_validate(row._mapping) for row in rows]
+    if not params.paged:
+        return items
+    return ExpenseCompactPage(items=items, next_cursor=next_cursor)
+
+
+EXPORT_COLUMNS = (
+    Expense.id,
+    Expense.amount,
+    Expense.merchant,
+    Expense.description,
+    Expense.transaction_date,
+    Expense.billing_date,
+    Expense.payment_method,
+    Expense.card_last_four,
+    Expense.category_id,
+    Category.name.label("category_name"),
+    Expense.auto_categorized,
+    Expense.confidence_score,
+    Expense.source_email,
+    Expense.created_at,
+    Expense.updated_at,
+)
+EXPORT_BATCH_SIZE = 1000
+
+
+@router.get("/export")
+async def export_expenses(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    category_id: int | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    merchant: str | None = None,
+    payment_method: PaymentMethod | None = None,
+    use_billing_date: bool = Query(
+        False, description="Filter by billing date instead of transaction date"
+    ),
+    merchant_search: Literal["contains", "similar"] = Query("contains"),
+):
+    """Export every matching expense as NDJSON or CSV.
 
-    if merchant:
-        query = query.filter(Expense.merchant.ilike(f"%{merchant}%"))
+    Takes the get_expenses filters without paging. Rows come from a single
+    server-side cursor and are written as they are fetched, so memory stays
+    flat and the export is one consistent snapshot however large it is.
+    """
+    query = _filter_expenses(
+        select(*EXPORT_COLUMNS).outerjoin(
+            Category, Expense.category_id == Category.id
+        ),
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        payment_method=payment_method,
+        use_billing_date=use_billing_date,
+        merchant_search=merchant_search,
+    )
 
-    expenses = (
-        query.order_by(desc(date_field)).offset(skip).limit(limit).all()
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(query, format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="expenses.{format}"'
+        },
     )
-    return expenses
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _export_rows(query, format: str):
+    # Like _recategorize_progress, the generator owns a sync session and is
+    # iterated in a thread. yield_per streams from a server-side cursor and
+    # each batch of rows is written out before the next one is fetched.
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if format == "csv":
+            writer.writerow(columns)
+
+        for rows in result.partitions():
+            for row in rows:
+                values = [_export_value(value) for value in row]
+                if format == "csv":
+                    writer.writerow(values)
+                else:
+                    row_dict = dict(zip(columns, values, strict=True))
+                    buffer.write(json.dumps(row_dict) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        # An empty CSV export still carries its header
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
 
 
 @router.get("/{expense_id}", response_model=ExpenseSchema)
-def get_expense(expense_id: int, db: Session = Depends(get_db)):
+async def get_expense(expense_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific expense."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await _get_expense(db, expense_id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     return expense
 
 
 @router.put("/{expense_id}", response_model=ExpenseSchema)
-def update_expense(
-    expense_id: int, expense_update: ExpenseUpdate, db: Session = Depends(get_db)
+async def update_expense(
+    expense_id: int,
+    expense_update: ExpenseUpdate,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update an expense."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
+    old_values = rollups.rollup_values(expense)
 
     # Update fields if provided
-    for field, value in expense_update.model_dump(exclude_unset=True).items():
+    updates = expense_update.model_dump(exclude_unset=True)
+    for field, value in updates.items():
         setattr(expense, field, value)
 
-    # Recalculate billing date if payment method or transaction date changed
-    if expense_update.payment_method or expense_update.transaction_date:
+    # Recalculate billing date if payment method, transaction date or card
+    # (whose billing cycle may differ) changed
+    if updates.keys() & {"payment_method", "transaction_date", "card_last_four"}:
+        await db.run_sync(billing_service.load_card_configs)
         expense.billing_date = billing_service.calculate_billing_date(
             expense.transaction_date,
             expense.payment_method,
@@ -142,37 +601,37 @@ def update_expense(
         expense.auto_categorized = False
         expense.confidence_score = None
 
-    db.commit()
-    db.refresh(expense)
-    return expense
+    new_values = rollups.rollup_values(expense)
+    if new_values != old_values:
+        await db.run_sync(_count_in_rollups, [old_values], -1)
+        await db.run_sync(_count_in_rollups, [new_values])
+
+    await db.commit()
+    return await _get_expense(db, expense_id)
 
 
 @router.delete("/{expense_id}")
-def delete_expense(expense_id: int, db: Session = Depends(get_db)):
+async def delete_expense(expense_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete an expense."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    db.delete(expense)
-    db.commit()
+    await db.run_sync(_count_in_rollups, [rollups.rollup_values(expense)], -1)
+    await db.delete(expense)
+    await db.commit()
     return {"message": "Expense deleted successfully"}
 
 
-# Enhanced webhook endpoint for n8n integration
-@router.post("/webhook", response_model=ExpenseSchema)
-def webhook_create_expense(
-    webhook_expense: WebhookExpense, db: Session = Depends(get_db)
-):
-    """Create expense from webhook with automatic payment method detection."""
-    
+def _resolve_webhook_expense(webhook_expense: WebhookExpense) -> ExpenseCreate:
+    """Fill in payment method and card digits from raw data when missing."""
     # Auto-detect payment method if not provided
     payment_method = webhook_expense.payment_method
     if not payment_method and webhook_expense.raw_data:
         payment_method = billing_service.detect_payment_method(
             webhook_expense.raw_data, webhook_expense.card_last_four
         )
-    
+
     # Extract card last four if not provided
     card_last_four = webhook_expense.card_last_four
     if not card_last_four and webhook_expense.raw_data:
@@ -180,7 +639,7 @@ def webhook_create_expense(
             webhook_expense.raw_data
         )
 
-    expense_create = ExpenseCreate(
+    return ExpenseCreate(
         amount=webhook_expense.amount,
         merchant=webhook_expense.merchant,
         description=webhook_expense.description,
@@ -191,87 +650,398 @@ def webhook_create_expense(
         raw_data=webhook_expense.raw_data,
     )
 
-    return create_expense(expense_create, db)
+
+# Enhanced webhook endpoint for n8n integration
+@router.post("/webhook", response_model=ExpenseSchema)
+async def webhook_create_expense(
+    webhook_expense: WebhookExpense, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create expense from webhook with automatic payment method detection.
+
+    Idempotent: a payload already received (same source email and raw
+    data, or without raw data the same source email, amount, date, merchant
+    and card) returns the expense it created.
+    """
+    expense = _resolve_webhook_expense(webhook_expense)
+    fingerprint = _fingerprint(expense)
+
+    if fingerprint is not None:
+        existing = await _find_fingerprints(db, [fingerprint])
+        if fingerprint in existing:
+            return await _get_expense(db, existing[fingerprint][0])
+
+    values = await _new_expense_values(db, expense)
+    values["fingerprint"] = fingerprint
+    inserted = (await db.execute(_insert_webhook_expenses(db).values(values))).first()
+    if inserted:
+        await db.run_sync(_count_in_rollups, [values])
+        await _enqueue_uncategorized(db, [{**values, "id": inserted.id}])
+    await db.commit()
+    if inserted:
+        categorization_queue.notify()
+        return await _get_expense(db, inserted.id)
+
+    # A concurrent delivery of the same payload inserted it first
+    existing = await _find_fingerprints(db, [fingerprint])
+    return await _get_expense(db, existing[fingerprint][0])
+
+
+async def _insert_batch_rows(
+    db: AsyncSession, rows: list[tuple[int, dict]]
+) -> dict[int, int]:
+    """Insert batch rows; map the index of each row inserted to its id."""
+    inserted = {}
+    keyed = {
+        values["fingerprint"]: index for index, values in rows if values["fingerprint"]
+    }
+    if keyed:
+        result = await db.execute(
+            _insert_webhook_expenses(db),
+            [values for _, values in rows if values["fingerprint"]],
+        )
+        inserted.update(
+            (keyed[fingerprint], expense_id) for fingerprint, expense_id in result
+        )
+
+    # Rows without a fingerprint always go in; ids come back in row order
+    unkeyed = [index for index, values in rows if not values["fingerprint"]]
+    if unkeyed:
+        result = await db.execute(
+            insert(Expense).returning(Expense.id, sort_by_parameter_order=True),
+            [values for _, values in rows if not values["fingerprint"]],
+        )
+        inserted.update(zip(unkeyed, result.scalars(), strict=True))
+    return inserted
+
+
+async def _count_inserted(
+    db: AsyncSession, rows: list[tuple[int, dict]], inserted: dict[int, int]
+) -> None:
+    """Count the batch rows that were inserted in the rollups, and queue them."""
+    inserted_rows = [
+        {**values, "id": inserted[index]} for index, values in rows if index in inserted
+    ]
+    await db.run_sync(_count_in_rollups, inserted_rows)
+    await _enqueue_uncategorized(db, inserted_rows)
+
+
+@router.post("/webhook/batch", response_model=WebhookBatchResult)
+async def webhook_create_expenses_batch(
+    webhook_expenses: list[WebhookExpense] = Body(..., max_length=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Create many webhook expenses in one request.
+
+    Rules are matched once per distinct merchant and all rows go in with a
+    single multi-row INSERT. If that fails, rows are retried one by one in
+    savepoints so a bad item only fails itself.
+    """
+    results = [
+        WebhookBatchItemResult(index=index, status="error")
+        for index in range(len(webhook_expenses))
+    ]
+
+    prepared: list[tuple[int, ExpenseCreate]] = []
+    for index, webhook_expense in enumerate(webhook_expenses):
+        try:
+            prepared.append((index, _resolve_webhook_expense(webhook_expense)))
+        except ValueError as e:
+            results[index].error = str(e)
+
+    return await _create_webhook_batch(db, prepared, results)
+
+
+async def _new_batch_rows(
+    db: AsyncSession,
+    prepared: list[tuple[int, ExpenseCreate]],
+    fingerprints: dict[int, str | None],
+    stored: dict[str, tuple[int, int | None]],
+) -> list[tuple[int, dict]]:
+    """
+    Categorize and bill the batch items to insert, as (index, values) rows.
+
+    Items whose fingerprint is stored already, or taken by an earlier item
+    of the batch, are left out.
+    """
+    new_items: list[tuple[int, ExpenseCreate]] = []
+    seen = set(stored)
+    for index, expense in prepared:
+        fingerprint = fingerprints[index]
+        if fingerprint is None or fingerprint not in seen:
+            seen.add(fingerprint)
+            new_items.append((index, expense))
+
+    await db.run_sync(billing_service.load_card_configs)
+    if _categorize_later():
+        # Items go in uncategorized and are queued once inserted
+        scores = {expense.merchant: (None, 0) for _, expense in new_items}
+    else:
+        rules = await db.run_sync(get_compiled_rules)
+        scores = await run_in_threadpool(
+            rules.match_many,
+            [expense.merchant for _, expense in new_items],
+            FUZZY_THRESHOLD,
+        )
+
+    rows: list[tuple[int, dict]] = []
+    for index, expense in new_items:
+        rule, confidence = scores[expense.merchant]
+        if rule:
+            values = _expense_values(expense, rule.category_id, True, confidence / 100.0)
+        else:
+            values = _expense_values(expense, None, False, None)
+        values["fingerprint"] = fingerprints[index]
+        rows.append((index, values))
+    return rows
+
+
+async def _insert_batch(
+    db: AsyncSession,
+    rows: list[tuple[int, dict]],
+    results: list[WebhookBatchItemResult],
+) -> dict[int, int]:
+    """
+    Insert batch rows and map the index of each row inserted to its id.
+
+    Rows missing from the map failed, with their error set in results, or
+    a concurrent request inserted the same payload first.
+    """
+    # Payloads are content-addressed, so committing them ahead of the rows
+    # is harmless and keeps them through the per-row fallback's rollback
+    await db.run_sync(raw_payloads.attach_raw_ids, [values for _, values in rows])
+    await db.commit()
+
+    try:
+        inserted = await _insert_batch_rows(db, rows)
+        await _count_inserted(db, rows, inserted)
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        inserted = {}
+        for index, values in rows:
+            try:
+                async with db.begin_nested():
+                    inserted.update(await _insert_batch_rows(db, [(index, values)]))
+            except SQLAlchemyError as e:
+                results[index].error = str(getattr(e, "orig", None) or e)
+        await _count_inserted(db, rows, inserted)
+        await db.commit()
+    return inserted
+
+
+async def _create_webhook_batch(
+    db: AsyncSession,
+    prepared: list[tuple[int, ExpenseCreate]],
+    results: list[WebhookBatchItemResult],
+) -> WebhookBatchResult:
+    """
+    Categorize and insert prepared batch items, filling in their results.
+
+    Items whose payload was already received, in an earlier request or
+    earlier in the batch, are reported as duplicates of that expense.
+    """
+    fingerprints = {index: _fingerprint(expense) for index, expense in prepared}
+    stored = await _find_fingerprints(
+        db, [fingerprint for fingerprint in fingerprints.values() if fingerprint]
+    )
+    rows = await _new_batch_rows(db, prepared, fingerprints, stored)
+    inserted = await _insert_batch(db, rows, results)
+    categorization_queue.notify()
+
+    values_by_index = dict(rows)
+    first_rows = {
+        values["fingerprint"]: index for index, values in rows if values["fingerprint"]
+    }
+    stored.update(
+        (fingerprint, (inserted[index], values_by_index[index]["category_id"]))
+        for fingerprint, index in first_rows.items()
+        if index in inserted
+    )
+    raced = [
+        fingerprint
+        for fingerprint, index in first_rows.items()
+        if index not in inserted and results[index].error is None
+    ]
+    if raced:
+        stored.update(await _find_fingerprints(db, raced))
+
+    for index, _ in prepared:
+        fingerprint = fingerprints[index]
+        if fingerprint is None:
+            # Not deduplicated: created, or its insert failed
+            if index in inserted:
+                results[index].status = "created"
+                results[index].expense_id = inserted[index]
+                results[index].category_id = values_by_index[index]["category_id"]
+            continue
+        if fingerprint not in stored:
+            # Its insert failed; a repeat in the batch shares the error
+            results[index].error = results[first_rows[fingerprint]].error
+            continue
+        expense_id, category_id = stored[fingerprint]
+        # Only the first item with a fingerprint was inserted
+        created = index in inserted
+        results[index].status = "created" if created else "duplicate"
+        results[index].expense_id = expense_id
+        results[index].category_id = category_id
+
+    created = sum(result.status == "created" for result in results)
+    duplicates = sum(result.status == "duplicate" for result in results)
+    return WebhookBatchResult(
+        created=created,
+        duplicates=duplicates,
+        failed=len(results) - created - duplicates,
+        results=results,
+    )
+
+
+@router.post("/import", response_model=StatementImportResult)
+async def import_statement(
+    file: UploadFile,
+    format: Literal["csv", "ofx"] | None = Query(
+        None, description="Statement format; guessed from the file name if omitted"
+    ),
+    payment_method: PaymentMethod | None = Query(
+        None, description="Payment method for rows that do not state one"
+    ),
+    card_last_four: str | None = Query(None, min_length=4, max_length=4),
+    encoding: str = Query("utf-8-sig", description="Text encoding of the file"),
+):
+    """
+    Import expenses from a bank statement export (CSV or OFX).
+
+    Rows are categorized and billed in batches and loaded with COPY, all in
+    one transaction; the response reports throughput and the rows that were
+    rejected. A file that fails partway (400) imports nothing.
+    """
+    if format is None:
+        filename = (file.filename or "").lower()
+        format = "ofx" if filename.endswith((".ofx", ".qfx")) else "csv"
+
+    # COPY needs the psycopg2 connection, so the import runs in a worker
+    # thread with its own sync session
+    def run_import():
+        lines = io.TextIOWrapper(file.file, encoding=encoding, newline="")
+        db = SessionLocal()
+        try:
+            return statements.import_statement(
+                db, lines, format, payment_method, card_last_four
+            )
+        finally:
+            db.close()
+
+    try:
+        return await run_in_threadpool(run_import)
+    except (ValueError, LookupError) as e:
+        # Unusable header, undecodable file or unknown encoding; the import
+        # is one transaction, so none of the file was imported
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.post("/webhook/raw", response_model=ExpenseSchema)
+async def webhook_create_expense_from_email(
+    email: RawEmailWebhook, db: AsyncSession = Depends(get_async_db)
+):
+    """Parse a raw Spanish bank notification email and create the expense."""
+    try:
+        webhook_expense = email_parser.parse_email(email.raw_data, email.source_email)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    return await webhook_create_expense(webhook_expense, db)
+
+
+@router.post("/webhook/raw/batch", response_model=WebhookBatchResult)
+async def webhook_create_expenses_from_emails(
+    emails: list[RawEmailWebhook] = Body(..., max_length=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Parse many raw notification emails and create them as one batch."""
+    results = [
+        WebhookBatchItemResult(index=index, status="error")
+        for index in range(len(emails))
+    ]
+
+    prepared: list[tuple[int, ExpenseCreate]] = []
+    for index, email in enumerate(emails):
+        try:
+            webhook_expense = email_parser.parse_email(
+                email.raw_data, email.source_email
+            )
+            prepared.append((index, _resolve_webhook_expense(webhook_expense)))
+        except ValueError as e:
+            results[index].error = str(e)
+
+    return await _create_webhook_batch(db, prepared, results)
 
 
 @router.post("/recategorize")
-def recategorize_expenses(db: Session = Depends(get_db)):
+async def recategorize_expenses(
+    chunk_size: int = Query(1000, ge=100, le=10000),
+    stream_progress: bool = Query(
+        False, description="Stream NDJSON progress lines, one per chunk"
+    ),
+):
     """Recategorize all uncategorized expenses."""
-    categorization_service = ExpenseCategorizationService(db)
-    result = categorization_service.bulk_recategorize()
-    return result
+    if stream_progress:
+        return StreamingResponse(
+            _recategorize_progress(chunk_size), media_type="application/x-ndjson"
+        )
+
+    # A whole-table run would hold the event loop for its duration, so it
+    # runs in a worker thread with its own sync session
+    def run_recategorize():
+        db = SessionLocal()
+        try:
+            return ExpenseCategorizationService(db).bulk_recategorize(chunk_size)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(run_recategorize)
+
+
+def _recategorize_progress(chunk_size: int):
+    # The request-scoped session is closed before a streamed body is sent,
+    # so the generator owns a sync session; Starlette iterates it in a thread.
+    db = SessionLocal()
+    try:
+        service = ExpenseCategorizationService(db)
+        progress = {"processed": 0, "total_expenses": 0, "categorized": 0}
+        for progress in service.iter_recategorize(chunk_size):
+            yield json.dumps(progress) + "\n"
+        yield json.dumps({**progress, "done": True}) + "\n"
+    finally:
+        db.close()
 
 
 @router.get("/analytics/summary", response_model=ExpenseSummary)
-def get_expense_summary(
+async def get_expense_summary(
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     use_billing_date: bool = Query(
         False, description="Use billing date for analysis"
     ),
     payment_method: PaymentMethod | None = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get expense analytics summary with billing date support."""
-    query = db.query(Expense)
-
-    # Choose between transaction date and billing date for analysis
-    date_field = (
-        Expense.billing_date if use_billing_date else Expense.transaction_date
-    )
-
-    if start_date:
-        query = query.filter(date_field >= start_date)
-
-    if end_date:
-        query = query.filter(date_field <= end_date)
-
-    if payment_method:
-        query = query.filter(Expense.payment_method == payment_method)
-
-    expenses = query.all()
-
-    if not expenses:
-        return ExpenseSummary(
-            total_amount=0.0, transaction_count=0, average_amount=0.0, categories={}
-        )
-
-    total_amount = sum(exp.amount for exp in expenses)
-    transaction_count = len(expenses)
-    average_amount = total_amount / transaction_count
-
-    # Group by categories
-    categories = {}
-    for expense in expenses:
-        if expense.category:
-            cat_name = expense.category.name
-            categories[cat_name] = categories.get(cat_name, 0) + expense.amount
-
-    return ExpenseSummary(
-        total_amount=total_amount,
-        transaction_count=transaction_count,
-        average_amount=average_amount,
-        categories=categories,
+    return await db.run_sync(
+        analytics.expense_summary,
+        start_date,
+        end_date,
+        use_billing_date,
+        payment_method,
     )
 
 
 @router.get("/analytics/billing-summary")
-def get_billing_summary(
+async def get_billing_summary(
     start_date: datetime | None = None,
     end_date: datetime | None = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get billing summary by payment method."""
-    query = db.query(Expense)
-
-    if start_date:
-        query = query.filter(Expense.transaction_date >= start_date)
-
-    if end_date:
-        query = query.filter(Expense.transaction_date <= end_date)
-
-    expenses = query.all()
-    
-    return billing_service.get_billing_summary(
-        expenses, start_date or datetime.min, end_date or datetime.max
+    return await db.run_sync(
+        billing_service.get_billing_summary_from_db, start_date, end_date
     )
@@ -1,17 +1,45 @@
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException, Query
+from database import get_async_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from models import MerchantRule
+from pydantic import TypeAdapter
 from schemas import MerchantRule as MerchantRuleSchema
 from schemas import MerchantRuleCreate, MerchantRuleUpdate
-from sqlalchemy.orm import Session
+from services.categorization import (
+    FUZZY_THRESHOLD,
+    CompiledRuleSet,
+    invalidate_rule_cache,
+)
+from services.response_cache import cached_response, merchant_rules_cache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 router = APIRouter(prefix="/merchant-rules", tags=["merchant-rules"])
 
+_rule_list = TypeAdapter(list[MerchantRuleSchema])
+
+
+def _invalidate_rule_reads() -> None:
+    invalidate_rule_cache()
+    merchant_rules_cache.bump()
+
+
+async def _get_rule(db: AsyncSession, rule_id: int) -> MerchantRule | None:
+    """Load a rule with its category, refreshing any stale copy in the session."""
+    return await db.scalar(
+        select(MerchantRule)
+        .options(selectinload(MerchantRule.category))
+        .where(MerchantRule.id == rule_id)
+        .execution_options(populate_existing=True)
+    )
+
 
 @router.post("/",
              response_model=MerchantRuleSchema,
              operation_id="create_merchant_rule")
-def create_merchant_rule(rule: MerchantRuleCreate, db: Session = Depends(get_db)):
+async def create_merchant_rule(
+    rule: MerchantRuleCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Create a new merchant rule for expense categorization."""
     db_rule = MerchantRule(
         merchant_pattern=rule.merchant_pattern,
@@ -22,38 +50,55 @@ def create_merchant_rule(rule: MerchantRuleCreate, db: Session = Depends(get_db)
     )
 
     db.add(db_rule)
-    db.commit()
-    db.refresh(db_rule)
-    return db_rule
+    await db.commit()
+    _invalidate_rule_reads()
+    return await _get_rule(db, db_rule.id)
 
 
-@router.get("/", response_model=list[MerchantRuleSchema])
-def get_merchant_rules(active_only: bool = Query(False), db: Session = Depends(get_db)):
-    """Get all merchant rules."""
-    query = db.query(MerchantRule)
+@router.get("/", response_model=list[MerchantRuleSchema],
+            operation_id="get_merchant_rules")
+async def get_merchant_rules(
+    request: Request,
+    active_only: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get all merchant rules.
+
+    Served from the serialized cache with an ETag; If-None-Match gets a 304.
+    """
+    cached = merchant_rules_cache.get(active_only)
+    if cached is None:
+        version = merchant_rules_cache.version
+        query = select(MerchantRule).options(selectinload(MerchantRule.category))
 
-    if active_only:
-        query = query.filter(MerchantRule.is_active == True)  # noqa: E712
+        if active_only:
+            query = query.where(MerchantRule.is_active == True)  # noqa: E712
 
-    rules = query.order_by(MerchantRule.priority.desc()).all()
-    return rules
+        rules = await db.scalars(query.order_by(MerchantRule.priority.desc()))
+        body = _rule_list.dump_json(
+            _rule_list.validate_python(rules.all(), from_attributes=True)
+        )
+        cached = merchant_rules_cache.put(version, body, active_only)
+    return cached_response(request, cached)
 
 
 @router.get("/{rule_id}", response_model=MerchantRuleSchema)
-def get_merchant_rule(rule_id: int, db: Session = Depends(get_db)):
+async def get_merchant_rule(rule_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific merchant rule by ID."""
-    rule = db.query(MerchantRule).filter(MerchantRule.id == rule_id).first()
+    rule = await _get_rule(db, rule_id)
     if not rule:
         raise HTTPException(status_code=404, detail="Merchant rule not found")
     return rule
 
 
 @router.put("/{rule_id}", response_model=MerchantRuleSchema)
-def update_merchant_rule(
-    rule_id: int, rule_update: MerchantRuleUpdate, db: Session = Depends(get_db)
+async def update_merchant_rule(
+    rule_id: int,
+    rule_update: MerchantRuleUpdate,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update a merchant rule."""
-    rule = db.query(MerchantRule).filter(MerchantRule.id == rule_id).first()
+    rule = await db.get(MerchantRule, rule_id)
     if not rule:
         raise HTTPException(status_code=404, detail="Merchant rule not found")
 
@@ -61,37 +106,40 @@ def update_merchant_rule(
     for field, value in rule_update.model_dump(exclude_unset=True).items():
         setattr(rule, field, value)
 
-    db.commit()
-    db.refresh(rule)
-    return rule
+    await db.commit()
+    _invalidate_rule_reads()
+    return await _get_rule(db, rule_id)
 
 
 @router.delete("/{rule_id}")
-def delete_merchant_rule(rule_id: int, db: Session = Depends(get_db)):
+async def delete_merchant_rule(
+    rule_id: int, db: AsyncSession = Depends(get_async_db)
+):
     """Delete a merchant rule."""
-    rule = db.query(MerchantRule).filter(MerchantRule.id == rule_id).first()
+    rule = await db.get(MerchantRule, rule_id)
     if not rule:
         raise HTTPException(status_code=404, detail="Merchant rule not found")
 
-    db.delete(rule)
-    db.commit()
+    await db.delete(rule)
+    await db.commit()
+    _invalidate_rule_reads()
     return {"message": "Merchant rule deleted successfully"}
 
 
 @router.post("/test-rule")
-def test_merchant_rule(
-    merchant: str, pattern: str, is_regex: bool = False, db: Session = Depends(get_db)
-):
+async def test_merchant_rule(merchant: str, pattern: str, is_regex: bool = False):
     """Test a merchant rule pattern against a merchant name."""
-    from services.categorization import ExpenseCategorizationService
-
-    service = ExpenseCategorizationService(db)
-    confidence = service._calculate_match_confidence(merchant, pattern, is_regex)
+    # Scored exactly as categorization scores rules; a zero threshold
+    # reports the confidence even when it is too low to match
+    rules = CompiledRuleSet.from_rules(
+        [MerchantRule(merchant_pattern=pattern, is_regex=is_regex)]
+    )
+    _, confidence = rules.match(merchant, threshold=0)
 
     return {
         "merchant": merchant,
         "pattern": pattern,
         "is_regex": is_regex,
         "confidence": confidence / 100.0,
-        "matches": confidence >= service.fuzzy_threshold,
+        "matches": confidence >= FUZZY_THRESHOLD,
     }
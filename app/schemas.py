@@ -1,6 +1,7 @@
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from models import PaymentMethod
 
 
@@ -86,11 +87,11 @@ class ExpenseUpdate(BaseModel):
     billing_date: datetime | None = None
 
 
-class Expense(ExpenseBase):
+# Expense as listed: raw_data (the original email) is left out of list queries
+class ExpenseListItem(ExpenseBase):
     id: int
     billing_date: datetime  # When expense affects budget
     source_email: str | None
-    raw_data: str | None
     auto_categorized: bool
     confidence_score: float | None
     created_at: datetime
@@ -101,6 +102,31 @@ class Expense(ExpenseBase):
         from_attributes = True
 
 
+class Expense(ExpenseListItem):
+    raw_data: str | None
+
+
+class ExpensePage(BaseModel):
+    items: list[ExpenseListItem]
+    next_cursor: str | None  # Pass back as ?cursor= to fetch the next page
+
+
+# Small rows for the MCP get_expenses_compact tool
+class ExpenseCompact(BaseModel):
+    id: int
+    amount: float
+    merchant: str
+    transaction_date: datetime
+    billing_date: datetime
+    payment_method: PaymentMethod
+    category: str | None  # Category name
+
+
+class ExpenseCompactPage(BaseModel):
+    items: list[ExpenseCompact]
+    next_cursor: str | None
+
+
 # Webhook schema for n8n integration
 class WebhookExpense(BaseModel):
     amount: float = Field(..., gt=0)
@@ -113,6 +139,41 @@ class WebhookExpense(BaseModel):
     card_last_four: str | None = Field(None, max_length=4, min_length=4)
 
 
+class RawEmailWebhook(BaseModel):
+    raw_data: str = Field(..., min_length=1)  # Notification email text
+    source_email: str | None = Field(None, max_length=255)
+
+
+class WebhookBatchItemResult(BaseModel):
+    index: int  # Position of the item in the submitted batch
+    status: str  # "created", "duplicate" (already received) or "error"
+    expense_id: int | None = None
+    category_id: int | None = None
+    error: str | None = None
+
+
+class WebhookBatchResult(BaseModel):
+    created: int
+    duplicates: int = 0  # Payloads already received; not inserted again
+    failed: int
+    results: list[WebhookBatchItemResult]
+
+
+# Bank statement import schemas
+class StatementRejectedRow(BaseModel):
+    line: int  # Line of the statement where the row starts
+    reason: str
+
+
+class StatementImportResult(BaseModel):
+    format: str  # "csv" or "ofx"
+    imported: int
+    rejected: int
+    rejected_rows: list[StatementRejectedRow]  # Only the first 100 are listed
+    elapsed_seconds: float
+    rows_per_second: float
+
+
 # Analytics schemas
 class ExpenseSummary(BaseModel):
     total_amount: float
@@ -134,3 +195,26 @@ class BillingConfig(BaseModel):
         default=15, ge=1, le=31
     )  # Day of month for credit card billing
     timezone: str = Field(default="America/New_York")  # For date calculations
+
+    @field_validator("timezone")
+    @classmethod
+    def timezone_exists(cls, value: str) -> str:
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone: {value}") from None
+        return value
+
+
+class CardBillingConfig(BillingConfig):
+    card_last_four: str
+    created_at: datetime
+    updated_at: datetime | None
+
+    class Config:
+        from_attributes = True
+
+
+class CardBillingConfigResult(BaseModel):
+    config: CardBillingConfig | None  # None once the card's config is deleted
+    updated_expenses: int  # Credit card expenses whose billing date was recomputed
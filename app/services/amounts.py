@@ -0,0 +1,39 @@
+"""
+Amount parsing shared by the email parser and statement import
+"""
+import re
+
+_CURRENCY_RE = re.compile(r"[^\d,.\-]")
+
+
+def parse_amount(text: str) -> float:
+    """
+    Parse an amount such as "$12.345", "12.345,67" or "-1,234.50".
+
+    The last separator is the decimal one when both appear. A lone separator
+    followed by exactly three digits groups thousands (CLP amounts), unless
+    no units precede it ("0.500" and ".500" are half a unit).
+    """
+    cleaned = _CURRENCY_RE.sub("", text.strip())
+    if not cleaned or cleaned == "-":
+        raise ValueError(f"Invalid amount: {text!r}")
+
+    if "," in cleaned and "." in cleaned:
+        decimal = "," if cleaned.rfind(",") > cleaned.rfind(".") else "."
+    else:
+        separator = "," if "," in cleaned else "."
+        groups = cleaned.split(separator)
+        grouped = len(groups) > 2 or (
+            len(groups[-1]) == 3 and groups[0].lstrip("-") not in ("", "0")
+        )
+        decimal = None if grouped else separator
+
+    if decimal is None:
+        cleaned = cleaned.replace(",", "").replace(".", "")
+    else:
+        thousands = "." if decimal == "," else ","
+        cleaned = cleaned.replace(thousands, "").replace(decimal, ".")
+    try:
+        return float(cleaned)
+    except ValueError:
+        raise ValueError(f"Invalid amount: {text!r}") from None
@@ -0,0 +1,113 @@
+"""
+Aggregate queries behind the analytics endpoints
+"""
+from datetime import datetime
+
+from models import Category, DateBasis, Expense, MonthlyRollup, PaymentMethod
+from schemas import ExpenseSummary
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from services.rollups import month_aligned_range, rollup_filters
+
+
+def expense_filters(
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    use_billing_date: bool = False,
+    payment_method: PaymentMethod | None = None,
+) -> list:
+    """WHERE clauses shared by the analytics queries."""
+    # Choose between transaction date and billing date for analysis
+    date_field = Expense.billing_date if use_billing_date else Expense.transaction_date
+
+    filters = []
+    if start_date:
+        filters.append(date_field >= start_date)
+    if end_date:
+        filters.append(date_field <= end_date)
+    if payment_method:
+        filters.append(Expense.payment_method == payment_method)
+    return filters
+
+
+def expense_summary(
+    db: Session,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    use_billing_date: bool = False,
+    payment_method: PaymentMethod | None = None,
+) -> ExpenseSummary:
+    """Totals and per-category amounts computed with SUM/COUNT/GROUP BY."""
+    months = month_aligned_range(start_date, end_date)
+    if months is not None:
+        basis = DateBasis.BILLING if use_billing_date else DateBasis.TRANSACTION
+        return _summary_from_rollups(db, basis, *months, payment_method)
+
+    filters = expense_filters(start_date, end_date, use_billing_date, payment_method)
+
+    total_amount, transaction_count = db.execute(
+        select(
+            func.coalesce(func.sum(Expense.amount), 0.0), func.count(Expense.id)
+        ).where(*filters)
+    ).one()
+
+    if not transaction_count:
+        return ExpenseSummary(
+            total_amount=0.0, transaction_count=0, average_amount=0.0, categories={}
+        )
+
+    categories = dict(
+        db.execute(
+            select(Category.name, func.sum(Expense.amount))
+            .join(Category, Expense.category_id == Category.id)
+            .where(*filters)
+            .group_by(Category.name)
+        ).all()
+    )
+
+    return ExpenseSummary(
+        total_amount=total_amount,
+        transaction_count=transaction_count,
+        average_amount=total_amount / transaction_count,
+        categories=categories,
+    )
+
+
+def _summary_from_rollups(
+    db: Session,
+    date_basis: DateBasis,
+    first_month=None,
+    last_month=None,
+    payment_method: PaymentMethod | None = None,
+) -> ExpenseSummary:
+    """expense_summary for whole months, read from monthly_rollups."""
+    filters = rollup_filters(date_basis, first_month, last_month, payment_method)
+
+    total_amount, transaction_count = db.execute(
+        select(
+            func.coalesce(func.sum(MonthlyRollup.total_amount), 0.0),
+            func.coalesce(func.sum(MonthlyRollup.transaction_count), 0),
+        ).where(*filters)
+    ).one()
+
+    if not transaction_count:
+        return ExpenseSummary(
+            total_amount=0.0, transaction_count=0, average_amount=0.0, categories={}
+        )
+
+    categories = dict(
+        db.execute(
+            select(Category.name, func.sum(MonthlyRollup.total_amount))
+            .join(Category, MonthlyRollup.category_id == Category.id)
+            .where(*filters, MonthlyRollup.transaction_count > 0)
+            .group_by(Category.name)
+        ).all()
+    )
+
+    return ExpenseSummary(
+        total_amount=total_amount,
+        transaction_count=transaction_count,
+        average_amount=total_amount / transaction_count,
+        categories=categories,
+    )
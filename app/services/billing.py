@@ -1,37 +1,196 @@
 """
 Billing logic for different payment methods
 """
-from datetime import datetime
 from calendar import monthrange
+from datetime import datetime
+import os
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+from models import CardBillingConfig, DateBasis, Expense, MonthlyRollup, PaymentMethod
+from sqlalchemy import (
+    Integer,
+    String,
+    case,
+    cast,
+    extract,
+    func,
+    literal,
+    literal_column,
+    select,
+    update,
+)
+
+from services import email_parser, rollups
+from services.rollups import month_aligned_range, rollup_filters
+
+# Seconds before the per-card billing configs are reloaded even without an
+# explicit invalidation. Changes made in other worker processes are only
+# picked up this way.
+CARD_BILLING_CACHE_TTL = float(os.getenv("CARD_BILLING_CACHE_TTL", "300"))
+
+
+def _billing_date_sql(transaction_date, billing_day: int, timezone, dialect_name):
+    """
+    SQL version of calculate_billing_date for credit card charges.
+
+    Same rule as _next_billing_cycle: the billing day of the transaction's
+    month (clamped to the month's length) unless the transaction is on or
+    after it, then the next month's; the time of day is kept. SQLite stores
+    naive datetimes, so the timezone only applies on Postgres.
+    """
+    if dialect_name == "sqlite":
+
+        def days_in(month):
+            return cast(func.strftime("%d", month, "+1 month", "-1 day"), Integer)
+
+        month = func.date(transaction_date, "start of month")
+        cycle = case(
+            (
+                cast(func.strftime("%d", transaction_date), Integer)
+                >= func.min(billing_day, days_in(month)),
+                func.date(month, "+1 month"),
+            ),
+            else_=month,
+        )
+        offset = func.min(billing_day, days_in(cycle)) - 1
+        # Stored as "YYYY-MM-DD HH:MM:SS.ffffff": new date, same time
+        return func.date(
+            cycle, literal("+") + cast(offset, String) + literal(" days")
+        ).op("||")(func.substr(transaction_date, 11))
+
+    one_month = literal_column("interval '1 month'")
+    one_day = literal_column("interval '1 day'")
 
-from models import PaymentMethod
+    def days_in(month):
+        return extract("day", month + one_month - one_day)
+
+    local = (
+        func.timezone(literal(timezone), transaction_date)
+        if timezone
+        else transaction_date
+    )
+    month = func.date_trunc("month", local)
+    cycle = case(
+        (
+            extract("day", local) >= func.least(billing_day, days_in(month)),
+            month + one_month,
+        ),
+        else_=month,
+    )
+    offset = cast(func.least(billing_day, days_in(cycle)) - 1, Integer)
+    billing_date = cycle + offset * one_day + (local - func.date_trunc("day", local))
+    if timezone:
+        # Local wall time back to a timestamptz
+        return func.timezone(literal(timezone), billing_date)
+    return billing_date
 
 
 class SimpleBillingService:
     def __init__(self, credit_card_billing_day: int = 25):
         self.credit_card_billing_day = credit_card_billing_day
 
+        # card_last_four -> (billing day, timezone) from card_billing_configs
+        self._card_configs: dict[str, tuple[int, str]] = {}
+        # False until the first load: billing dates computed before it would
+        # silently use the default cycle for every card
+        self._card_configs_loaded = False
+        self._card_configs_loaded_at: float | None = None
+        self._card_configs_generation = 0
+        self._card_configs_lock = threading.Lock()
+
+    def load_card_configs(self, db) -> dict[str, tuple[int, str]]:
+        """
+        Per-card billing cycles, cached in memory.
+
+        Call it (through run_sync from async code) before
+        calculate_billing_date, which only looks cards up in the cache and
+        raises if it was never loaded. The table is read again after
+        CARD_BILLING_CACHE_TTL seconds or an invalidate_card_configs().
+        """
+        loaded_at = self._card_configs_loaded_at
+        if loaded_at is not None and (
+            CARD_BILLING_CACHE_TTL <= 0
+            or time.monotonic() - loaded_at < CARD_BILLING_CACHE_TTL
+        ):
+            return self._card_configs
+
+        generation = self._card_configs_generation
+        configs = {
+            card: (billing_day, timezone)
+            for card, billing_day, timezone in db.execute(
+                select(
+                    CardBillingConfig.card_last_four,
+                    CardBillingConfig.credit_card_billing_day,
+                    CardBillingConfig.timezone,
+                )
+            )
+        }
+        with self._card_configs_lock:
+            # A config written while loading must not be hidden by this copy
+            if generation == self._card_configs_generation:
+                self._card_configs = configs
+                self._card_configs_loaded_at = time.monotonic()
+            elif not self._card_configs_loaded:
+                # Nothing older to keep; loaded_at stays unset, so the next
+                # call reads the table again
+                self._card_configs = configs
+            self._card_configs_loaded = True
+        return configs
+
+    def invalidate_card_configs(self) -> None:
+        """Reload the per-card configs on the next load_card_configs()."""
+        with self._card_configs_lock:
+            self._card_configs_loaded_at = None
+            self._card_configs_generation += 1
+
+    def billing_cycle(self, card_last_four=None) -> tuple[int, str | None]:
+        """Billing day and timezone of a card (service default without config)"""
+        if not self._card_configs_loaded:
+            raise RuntimeError(
+                "Per-card billing configs are not loaded; call "
+                "load_card_configs(db) before calculating billing dates"
+            )
+        return self._card_configs.get(
+            card_last_four, (self.credit_card_billing_day, None)
+        )
+
     def calculate_billing_date(
         self, transaction_date, payment_method, card_last_four=None
     ):
         """Calculate when expense affects budget"""
         if payment_method == PaymentMethod.CREDIT_CARD:
-            return self._next_billing_cycle(transaction_date)
+            billing_day, timezone = self.billing_cycle(card_last_four)
+            if timezone and transaction_date.tzinfo is not None:
+                # The cycle closes at midnight in the card's timezone
+                transaction_date = transaction_date.astimezone(ZoneInfo(timezone))
+            return self._next_billing_cycle(transaction_date, billing_day)
         else:
             return transaction_date  # Immediate
 
-    def _next_billing_cycle(self, transaction_date):
-        """Credit card billing logic - 25th of each month"""
+    def detect_payment_method(self, raw_data, card_last_four=None):
+        """Payment method from the wording of a bank notification email"""
+        # Masked card digits alone do not tell credit from debit, so only
+        # the wording is used
+        return email_parser.detect_payment_method(raw_data)
+
+    def extract_card_last_four(self, raw_data):
+        """Card digits (****1234) from a bank notification email"""
+        return email_parser.extract_card_last_four(raw_data)
+
+    def _next_billing_cycle(self, transaction_date, billing_day=None):
+        """Credit card billing logic - billing day (25th) of each month"""
+        if billing_day is None:
+            billing_day = self.credit_card_billing_day
         year = transaction_date.year
         month = transaction_date.month
         day = transaction_date.day
 
         # Get the billing day for current month (handle month-end edge cases)
-        billing_day = min(
-            self.credit_card_billing_day, monthrange(year, month)[1]
-        )
+        cycle_day = min(billing_day, monthrange(year, month)[1])
 
-        if day >= billing_day:
+        if day >= cycle_day:
             # Transaction on/after 25th → next month's billing (25th)
             if month == 12:
                 next_year = year + 1
@@ -42,7 +201,7 @@ class SimpleBillingService:
 
             # Get billing day for next month (handle February edge case)
             next_billing_day = min(
-                self.credit_card_billing_day, 
+                billing_day,
                 monthrange(next_year, next_month)[1]
             )
 
@@ -61,7 +220,7 @@ class SimpleBillingService:
             return datetime(
                 year,
                 month,
-                billing_day,
+                cycle_day,
                 transaction_date.hour,
                 transaction_date.minute,
                 transaction_date.second,
@@ -69,8 +228,51 @@ class SimpleBillingService:
                 transaction_date.tzinfo,
             )
 
-    def get_billing_summary(self, expenses, start_date=None, end_date=None):
-        """Analytics by payment method"""
+    def recompute_billing_dates(self, db, card_last_four: str) -> int:
+        """
+        Recompute the billing date of a card's credit card expenses.
+
+        One UPDATE computes the dates in SQL from the card's current config
+        (read from the database, not the cache), and BILLING rollups are
+        moved with them: the expenses are taken out before the UPDATE and
+        counted again after it. Returns the number of expenses updated.
+        """
+        config = db.execute(
+            select(
+                CardBillingConfig.credit_card_billing_day,
+                CardBillingConfig.timezone,
+            ).where(CardBillingConfig.card_last_four == card_last_four)
+        ).one_or_none()
+        billing_day, timezone = config or (self.credit_card_billing_day, None)
+
+        filters = [
+            Expense.payment_method == PaymentMethod.CREDIT_CARD,
+            Expense.card_last_four == card_last_four,
+        ]
+        rollups.apply_expense_rollups(db, DateBasis.BILLING, filters, -1)
+        result = db.execute(
+            update(Expense)
+            .where(*filters)
+            .values(
+                billing_date=_billing_date_sql(
+                    Expense.transaction_date,
+                    billing_day,
+                    timezone,
+                    db.get_bind().dialect.name,
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rollups.apply_expense_rollups(db, DateBasis.BILLING, filters)
+        return result.rowcount
+
+    def get_billing_summary_from_db(self, db, start_date=None, end_date=None):
+        """Analytics by payment method, aggregated by the database
+
+        Count and amount per payment method, filtered on transaction date,
+        and the credit card amount not billed yet. Whole-month ranges are
+        read from monthly_rollups.
+        """
         summary = {
             "CREDIT_CARD": {"count": 0, "amount": 0, "pending_billing": 0},
             "DEBIT_CARD": {"count": 0, "amount": 0},
@@ -79,29 +281,70 @@ class SimpleBillingService:
             "total": {"count": 0, "amount": 0},
         }
 
-        from datetime import timezone
-        now = datetime.now(timezone.utc)
+        months = month_aligned_range(start_date, end_date)
+        if months is not None:
+            return self._billing_summary_from_rollups(
+                db, summary, start_date, end_date, *months
+            )
+
+        query = select(
+            Expense.payment_method,
+            func.count(Expense.id),
+            func.sum(Expense.amount),
+            # Charges not billed yet (billing date still in the future)
+            func.sum(Expense.amount).filter(Expense.billing_date > func.now()),
+        ).group_by(Expense.payment_method)
 
-        for expense in expenses:
-            payment_method = expense.payment_method.value
-            amount = expense.amount
+        if start_date:
+            query = query.where(Expense.transaction_date >= start_date)
+        if end_date:
+            query = query.where(Expense.transaction_date <= end_date)
 
-            # Update totals
-            summary["total"]["count"] += 1
+        for payment_method, count, amount, pending in db.execute(query):
+            summary["total"]["count"] += count
             summary["total"]["amount"] += amount
 
-            # Update payment method specific counts
-            if payment_method in summary:
-                summary[payment_method]["count"] += 1
-                summary[payment_method]["amount"] += amount
-
-                # For credit cards, track pending billing 
-                # (charges after next 25th)
-                if (
-                    payment_method == "CREDIT_CARD"
-                    and expense.billing_date > now
-                ):
-                    summary["CREDIT_CARD"]["pending_billing"] += amount
+            method_summary = summary[payment_method.value]
+            method_summary["count"] = count
+            method_summary["amount"] = amount
+            if payment_method == PaymentMethod.CREDIT_CARD:
+                method_summary["pending_billing"] = pending or 0
+
+        return summary
+
+    def _billing_summary_from_rollups(
+        self, db, summary, start_date, end_date, first_month, last_month
+    ):
+        """get_billing_summary_from_db for whole months, using monthly_rollups"""
+        query = select(
+            MonthlyRollup.payment_method,
+            func.sum(MonthlyRollup.transaction_count),
+            func.sum(MonthlyRollup.total_amount),
+        ).where(
+            *rollup_filters(DateBasis.TRANSACTION, first_month, last_month)
+        ).group_by(MonthlyRollup.payment_method)
+
+        for payment_method, count, amount in db.execute(query):
+            if not count:
+                continue
+            summary["total"]["count"] += count
+            summary["total"]["amount"] += amount
+
+            method_summary = summary[payment_method.value]
+            method_summary["count"] = count
+            method_summary["amount"] = amount
+
+        # Pending depends on the current time, so it cannot be rolled up;
+        # only credit card charges with a future billing date are read
+        pending = select(func.sum(Expense.amount)).where(
+            Expense.payment_method == PaymentMethod.CREDIT_CARD,
+            Expense.billing_date > func.now(),
+        )
+        if start_date:
+            pending = pending.where(Expense.transaction_date >= start_date)
+        if end_date:
+            pending = pending.where(Expense.transaction_date <= end_date)
+        summary["CREDIT_CARD"]["pending_billing"] = db.scalar(pending) or 0
 
         return summary
 
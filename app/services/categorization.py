@@ -1,43 +1,109 @@
+from collections import deque
+from dataclasses import dataclass
+import os
 import re
+import threading
+import time
 
 from fuzzywuzzy import fuzz
-from models import MerchantRule
+from metrics import timed
+from models import Expense, MerchantRule
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
+from services import rollups
 
-class ExpenseCategorizationService:
-    """Service for automatically categorizing expenses using merchant rules."""
+# Seconds before the compiled rule set is reloaded even without an explicit
+# invalidation. Writes in other worker processes are only picked up this way.
+RULE_CACHE_TTL = float(os.getenv("MERCHANT_RULE_CACHE_TTL", "300"))
+# Distinct merchants whose match a recategorize run remembers across chunks;
+# past this the memo starts over, so memory stays bounded on large tables
+MERCHANT_SCORE_CACHE_SIZE = 10_000
+# Lowest rule score (0-100) that categorizes an expense
+FUZZY_THRESHOLD = 80
 
-    def __init__(self, db: Session, fuzzy_threshold: int = 80):
-        self.db = db
-        self.fuzzy_threshold = fuzzy_threshold
 
-    def categorize_expense(
-        self, merchant: str
-    ) -> tuple[int | None, bool, float | None]:
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    """A merchant rule prepared for matching (lowercased / precompiled)."""
+
+    rule_id: int
+    category_id: int
+    pattern: str  # Lowercased fuzzy pattern (original pattern for regex rules)
+    regex: re.Pattern | None = None
+
+
+class CompiledRuleSet:
+    """Active merchant rules in priority order, ready to match merchants."""
+
+    def __init__(self, rules: list[CompiledRule]):
+        self.rules = rules
+
+    @classmethod
+    def from_rules(cls, rules) -> "CompiledRuleSet":
         """
-        Categorize an expense based on merchant name.
+        Build a rule set from MerchantRule rows already ordered by priority.
 
-        Returns:
-            Tuple of (category_id, auto_categorized, confidence_score)
+        Invalid regex patterns can never match, so they are dropped here
+        instead of failing on every categorization.
         """
-        # Get all active merchant rules ordered by priority
-        rules = (
-            self.db.query(MerchantRule)
-            .filter(MerchantRule.is_active == True)  # noqa: E712
-            .order_by(MerchantRule.priority.desc())
-            .all()
-        )
+        compiled = []
+        for rule in rules:
+            if rule.is_regex:
+                try:
+                    regex = re.compile(rule.merchant_pattern, re.IGNORECASE)
+                except re.error:
+                    continue
+                compiled.append(
+                    CompiledRule(
+                        rule.id, rule.category_id, rule.merchant_pattern, regex
+                    )
+                )
+            else:
+                compiled.append(
+                    CompiledRule(
+                        rule.id, rule.category_id, rule.merchant_pattern.lower()
+                    )
+                )
+        return cls(compiled)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(
+        self, merchant: str, threshold: float
+    ) -> tuple[CompiledRule | None, float]:
+        """
+        Find the best rule for a merchant.
+
+        Same semantics as scoring every rule in priority order: a rule wins if
+        it beats the current best and the threshold, and a score of 95 or more
+        stops the scan. Fuzzy rules whose length alone caps their score below
+        that bar are skipped without computing the ratio.
+        """
+        merchant_lower = merchant.lower()
+        merchant_len = len(merchant_lower)
 
         best_match = None
         best_confidence = 0.0
 
-        for rule in rules:
-            confidence = self._calculate_match_confidence(
-                merchant, rule.merchant_pattern, rule.is_regex
-            )
+        for rule in self.rules:
+            if rule.regex is not None:
+                if not rule.regex.search(merchant):
+                    continue
+                confidence = 100.0
+            else:
+                pattern_len = len(rule.pattern)
+                total_len = merchant_len + pattern_len
+                if not total_len:
+                    continue
+                # ratio() can never exceed 2 * min(len) / (len1 + len2)
+                upper_bound = round(200 * min(merchant_len, pattern_len) / total_len)
+                if upper_bound < threshold or upper_bound <= best_confidence:
+                    continue
+                confidence = float(fuzz.ratio(merchant_lower, rule.pattern))
 
-            if confidence > best_confidence and confidence >= self.fuzzy_threshold:
+            if confidence > best_confidence and confidence >= threshold:
                 best_match = rule
                 best_confidence = confidence
 
@@ -45,27 +111,102 @@ class ExpenseCategorizationService:
                 if confidence >= 95:
                     break
 
-        if best_match:
-            return best_match.category_id, True, best_confidence / 100.0
+        return best_match, best_confidence
+
+    def match_many(
+        self, merchants, threshold: float
+    ) -> dict[str, tuple[CompiledRule | None, float]]:
+        """Score each distinct merchant once against the whole rule set."""
+        with timed("categorization"):
+            return {
+                merchant: self.match(merchant, threshold)
+                for merchant in set(merchants)
+            }
+
+
+def categorize_merchant(
+    rules: CompiledRuleSet, merchant: str, threshold: float = FUZZY_THRESHOLD
+) -> tuple[int | None, bool, float | None]:
+    """
+    Match a merchant against a loaded rule set, without touching the database.
+
+    Returns:
+        Tuple of (category_id, auto_categorized, confidence_score)
+    """
+    with timed("categorization"):
+        best_match, best_confidence = rules.match(merchant, threshold)
+
+    if best_match:
+        return best_match.category_id, True, best_confidence / 100.0
+
+    return None, False, None
+
+
+class _RuleCache:
+    """The process-wide compiled rule set and when it was loaded."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rules: CompiledRuleSet | None = None
+        self.loaded_at = 0.0
+        # Bumped by every invalidation
+        self.generation = 0
+
+
+_rule_cache = _RuleCache()
+
+
+def get_compiled_rules(db: Session) -> CompiledRuleSet:
+    """Return the process-wide compiled rule set, loading it if needed."""
+    cached = _rule_cache.rules
+    if cached is not None and (
+        RULE_CACHE_TTL <= 0 or time.monotonic() - _rule_cache.loaded_at < RULE_CACHE_TTL
+    ):
+        return cached
 
-        return None, False, None
+    generation = _rule_cache.generation
+    rules = (
+        db.query(MerchantRule)
+        .filter(MerchantRule.is_active == True)  # noqa: E712
+        .order_by(MerchantRule.priority.desc(), MerchantRule.id)
+        .all()
+    )
+    compiled = CompiledRuleSet.from_rules(rules)
 
-    def _calculate_match_confidence(
-        self, merchant: str, pattern: str, is_regex: bool
-    ) -> float:
-        """Calculate the confidence score for a pattern match."""
-        if is_regex:
-            try:
-                if re.search(pattern, merchant, re.IGNORECASE):
-                    return 100.0  # Exact regex match
-            except re.error:
-                # Invalid regex pattern, skip
-                return 0.0
-        else:
-            # Use fuzzy string matching
-            return float(fuzz.ratio(merchant.lower(), pattern.lower()))
+    with _rule_cache.lock:
+        # Don't publish a set that was loaded before a concurrent invalidation
+        if generation == _rule_cache.generation:
+            _rule_cache.rules = compiled
+            _rule_cache.loaded_at = time.monotonic()
+    return compiled
 
-        return 0.0
+
+def invalidate_rule_cache() -> None:
+    """Drop the compiled rule set so the next categorization reloads it."""
+    with _rule_cache.lock:
+        _rule_cache.rules = None
+        _rule_cache.generation += 1
+
+
+class ExpenseCategorizationService:
+    """Service for automatically categorizing expenses using merchant rules."""
+
+    def __init__(self, db: Session, fuzzy_threshold: int = FUZZY_THRESHOLD):
+        self.db = db
+        self.fuzzy_threshold = fuzzy_threshold
+
+    def categorize_expense(
+        self, merchant: str
+    ) -> tuple[int | None, bool, float | None]:
+        """
+        Categorize an expense based on merchant name.
+
+        Returns:
+            Tuple of (category_id, auto_categorized, confidence_score)
+        """
+        return categorize_merchant(
+            get_compiled_rules(self.db), merchant, self.fuzzy_threshold
+        )
 
     def suggest_merchant_rules(self, merchant: str, limit: int = 5) -> list[dict]:
         """
@@ -97,34 +238,131 @@ class ExpenseCategorizationService:
         suggestions.sort(key=lambda x: x["confidence"], reverse=True)
         return suggestions[:limit]
 
-    def bulk_recategorize(self) -> dict:
+    def iter_recategorize(self, chunk_size: int = 1000):
         """
-        Recategorize all expenses that are currently uncategorized.
+        Recategorize uncategorized expenses chunk by chunk.
 
-        Returns summary of categorization results.
-        """
-        from models import Expense  # Import here to avoid circular imports
+        Rows are read by primary key range so only one chunk is held in memory,
+        merchant matches are remembered across chunks (up to
+        MERCHANT_SCORE_CACHE_SIZE merchants), and every chunk is written with
+        one UPDATE per resulting category and committed.
 
-        # Get uncategorized expenses
-        uncategorized_expenses = (
-            self.db.query(Expense).filter(Expense.category_id.is_(None)).all()
+        Yields a progress dict after each chunk.
+        """
+        total_count = (
+            self.db.query(func.count(Expense.id))
+            .filter(Expense.category_id.is_(None))
+            .scalar()
         )
+        rules = get_compiled_rules(self.db)
+        scores: dict[str, tuple[CompiledRule | None, float]] = {}
 
+        processed = 0
         categorized_count = 0
-        total_count = len(uncategorized_expenses)
+        chunks = 0
+        last_id = 0
+
+        while True:
+            rows = self.db.execute(
+                select(
+                    Expense.id,
+                    Expense.merchant,
+                    Expense.amount,
+                    Expense.category_id,
+                    Expense.payment_method,
+                    Expense.transaction_date,
+                    Expense.billing_date,
+                )
+                .where(Expense.category_id.is_(None), Expense.id > last_id)
+                .order_by(Expense.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            if len(scores) >= MERCHANT_SCORE_CACHE_SIZE:
+                scores.clear()
+            categorized_count += self.categorize_rows(rows, rules, scores)
 
-        for expense in uncategorized_expenses:
-            category_id, auto_categorized, confidence = self.categorize_expense(
-                expense.merchant
+            self.db.commit()
+            processed += len(rows)
+            chunks += 1
+            yield {
+                "processed": processed,
+                "total_expenses": max(total_count, processed),
+                "categorized": categorized_count,
+                "chunks": chunks,
+            }
+
+    def categorize_rows(
+        self,
+        rows,
+        rules: CompiledRuleSet,
+        scores: dict[str, tuple[CompiledRule | None, float]] | None = None,
+    ) -> int:
+        """
+        Categorize uncategorized expense rows and move them in the rollups.
+
+        rows carry id, merchant, amount, category_id, payment_method and both
+        dates; scores caches merchant matches across calls. Each resulting
+        category takes one UPDATE, which skips rows categorized meanwhile.
+        Returns how many expenses were categorized; the caller commits.
+        """
+        if scores is None:
+            scores = {}
+        scores.update(
+            rules.match_many(
+                (row.merchant for row in rows if row.merchant not in scores),
+                self.fuzzy_threshold,
             )
+        )
 
-            if category_id:
-                expense.category_id = category_id
-                expense.auto_categorized = auto_categorized
-                expense.confidence_score = confidence
-                categorized_count += 1
+        # Group ids by outcome so each batch needs only a few UPDATEs
+        groups: dict[tuple[int, float], list[int]] = {}
+        for row in rows:
+            rule, confidence = scores[row.merchant]
+            if rule:
+                groups.setdefault((rule.category_id, confidence), []).append(row.id)
+
+        rows_by_id = {row.id: row for row in rows}
+        categorized = 0
+        deltas = []
+        for (category_id, confidence), ids in groups.items():
+            updated_ids = self.db.scalars(
+                update(Expense)
+                .where(Expense.id.in_(ids), Expense.category_id.is_(None))
+                .values(
+                    category_id=category_id,
+                    auto_categorized=True,
+                    confidence_score=confidence / 100.0,
+                )
+                .returning(Expense.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            categorized += len(updated_ids)
+
+            # Move the amounts from uncategorized to the new category
+            for expense_id in updated_ids:
+                values = dict(rows_by_id[expense_id]._mapping)
+                deltas += rollups.expense_deltas(values, -1)
+                deltas += rollups.expense_deltas({**values, "category_id": category_id})
+
+        rollups.apply_rollup_deltas(self.db, deltas)
+        return categorized
+
+    def bulk_recategorize(self, chunk_size: int = 1000) -> dict:
+        """
+        Recategorize all expenses that are currently uncategorized.
+
+        Returns summary of categorization results.
+        """
+        # Run every chunk, keeping only the last progress report
+        last = deque(self.iter_recategorize(chunk_size), maxlen=1)
+        progress = last[0] if last else {"processed": 0, "categorized": 0}
 
-        self.db.commit()
+        total_count = progress["processed"]
+        categorized_count = progress["categorized"]
 
         return {
             "total_expenses": total_count,
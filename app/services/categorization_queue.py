@@ -0,0 +1,201 @@
+"""
+Categorization of new expenses off the request path (opt-in)
+
+With ASYNC_CATEGORIZATION set, creating an expense skips fuzzy matching:
+the row is inserted uncategorized (auto_categorized=False) and its id is
+added to the categorization_queue table in the same transaction. A pool
+of worker threads claims queued ids in micro-batches with
+SELECT ... FOR UPDATE SKIP LOCKED, so workers in every process share the
+queue without waiting on each other, then categorizes the expenses and
+deletes their jobs in one transaction. Jobs of a batch that fails, or of
+a process that dies, stay queued for the next claim.
+
+Queue depth and lag are reported by GET /health/categorization-queue and
+as Prometheus gauges.
+"""
+from datetime import datetime, timezone
+import logging
+import os
+import threading
+
+from database import SessionLocal
+from metrics import (
+    CATEGORIZATION_DELAY,
+    CATEGORIZATION_JOBS,
+    CATEGORIZATION_QUEUE_DEPTH,
+    CATEGORIZATION_QUEUE_LAG,
+)
+from models import CategorizationJob, Expense
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from services.categorization import ExpenseCategorizationService, get_compiled_rules
+
+ASYNC_CATEGORIZATION = os.getenv("ASYNC_CATEGORIZATION", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+WORKERS = int(os.getenv("CATEGORIZATION_WORKERS", "2"))
+BATCH_SIZE = int(os.getenv("CATEGORIZATION_BATCH_SIZE", "100"))
+# Seconds an idle worker waits before polling the table again; enqueues in
+# this process wake the workers at once
+POLL_INTERVAL = float(os.getenv("CATEGORIZATION_POLL_INTERVAL", "1"))
+
+logger = logging.getLogger("expense_tracker.categorization_queue")
+
+
+def enqueue(db: Session, expense_ids: list[int]) -> None:
+    """Queue expenses for categorization; committed with the caller's insert."""
+    if expense_ids:
+        db.execute(
+            insert(CategorizationJob),
+            [{"expense_id": expense_id} for expense_id in expense_ids],
+        )
+
+
+def _age(enqueued_at: datetime, now: datetime) -> float:
+    # SQLite hands back naive UTC timestamps
+    if enqueued_at.tzinfo is None:
+        enqueued_at = enqueued_at.replace(tzinfo=timezone.utc)
+    return max((now - enqueued_at).total_seconds(), 0.0)
+
+
+def process_batch(db: Session, limit: int = BATCH_SIZE) -> int:
+    """
+    Claim up to `limit` queued expenses, categorize them and commit.
+
+    Expenses categorized by hand since they were queued are left alone.
+    Returns how many jobs were processed (0 when the queue is empty).
+    """
+    jobs = db.execute(
+        select(
+            CategorizationJob.id,
+            CategorizationJob.expense_id,
+            CategorizationJob.enqueued_at,
+        )
+        .order_by(CategorizationJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not jobs:
+        db.rollback()
+        return 0
+
+    rows = db.execute(
+        select(
+            Expense.id,
+            Expense.merchant,
+            Expense.amount,
+            Expense.category_id,
+            Expense.payment_method,
+            Expense.transaction_date,
+            Expense.billing_date,
+        ).where(
+            Expense.id.in_([job.expense_id for job in jobs]),
+            Expense.category_id.is_(None),
+        )
+    ).all()
+    if rows:
+        service = ExpenseCategorizationService(db)
+        service.categorize_rows(rows, get_compiled_rules(db))
+    db.execute(
+        delete(CategorizationJob)
+        .where(CategorizationJob.id.in_([job.id for job in jobs]))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    now = datetime.now(timezone.utc)
+    for job in jobs:
+        CATEGORIZATION_DELAY.observe(_age(job.enqueued_at, now))
+    CATEGORIZATION_JOBS.inc(len(jobs))
+    return len(jobs)
+
+
+def queue_stats(db: Session) -> dict:
+    """Depth of the queue and age of its oldest job, also set on the gauges."""
+    depth, oldest = db.execute(
+        select(
+            func.count(CategorizationJob.id), func.min(CategorizationJob.enqueued_at)
+        )
+    ).one()
+    lag = _age(oldest, datetime.now(timezone.utc)) if oldest else 0.0
+
+    CATEGORIZATION_QUEUE_DEPTH.set(depth)
+    CATEGORIZATION_QUEUE_LAG.set(lag)
+    return {
+        "enabled": ASYNC_CATEGORIZATION,
+        "workers": WORKERS if ASYNC_CATEGORIZATION else 0,
+        "depth": depth,
+        "lag_seconds": round(lag, 3),
+    }
+
+
+class CategorizationWorkers:
+    """Daemon threads draining the queue, each with its own sync session."""
+
+    def __init__(
+        self,
+        session_factory,
+        workers: int = WORKERS,
+        batch_size: int = BATCH_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._threads: list[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"categorization-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %d categorization workers", self.workers)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the workers after their current batch."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        """Wake idle workers, after committing new jobs."""
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            processed = 0
+            try:
+                db = self.session_factory()
+                try:
+                    processed = process_batch(db, self.batch_size)
+                    queue_stats(db)
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("Categorization batch failed; its jobs stay queued")
+
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+
+workers = CategorizationWorkers(SessionLocal)
+
+
+def notify() -> None:
+    """Wake this process's workers if async categorization is on."""
+    if ASYNC_CATEGORIZATION:
+        workers.notify()
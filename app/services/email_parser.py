@@ -0,0 +1,110 @@
+"""
+Spanish bank notification email parser
+
+Python port of the n8n parsers (test_spanish_parser.js and the Code nodes in
+n8n/Expense automation.json). Every pattern is compiled once at import, so
+parsing an email is a handful of regex searches.
+"""
+from datetime import datetime
+import re
+
+from models import PaymentMethod
+from schemas import WebhookExpense
+
+from services.amounts import parse_amount
+
+# "por $71.000" first; any "$..." amount as a fallback
+_AMOUNT_RE = re.compile(r"\bpor\s*\$\s*([\d.,]+)", re.IGNORECASE)
+_ANY_AMOUNT_RE = re.compile(r"\$\s*([\d.,]+)")
+# "en EL BACO SANTIAGO CL el 19/07/2025": the text after the last "en"
+# before the date
+_MERCHANT_RE = re.compile(
+    r"\ben\s+((?:(?!\ben\s).)+?)\s+el\s+\d{1,2}/\d{1,2}/\d{4}",
+    re.IGNORECASE,
+)
+_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(\d{1,2}):(\d{2}))?")
+_CARD_RE = re.compile(r"\*{4}[-\s]?(\d{4})")
+
+# Matched against lowercased text without accents, most specific first
+_CREDIT_RE = re.compile(r"tarjeta de credito|\bcredito\b")
+_DEBIT_RE = re.compile(r"tarjeta de debito|\bdebito\b")
+_TRANSFER_RE = re.compile(r"transferencia|\benvio\b|\bpago a\b")
+# A transfer also names the account it leaves from, so these come after it
+_ACCOUNT_RE = re.compile(r"\bcuenta\s+\*{4}|\bretiro\b|\bcajero\b")
+# Generic purchase wording, which the n8n parser treats as a card charge
+_PURCHASE_RE = re.compile(r"\bcompra\b|\bcargo\b")
+
+
+# Spanish accents only; cheaper than Unicode normalization on every email
+_STRIP_ACCENTS = str.maketrans("áéíóúü", "aeiouu")
+
+
+def _normalize(content: str) -> str:
+    return content.lower().translate(_STRIP_ACCENTS)
+
+
+def detect_payment_method(content: str) -> PaymentMethod:
+    """Guess the payment method from the wording of a notification email."""
+    text = _normalize(content)
+    if _CREDIT_RE.search(text):
+        return PaymentMethod.CREDIT_CARD
+    if _DEBIT_RE.search(text):
+        return PaymentMethod.DEBIT_CARD
+    if _TRANSFER_RE.search(text):
+        return PaymentMethod.BANK_TRANSFER
+    if _ACCOUNT_RE.search(text):
+        return PaymentMethod.DEBIT_CARD
+    if _PURCHASE_RE.search(text):
+        return PaymentMethod.CREDIT_CARD
+    return PaymentMethod.DEBIT_CARD
+
+
+def extract_card_last_four(content: str) -> str | None:
+    """Card or account digits written as ****1234."""
+    match = _CARD_RE.search(content)
+    return match.group(1) if match else None
+
+
+def _title_words(text: str) -> str:
+    # Same casing as the n8n parser: only the first letter of each word
+    return " ".join(word[:1].upper() + word[1:].lower() for word in text.split())
+
+
+def parse_email(content: str, source_email: str | None = None) -> WebhookExpense:
+    """
+    Parse a bank notification email into a webhook expense.
+
+    Raises ValueError when the amount or merchant cannot be found. Without
+    a date in the email the current time is used, like the n8n parser.
+    """
+    content = content.strip()
+
+    match = _AMOUNT_RE.search(content) or _ANY_AMOUNT_RE.search(content)
+    if not match:
+        raise ValueError("No amount found in email")
+    amount = parse_amount(match.group(1))
+
+    match = _MERCHANT_RE.search(content)
+    if not match:
+        raise ValueError("No merchant found in email")
+    merchant = _title_words(match.group(1))
+
+    match = _DATE_RE.search(content)
+    if match:
+        day, month, year, hour, minute = match.groups()
+        transaction_date = datetime(
+            int(year), int(month), int(day), int(hour or 0), int(minute or 0)
+        )
+    else:
+        transaction_date = datetime.now()
+
+    return WebhookExpense(
+        amount=amount,
+        merchant=merchant,
+        description=f"Purchase at {merchant}",
+        transaction_date=transaction_date,
+        source_email=source_email,
+        raw_data=content,
+        payment_method=detect_payment_method(content),
+        card_last_four=extract_card_last_four(content),
+    )
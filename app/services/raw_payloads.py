@@ -0,0 +1,103 @@
+"""
+Storage of original expense payloads (raw email text)
+
+Payloads live in expense_raw, zlib-compressed and keyed by the sha256 of
+their text, so the expenses table only keeps a small raw_id reference and
+identical payloads are stored once. The same hash goes into the
+fingerprint that makes webhook deliveries idempotent.
+"""
+from datetime import datetime, timezone
+import hashlib
+import zlib
+
+from database import dialect_insert
+from models import ExpenseRaw
+from sqlalchemy import select
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def webhook_fingerprint(
+    source_email: str | None,
+    raw_data: str | None,
+    amount: float,
+    transaction_date: datetime,
+    merchant: str,
+    card_last_four: str | None,
+) -> str | None:
+    """
+    Idempotency key of a webhook expense, or None if it cannot have one.
+
+    A notification delivered twice (n8n retries, mailbox re-reads) gets the
+    same key. The raw email identifies it on its own: the date is left out,
+    since parsers fall back to the current time when the email has none.
+    Without raw data the key is made of the parsed fields, which needs a
+    source email; payloads with neither are not deduplicated, as two
+    purchases of the same amount at the same time are nothing unusual.
+    Aware dates are compared in UTC, as the database returns them.
+    """
+    if raw_data:
+        parts = (source_email or "", content_hash(raw_data), f"{float(amount):.2f}")
+    elif source_email:
+        if transaction_date.tzinfo is not None:
+            transaction_date = transaction_date.astimezone(timezone.utc).replace(
+                tzinfo=None
+            )
+        parts = (
+            source_email,
+            f"{float(amount):.2f}",
+            transaction_date.isoformat(),
+            merchant,
+            card_last_four or "",
+        )
+    else:
+        return None
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def compress(text: str) -> bytes:
+    return zlib.compress(text.encode())
+
+
+def decompress(data: bytes | None) -> str | None:
+    return zlib.decompress(data).decode() if data is not None else None
+
+
+def store_payloads(db, texts) -> dict[str, int]:
+    """Insert the payloads that are not stored yet; map content hash to id."""
+    by_hash = {content_hash(text): text for text in texts}
+    if not by_hash:
+        return {}
+
+    insert = dialect_insert(db)
+    db.execute(
+        insert(ExpenseRaw)
+        .values(
+            [
+                {"content_hash": digest, "data": compress(text)}
+                for digest, text in sorted(by_hash.items())
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["content_hash"])
+    )
+    return dict(
+        db.execute(
+            select(ExpenseRaw.content_hash, ExpenseRaw.id).where(
+                ExpenseRaw.content_hash.in_(by_hash)
+            )
+        ).all()
+    )
+
+
+def attach_raw_ids(db, rows: list[dict]) -> None:
+    """Replace the raw_data text of expense rows with a stored raw_id."""
+    hashes = [
+        content_hash(row["raw_data"]) if row.get("raw_data") else None
+        for row in rows
+    ]
+    ids = store_payloads(db, (row["raw_data"] for row in rows if row.get("raw_data")))
+    for row, digest in zip(rows, hashes, strict=True):
+        row.pop("raw_data", None)
+        row["raw_id"] = ids[digest] if digest else None
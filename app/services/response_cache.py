@@ -0,0 +1,93 @@
+"""
+In-process cache of serialized read responses with strong ETags
+
+Each cache holds the JSON body of a read endpoint per query variant. A
+version counter is bumped by every write to the underlying tables, which
+drops the bodies. Clients that send back the ETag get a 304 straight from
+the cache without a database query.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from fastapi import Request, Response
+
+# Seconds before a cached body is reloaded even without a write in this
+# process. Writes in other worker processes are only picked up this way.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+
+class CachedBody:
+    """A serialized response body and its strong ETag."""
+
+    __slots__ = ("body", "etag", "loaded_at")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        # Derived from the content, so workers holding the same data agree
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.loaded_at = time.monotonic()
+
+
+class ResponseCache:
+    """Serialized bodies of one read endpoint, invalidated by version."""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._bodies: dict[object, CachedBody] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key=None) -> CachedBody | None:
+        cached = self._bodies.get(key)
+        if cached is not None and (
+            self.ttl <= 0 or time.monotonic() - cached.loaded_at < self.ttl
+        ):
+            return cached
+        return None
+
+    def put(self, version: int, body: bytes, key=None) -> CachedBody:
+        """
+        Store a body serialized from data read at the given version.
+
+        The body is still returned but not kept if a write bumped the
+        version while it was being loaded.
+        """
+        cached = CachedBody(body)
+        with self._lock:
+            if version == self.version:
+                self._bodies[key] = cached
+        return cached
+
+    def bump(self) -> None:
+        """Record a write: drop every cached body and change the version."""
+        with self._lock:
+            self.version += 1
+            self._bodies.clear()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (weak comparison, per RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+def cached_response(request: Request, cached: CachedBody) -> Response:
+    """200 with the cached JSON body, or 304 if the client already has it."""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=cached.body, media_type="application/json", headers=headers
+    )
+
+
+# Merchant rules embed their category, so category writes bump both
+categories_cache = ResponseCache()
+merchant_rules_cache = ResponseCache()
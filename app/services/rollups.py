@@ -0,0 +1,244 @@
+"""
+Monthly rollups of expense totals
+
+One row per (month, category, payment method, date basis). Every write to
+expenses applies signed deltas in the same transaction, so month-aligned
+analytics can read O(months) rows instead of scanning expenses.
+rebuild_rollups() recomputes everything from expenses to repair drift.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from database import dialect_insert
+from models import DateBasis, Expense, MonthlyRollup, PaymentMethod
+from sqlalchemy import Date, cast, delete, func, insert, literal, select
+
+ROLLUP_KEY = ("month", "category_id", "payment_method", "date_basis")
+
+
+def month_start(value: datetime) -> date:
+    """First day of the value's month in UTC (naive values are taken as UTC)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def month_aligned_range(
+    start_date: datetime | None, end_date: datetime | None
+) -> tuple[date | None, date | None] | None:
+    """
+    Months covered by an inclusive [start_date, end_date] filter.
+
+    Returns None unless the range is made of whole UTC months: start_date at
+    a month's first instant and end_date at a month's last microsecond
+    (either may be open).
+    """
+
+    def as_utc(value: datetime) -> datetime:
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def is_month_start(value: datetime) -> bool:
+        return value == datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+    first_month = last_month = None
+    if start_date is not None:
+        start = as_utc(start_date)
+        if not is_month_start(start):
+            return None
+        first_month = start.date()
+    if end_date is not None:
+        after_end = as_utc(end_date) + timedelta(microseconds=1)
+        if not is_month_start(after_end):
+            return None
+        last_month = month_start(as_utc(end_date))
+    return first_month, last_month
+
+
+def rollup_filters(
+    date_basis: DateBasis,
+    first_month: date | None = None,
+    last_month: date | None = None,
+    payment_method: PaymentMethod | None = None,
+) -> list:
+    """WHERE clauses selecting the monthly_rollups rows of a month range."""
+    filters = [MonthlyRollup.date_basis == date_basis]
+    if first_month:
+        filters.append(MonthlyRollup.month >= first_month)
+    if last_month:
+        filters.append(MonthlyRollup.month <= last_month)
+    if payment_method:
+        filters.append(MonthlyRollup.payment_method == payment_method)
+    return filters
+
+
+def rollup_values(expense: Expense) -> dict:
+    """The expense columns that decide which rollup rows it counts in."""
+    return {
+        "amount": expense.amount,
+        "category_id": expense.category_id,
+        "payment_method": expense.payment_method,
+        "transaction_date": expense.transaction_date,
+        "billing_date": expense.billing_date,
+    }
+
+
+def expense_deltas(values: dict, sign: int = 1) -> list[dict]:
+    """
+    Rollup deltas for one expense in both date bases.
+
+    values holds the expense's column values (see rollup_values); sign is +1
+    when the expense is counted and -1 when it is taken out.
+    """
+    common = {
+        "category_id": values["category_id"] or 0,
+        "payment_method": values["payment_method"],
+        "total_amount": sign * values["amount"],
+        "transaction_count": sign,
+    }
+    return [
+        {
+            **common,
+            "month": month_start(values["transaction_date"]),
+            "date_basis": DateBasis.TRANSACTION,
+        },
+        {
+            **common,
+            "month": month_start(values["billing_date"]),
+            "date_basis": DateBasis.BILLING,
+        },
+    ]
+
+
+def _dialect_name(db) -> str:
+    # Works for a Session as well as a Connection
+    dialect = getattr(db, "dialect", None) or db.get_bind().dialect
+    return dialect.name
+
+
+def apply_rollup_deltas(db, deltas: list[dict]) -> None:
+    """Add deltas to the rollup rows, creating missing rows (one upsert)."""
+    merged: dict[tuple, dict] = {}
+    for delta in deltas:
+        key = tuple(delta[column] for column in ROLLUP_KEY)
+        row = merged.setdefault(
+            key,
+            {
+                **dict(zip(ROLLUP_KEY, key, strict=True)),
+                "total_amount": 0.0,
+                "transaction_count": 0,
+            },
+        )
+        row["total_amount"] += delta["total_amount"]
+        row["transaction_count"] += delta["transaction_count"]
+
+    rows = [
+        row
+        for row in merged.values()
+        if row["transaction_count"] or row["total_amount"]
+    ]
+    if not rows:
+        return
+
+    upsert = dialect_insert(db)
+
+    # Sort so concurrent writers lock rollup rows in the same order
+    rows.sort(
+        key=lambda row: (
+            row["month"],
+            row["category_id"],
+            row["payment_method"].value,
+            row["date_basis"].value,
+        )
+    )
+    statement = upsert(MonthlyRollup).values(rows)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={
+                "total_amount": MonthlyRollup.total_amount
+                + statement.excluded.total_amount,
+                "transaction_count": MonthlyRollup.transaction_count
+                + statement.excluded.transaction_count,
+            },
+        )
+    )
+
+
+def _month_of(column, dialect_name: str):
+    if dialect_name == "sqlite":
+        return func.date(column, "start of month")
+    return cast(func.date_trunc("month", func.timezone("UTC", column)), Date)
+
+
+def apply_expense_rollups(
+    db, date_basis: DateBasis, filters: list, sign: int = 1
+) -> None:
+    """
+    Count the expenses matching filters in one date basis (one upsert).
+
+    The deltas are aggregated by the database with INSERT ... SELECT, for
+    set-based updates touching too many expenses to load. With sign=-1 the
+    expenses are taken out instead.
+    """
+    date_column = (
+        Expense.transaction_date
+        if date_basis == DateBasis.TRANSACTION
+        else Expense.billing_date
+    )
+    month = _month_of(date_column, _dialect_name(db))
+    category_id = func.coalesce(Expense.category_id, 0)
+
+    upsert = dialect_insert(db)
+    statement = upsert(MonthlyRollup).from_select(
+        [*ROLLUP_KEY, "total_amount", "transaction_count"],
+        select(
+            month,
+            category_id,
+            Expense.payment_method,
+            literal(date_basis, MonthlyRollup.date_basis.type),
+            sign * func.sum(Expense.amount),
+            sign * func.count(Expense.id),
+        )
+        # SQLite needs a WHERE to parse INSERT ... SELECT ... ON CONFLICT
+        .where(*filters)
+        .group_by(month, category_id, Expense.payment_method),
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={
+                "total_amount": MonthlyRollup.total_amount
+                + statement.excluded.total_amount,
+                "transaction_count": MonthlyRollup.transaction_count
+                + statement.excluded.transaction_count,
+            },
+        )
+    )
+
+
+def rebuild_rollups(db) -> None:
+    """Recompute every rollup row from expenses (Session or Connection)."""
+    dialect_name = _dialect_name(db)
+
+    db.execute(delete(MonthlyRollup))
+    for basis, date_column in (
+        (DateBasis.TRANSACTION, Expense.transaction_date),
+        (DateBasis.BILLING, Expense.billing_date),
+    ):
+        month = _month_of(date_column, dialect_name)
+        category_id = func.coalesce(Expense.category_id, 0)
+        db.execute(
+            insert(MonthlyRollup).from_select(
+                [*ROLLUP_KEY, "total_amount", "transaction_count"],
+                select(
+                    month,
+                    category_id,
+                    Expense.payment_method,
+                    literal(basis, MonthlyRollup.date_basis.type),
+                    func.sum(Expense.amount),
+                    func.count(Expense.id),
+                ).group_by(month, category_id, Expense.payment_method),
+            )
+        )
+
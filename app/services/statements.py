@@ -0,0 +1,347 @@
+"""
+Bank statement import (CSV and OFX)
+
+Statements are parsed as a stream of lines, normalized into ExpenseCreate,
+categorized and given a billing date one batch at a time, then loaded with
+Postgres COPY (a plain multi-row INSERT on other databases).
+"""
+from collections.abc import Iterable, Iterator
+import csv
+from datetime import datetime, timedelta, timezone
+import io
+import re
+import time
+
+from models import Expense, PaymentMethod
+from pydantic import ValidationError
+from schemas import ExpenseCreate
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from services import raw_payloads, rollups
+from services.amounts import parse_amount
+from services.billing import billing_service
+from services.categorization import FUZZY_THRESHOLD, get_compiled_rules
+
+# Only the first rejected rows are listed in the result; all are counted
+MAX_REPORTED_REJECTIONS = 100
+
+# Expense columns written by an import, in COPY order
+IMPORT_COLUMNS = (
+    "amount",
+    "merchant",
+    "description",
+    "transaction_date",
+    "category_id",
+    "payment_method",
+    "billing_date",
+    "card_last_four",
+    "source_email",
+    "raw_id",
+    "auto_categorized",
+    "confidence_score",
+)
+
+# Accepted CSV header names (lowercased) for each ExpenseCreate field
+CSV_HEADER_ALIASES = {
+    "transaction_date": ("transaction_date", "date", "fecha", "fecha transaccion"),
+    "amount": ("amount", "monto", "cargo", "importe"),
+    "merchant": ("merchant", "comercio", "payee", "name", "descripcion", "detalle"),
+    "description": ("description", "glosa", "memo"),
+    "payment_method": ("payment_method", "medio de pago"),
+    "card_last_four": ("card_last_four", "tarjeta"),
+}
+
+CSV_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%y")
+
+_OFX_TAG_RE = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_OFX_DATE_RE = re.compile(
+    r"^(\d{8})(\d{6})?(?:\.\d+)?(?:\[([+-]?\d+(?:\.\d+)?)(?::\w+)?\])?$"
+)
+
+
+def parse_statement_date(text: str) -> datetime:
+    """Parse ISO 8601 or day-first statement dates."""
+    text = text.strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for date_format in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {text!r}")
+
+
+def parse_ofx_date(text: str) -> datetime:
+    """Parse an OFX date like 20250115, 20250115120000[-3:CLT]."""
+    match = _OFX_DATE_RE.match(text.strip())
+    if not match:
+        raise ValueError(f"Invalid OFX date: {text!r}")
+    day, clock, offset = match.groups()
+    value = datetime.strptime(day + (clock or "000000"), "%Y%m%d%H%M%S")
+    if offset is not None:
+        value = value.replace(tzinfo=timezone(timedelta(hours=float(offset))))
+    return value
+
+
+def iter_csv_rows(
+    lines: Iterable[str],
+    payment_method: PaymentMethod | None = None,
+    card_last_four: str | None = None,
+) -> Iterator[tuple[int, dict | ValueError]]:
+    """
+    Yield (line number, ExpenseCreate fields) per CSV data row.
+
+    Rows that cannot be read yield a ValueError in place of the fields.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    names = [name.strip().lower() for name in header]
+    positions = {}
+    for field, aliases in CSV_HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in names and names.index(alias) not in positions.values():
+                positions[field] = names.index(alias)
+                break
+
+    missing = {"transaction_date", "amount", "merchant"} - positions.keys()
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+
+    for row in reader:
+        line = reader.line_num
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            cells = {
+                field: row[position].strip()
+                for field, position in positions.items()
+                if position < len(row) and row[position].strip()
+            }
+            if not cells.get("merchant"):
+                raise ValueError("Missing merchant")
+            fields = {
+                "transaction_date": parse_statement_date(
+                    cells.get("transaction_date", "")
+                ),
+                # Statements list charges as negative or positive amounts
+                "amount": abs(parse_amount(cells.get("amount", ""))),
+                "merchant": cells["merchant"],
+                "description": cells.get("description"),
+                "payment_method": cells.get("payment_method", payment_method),
+                "card_last_four": cells.get("card_last_four", card_last_four),
+            }
+        except ValueError as e:
+            yield line, e
+            continue
+        yield line, {key: value for key, value in fields.items() if value is not None}
+
+
+def iter_ofx_rows(
+    lines: Iterable[str],
+    payment_method: PaymentMethod | None = None,
+    card_last_four: str | None = None,
+) -> Iterator[tuple[int, dict | ValueError]]:
+    """
+    Yield (line number, ExpenseCreate fields) per OFX <STMTTRN>.
+
+    Handles SGML (unclosed tags) and XML OFX. Credit card statements
+    (<CCSTMTRS>) default to CREDIT_CARD, bank statements to DEBIT_CARD, and
+    the account number supplies the card digits. Only debits (negative
+    TRNAMT) are expenses; credits are rejected.
+    """
+    statement_method = payment_method
+    account_last_four = card_last_four
+    transaction = None
+    start_line = 0
+
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag_name, text in _OFX_TAG_RE.findall(line):
+            tag = tag_name.upper()
+            value = text.strip()
+
+            if tag == "CCSTMTRS" and not closing and payment_method is None:
+                statement_method = PaymentMethod.CREDIT_CARD
+            elif tag == "STMTRS" and not closing and payment_method is None:
+                statement_method = PaymentMethod.DEBIT_CARD
+            elif tag == "ACCTID" and card_last_four is None:
+                digits = re.sub(r"\D", "", value)
+                account_last_four = digits[-4:] if len(digits) >= 4 else None
+            elif tag == "STMTTRN" and not closing:
+                transaction = {}
+                start_line = line_number
+            elif tag == "STMTTRN" and closing and transaction is not None:
+                yield start_line, _ofx_fields(
+                    transaction, statement_method, account_last_four
+                )
+                transaction = None
+            elif transaction is not None and not closing and value:
+                transaction[tag] = value
+
+    # SGML files may omit the closing tag of the last transaction
+    if transaction:
+        yield start_line, _ofx_fields(transaction, statement_method, account_last_four)
+
+
+def _ofx_fields(
+    transaction: dict,
+    payment_method: PaymentMethod | None,
+    card_last_four: str | None,
+) -> dict | ValueError:
+    try:
+        amount = parse_amount(transaction.get("TRNAMT", ""))
+        transaction_date = parse_ofx_date(transaction.get("DTPOSTED", ""))
+    except ValueError as e:
+        return e
+    if amount >= 0:
+        return ValueError("Credit transaction, not an expense")
+    merchant = transaction.get("NAME") or transaction.get("MEMO")
+    if not merchant:
+        return ValueError("Missing merchant")
+
+    fields = {
+        "amount": -amount,
+        "merchant": merchant,
+        "description": transaction.get("MEMO"),
+        "transaction_date": transaction_date,
+        "payment_method": payment_method or PaymentMethod.DEBIT_CARD,
+        "card_last_four": card_last_four,
+    }
+    return {key: value for key, value in fields.items() if value is not None}
+
+
+STATEMENT_PARSERS = {"csv": iter_csv_rows, "ofx": iter_ofx_rows}
+
+
+def _import_values(expense: ExpenseCreate, match) -> dict:
+    """Column values for an imported expense, with category and billing date."""
+    rule, confidence = match
+    values = expense.model_dump(include={*IMPORT_COLUMNS, "raw_data"})
+    values["billing_date"] = values["billing_date"] or (
+        billing_service.calculate_billing_date(
+            expense.transaction_date, expense.payment_method, expense.card_last_four
+        )
+    )
+    values["category_id"] = rule.category_id if rule else None
+    values["auto_categorized"] = rule is not None
+    values["confidence_score"] = confidence / 100.0 if rule else None
+    return values
+
+
+def _copy_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, PaymentMethod):
+        return value.value
+    return value
+
+
+def _load_rows(db: Session, rows: list[dict]) -> None:
+    """Insert rows with COPY on psycopg2, or one multi-row INSERT otherwise."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql" or bind.dialect.driver != "psycopg2":
+        db.execute(insert(Expense), rows)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[column]) for column in IMPORT_COLUMNS])
+    buffer.seek(0)
+
+    # COPY runs on the session's connection, inside its transaction. Unquoted
+    # empty fields are NULL in COPY's CSV format.
+    cursor = db.connection().connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Expense.__tablename__} ({', '.join(IMPORT_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def import_statement(
+    db: Session,
+    lines: Iterable[str],
+    format: str,
+    payment_method: PaymentMethod | None = None,
+    card_last_four: str | None = None,
+    batch_size: int = 1000,
+) -> dict:
+    """
+    Import a CSV or OFX statement and report what happened.
+
+    Each batch is categorized with one match_many call and loaded on its
+    own, so a large statement never holds more than one batch in memory.
+    The whole file is one transaction: an error partway through (an
+    undecodable line, say) raises and leaves nothing imported, so the
+    statement can be uploaded again. Invalid rows are rejected with their
+    line number and reason.
+    """
+    started = time.perf_counter()
+    rules = get_compiled_rules(db)
+    billing_service.load_card_configs(db)
+    imported = rejected = 0
+    rejected_rows = []
+
+    def reject(line: int, reason: str):
+        nonlocal rejected
+        rejected += 1
+        if len(rejected_rows) < MAX_REPORTED_REJECTIONS:
+            rejected_rows.append({"line": line, "reason": reason})
+
+    def flush(batch: list[ExpenseCreate]):
+        nonlocal imported
+        scores = rules.match_many(
+            (expense.merchant for expense in batch), FUZZY_THRESHOLD
+        )
+        rows = [_import_values(expense, scores[expense.merchant]) for expense in batch]
+        raw_payloads.attach_raw_ids(db, rows)
+        _load_rows(db, rows)
+        rollups.apply_rollup_deltas(
+            db, [delta for values in rows for delta in rollups.expense_deltas(values)]
+        )
+        db.flush()
+        imported += len(rows)
+
+    batch = []
+    parser = STATEMENT_PARSERS[format]
+    try:
+        for line, fields in parser(lines, payment_method, card_last_four):
+            if isinstance(fields, ValueError):
+                reject(line, str(fields))
+                continue
+            try:
+                batch.append(ExpenseCreate(**fields))
+            except ValidationError as e:
+                error = e.errors()[0]
+                location = ".".join(str(part) for part in error["loc"])
+                reject(line, f"{location}: {error['msg']}")
+                continue
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    return {
+        "format": format,
+        "imported": imported,
+        "rejected": rejected,
+        "rejected_rows": rejected_rows,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(imported / elapsed, 1) if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,98 @@
+"""
+Shared fixtures: the API routers on a throwaway SQLite database.
+
+The routers are mounted on a bare FastAPI app (main.py needs Postgres and an
+API key), with get_async_db overridden to an aiosqlite session. Statement
+tracking runs in strict mode: a request that repeats one statement shape
+more than STRICT_REPEAT_LIMIT times fails with RepeatedStatementError.
+"""
+
+import database
+from database import Base, get_async_db, track_queries
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from routers import billing_configs, categories, expenses, merchant_rules
+from services.categorization import invalidate_rule_cache
+from services.response_cache import categories_cache, merchant_rules_cache
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+STRICT_REPEAT_LIMIT = 5
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # Rule and response caches are process-wide; each test has a fresh database
+    invalidate_rule_cache()
+    categories_cache.bump()
+    merchant_rules_cache.bump()
+
+
+@pytest.fixture(autouse=True)
+def strict_statements(monkeypatch):
+    monkeypatch.setattr(database, "STATEMENT_REPEAT_LIMIT", STRICT_REPEAT_LIMIT)
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = tmp_path / "expenses.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def async_engine(database_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+    yield engine
+    engine.sync_engine.dispose()
+
+
+@pytest.fixture
+def statements(async_engine):
+    """SQL statements executed by the app, in order."""
+    executed = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    return executed
+
+
+@pytest.fixture
+def sync_sessions(database_path, monkeypatch):
+    """Sync sessions the expenses router opens itself, on the test database."""
+    engine = create_engine(f"sqlite:///{database_path}")
+    monkeypatch.setattr(expenses, "SessionLocal", sessionmaker(engine))
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def override_get_async_db(async_engine):
+    """Replacement for get_async_db on the test database."""
+    session_factory = async_sessionmaker(
+        async_engine, expire_on_commit=False, autoflush=False
+    )
+
+    async def override():
+        with track_queries():
+            async with session_factory() as session:
+                yield session
+
+    return override
+
+
+@pytest.fixture
+def client(override_get_async_db):
+    app = FastAPI()
+    for module in (expenses, categories, merchant_rules, billing_configs):
+        app.include_router(module.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    with TestClient(app) as test_client:
+        yield test_client
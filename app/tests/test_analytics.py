@@ -0,0 +1,59 @@
+"""
+Summaries read from monthly_rollups match the same summaries aggregated
+from expenses.
+"""
+
+import pytest
+
+# Not a month boundary, and before every expense below: the SQL aggregate
+SQL_PATH_START = "2024-12-31T23:00:00"
+
+
+def create_expenses(client):
+    category_id = client.post("/categories/", json={"name": "Groceries"}).json()["id"]
+    for n, (payment_method, day) in enumerate(
+        [("DEBIT_CARD", "2025-01-05"), ("CREDIT_CARD", "2025-01-28"),
+         ("CREDIT_CARD", "2025-02-14"), ("DEBIT_CARD", "2025-03-01"),
+         # Not billed yet: counts as pending
+         ("CREDIT_CARD", "2099-01-10")]
+    ):
+        response = client.post(
+            "/expenses/",
+            json={
+                "amount": 1000 * (n + 1),
+                "merchant": f"Merchant {n}",
+                "transaction_date": f"{day}T12:00:00",
+                "payment_method": payment_method,
+                # One uncategorized expense
+                "category_id": category_id if n else None,
+            },
+        )
+        assert response.status_code == 200
+
+
+def test_unbounded_summary_matches_sql_aggregate(client):
+    create_expenses(client)
+
+    for params in ({}, {"use_billing_date": True}, {"payment_method": "CREDIT_CARD"}):
+        rollup = client.get("/expenses/analytics/summary", params=params).json()
+        sql = client.get(
+            "/expenses/analytics/summary",
+            params={**params, "start_date": SQL_PATH_START},
+        ).json()
+        assert rollup["transaction_count"] > 0
+        assert rollup == sql
+
+
+@pytest.mark.parametrize("end_date", [None, "2025-02-28T23:59:59.999999"])
+def test_billing_summary_rollups_match_sql_aggregate(client, end_date):
+    create_expenses(client)
+    params = {"end_date": end_date} if end_date else {}
+
+    rollup = client.get("/expenses/analytics/billing-summary", params=params).json()
+    sql = client.get(
+        "/expenses/analytics/billing-summary",
+        params={**params, "start_date": SQL_PATH_START},
+    ).json()
+    assert rollup["total"]["count"] > 0
+    assert rollup["CREDIT_CARD"]["pending_billing"] == (0 if end_date else 5000)
+    assert rollup == sql
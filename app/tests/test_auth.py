@@ -0,0 +1,120 @@
+"""
+API key middleware: scoped keys, rejected requests, and streaming bodies
+passing through unbuffered.
+"""
+
+import importlib
+
+from auth import ApiKeyMiddleware, hash_key, load_api_keys
+from database import get_async_db
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from mcp_server import MCP_OPERATIONS
+import pytest
+
+KEYS = {"all": "admin-key", "read": "read-key", "webhook": "hook-key", "mcp": "mcp-key"}
+
+
+@pytest.fixture
+def auth_client():
+    app = FastAPI()
+
+    @app.get("/expenses/")
+    def list_expenses():
+        return []
+
+    @app.post("/expenses/")
+    def create_expense():
+        return {}
+
+    @app.post("/expenses/webhook")
+    def webhook():
+        return {}
+
+    @app.get("/expenses/export")
+    def export():
+        return StreamingResponse(iter([b"a\n", b"b\n"]), media_type="text/plain")
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy"}
+
+    environ = {
+        "API_KEY": KEYS["all"],
+        "API_KEYS": ",".join(
+            f"{scope}:{hash_key(key)}" for scope, key in KEYS.items() if scope != "all"
+        ),
+    }
+    app.add_middleware(ApiKeyMiddleware, keys=load_api_keys(environ))
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "scope, method, path, status",
+    [
+        ("all", "POST", "/expenses/", 200),
+        ("read", "GET", "/expenses/", 200),
+        ("read", "POST", "/expenses/", 403),
+        ("read", "POST", "/expenses/webhook", 403),
+        ("webhook", "POST", "/expenses/webhook", 200),
+        ("webhook", "GET", "/expenses/", 403),
+    ],
+)
+def test_key_scopes(auth_client, scope, method, path, status):
+    response = auth_client.request(method, path, headers={"x-api-key": KEYS[scope]})
+    assert response.status_code == status
+
+
+def test_missing_and_invalid_keys(auth_client):
+    assert auth_client.get("/expenses/").status_code == 401
+    assert auth_client.get("/expenses/", headers={"x-api-key": "nope"}).status_code == 403
+    assert auth_client.get("/health").status_code == 200
+
+
+def test_streaming_response_passes_through(auth_client):
+    response = auth_client.get("/expenses/export", headers={"x-api-key": KEYS["read"]})
+    assert response.status_code == 200
+    assert response.text == "a\nb\n"
+
+
+def test_load_api_keys_rejects_bad_configuration():
+    with pytest.raises(ValueError, match="required"):
+        load_api_keys({})
+    with pytest.raises(ValueError, match="scope 'read'"):
+        load_api_keys({"API_KEYS": "read:not-a-digest"})
+    with pytest.raises(ValueError, match="scope 'admin'"):
+        load_api_keys({"API_KEYS": f"admin:{hash_key('x')}"})
+
+
+@pytest.fixture
+def app_client(monkeypatch, override_get_async_db):
+    # main.py reads its keys on import: reload it with an mcp key only
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.setenv("API_KEYS", f"mcp:{hash_key(KEYS['mcp'])}")
+    import main
+
+    app = importlib.reload(main).app
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as client:
+        yield client
+
+
+def test_mcp_key_reaches_every_mcp_operation(app_client):
+    headers = {"x-api-key": KEYS["mcp"]}
+    routes = [
+        route
+        for route in app_client.app.routes
+        if isinstance(route, APIRoute) and route.operation_id in MCP_OPERATIONS
+    ]
+    assert {route.operation_id for route in routes} == set(MCP_OPERATIONS)
+
+    for route in routes:
+        for method in route.methods:
+            # An empty POST body fails validation, after authentication
+            response = app_client.request(method, route.path, headers=headers, json={})
+            assert response.status_code not in (401, 403), (method, route.path)
+
+    assert app_client.post("/expenses/", headers=headers, json={}).status_code == 403
+    assert app_client.get("/expenses/export", headers=headers).status_code == 403
@@ -0,0 +1,66 @@
+"""
+Per-card billing cycles: billing dates follow the card's configured day.
+"""
+
+from datetime import datetime
+
+from models import PaymentMethod
+import pytest
+from services.billing import SimpleBillingService
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+
+def test_credit_card_billing_date_needs_loaded_configs(database_path):
+    service = SimpleBillingService()
+    purchase = datetime(2025, 1, 10, 12, 0)
+
+    # Debit charges are immediate and need no config
+    assert service.calculate_billing_date(purchase, PaymentMethod.DEBIT_CARD) == purchase
+    with pytest.raises(RuntimeError, match="load_card_configs"):
+        service.calculate_billing_date(purchase, PaymentMethod.CREDIT_CARD, "1234")
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    with Session(engine) as session:
+        service.load_card_configs(session)
+    engine.dispose()
+    assert service.calculate_billing_date(
+        purchase, PaymentMethod.CREDIT_CARD, "1234"
+    ) == datetime(2025, 1, 25, 12, 0)
+
+
+def test_changing_the_card_moves_the_billing_date(client):
+    client.put(
+        "/billing-configs/5678",
+        json={"credit_card_billing_day": 10, "timezone": "UTC"},
+    )
+    expense = client.post(
+        "/expenses/",
+        json={
+            "amount": 25000,
+            "merchant": "Falabella",
+            "transaction_date": "2025-01-15T12:00:00",
+            "payment_method": "CREDIT_CARD",
+            "card_last_four": "1234",
+        },
+    ).json()
+    assert expense["billing_date"].startswith("2025-01-25")
+
+    updated = client.put(
+        f"/expenses/{expense['id']}", json={"card_last_four": "5678"}
+    ).json()
+    assert updated["billing_date"].startswith("2025-02-10")
+
+    # The BILLING rollups moved with it (whole months read from the rollups)
+    def billed_in(month_start, month_end):
+        return client.get(
+            "/expenses/analytics/summary",
+            params={
+                "use_billing_date": True,
+                "start_date": f"{month_start}T00:00:00",
+                "end_date": f"{month_end}T23:59:59.999999",
+            },
+        ).json()["transaction_count"]
+
+    assert billed_in("2025-01-01", "2025-01-31") == 0
+    assert billed_in("2025-02-01", "2025-02-28") == 1
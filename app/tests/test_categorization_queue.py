@@ -0,0 +1,79 @@
+"""
+Async categorization: webhook expenses go in uncategorized and queued, and
+a worker batch categorizes them and moves them in the rollups.
+"""
+
+from models import CategorizationJob, MonthlyRollup
+import pytest
+from services import categorization_queue
+from services.rollups import rebuild_rollups
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+PAYLOAD = {
+    "amount": 3500,
+    "merchant": "Starbucks",
+    "transaction_date": "2025-01-16T09:00:00",
+    "source_email": "alertas@banco.cl",
+}
+
+
+@pytest.fixture
+def sync_session(database_path):
+    engine = create_engine(f"sqlite:///{database_path}")
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def rollup_rows(db):
+    return set(
+        db.execute(
+            select(
+                MonthlyRollup.month,
+                MonthlyRollup.category_id,
+                MonthlyRollup.payment_method,
+                MonthlyRollup.date_basis,
+                MonthlyRollup.total_amount,
+                MonthlyRollup.transaction_count,
+            ).where(MonthlyRollup.transaction_count != 0)
+        ).all()
+    )
+
+
+def test_queued_expenses_are_categorized_by_a_worker_batch(
+    client, sync_session, monkeypatch
+):
+    monkeypatch.setattr(categorization_queue, "ASYNC_CATEGORIZATION", True)
+    category_id = client.post("/categories/", json={"name": "Coffee"}).json()["id"]
+    client.post(
+        "/merchant-rules/",
+        json={"merchant_pattern": "starbucks", "category_id": category_id},
+    )
+
+    single = client.post("/expenses/webhook", json=PAYLOAD).json()
+    unknown_shop = {**PAYLOAD, "amount": 990, "merchant": "Unknown Shop"}
+    batch = client.post(
+        "/expenses/webhook/batch", json=[{**PAYLOAD, "amount": 4200}, unknown_shop]
+    ).json()
+    assert (single["category_id"], single["auto_categorized"]) == (None, False)
+    assert [item["category_id"] for item in batch["results"]] == [None, None]
+
+    stats = categorization_queue.queue_stats(sync_session)
+    assert stats["depth"] == 3 and stats["lag_seconds"] >= 0
+
+    assert categorization_queue.process_batch(sync_session, limit=2) == 2
+    assert categorization_queue.process_batch(sync_session, limit=2) == 1
+    assert categorization_queue.process_batch(sync_session) == 0
+    assert sync_session.scalar(select(func.count(CategorizationJob.id))) == 0
+
+    categorized = client.get(f"/expenses/{single['id']}").json()
+    assert categorized["category_id"] == category_id
+    assert categorized["auto_categorized"] is True
+    unknown = client.get(f"/expenses/{batch['results'][1]['expense_id']}").json()
+    assert unknown["category_id"] is None
+
+    # The incremental rollups match a rebuild from the expenses
+    maintained = rollup_rows(sync_session)
+    rebuild_rollups(sync_session)
+    assert rollup_rows(sync_session) == maintained
@@ -0,0 +1,115 @@
+"""
+Spanish bank notification emails: one sample per format the n8n parsers
+handled, and POST /expenses/webhook/raw on top of the parser.
+"""
+
+from datetime import datetime
+
+from models import PaymentMethod
+import pytest
+from services.email_parser import parse_email
+
+CREDIT_CARD_EMAIL = (
+    "Julio Andres Andrade Gomez: Te informamos que se ha realizado una compra "
+    "por $71.000 con Tarjeta de Crédito ****5646 en EL BACO SANTIAGO CL el "
+    "19/07/2025 22:23. Revisa Saldos y Movimientos en App Mi Banco"
+)
+
+
+@pytest.mark.parametrize(
+    "email, amount, merchant, transaction_date, payment_method, card",
+    [
+        (
+            CREDIT_CARD_EMAIL,
+            71000.0,
+            "El Baco Santiago Cl",
+            datetime(2025, 7, 19, 22, 23),
+            PaymentMethod.CREDIT_CARD,
+            "5646",
+        ),
+        # The debit parser's format: a purchase charged to an account
+        (
+            "Te informamos que se ha realizado una compra por $12.990 con cargo "
+            "a Cuenta ****1234 en LIDER EXPRESS el 05/03/2025 09:15. Si no "
+            "reconoces este movimiento llámanos",
+            12990.0,
+            "Lider Express",
+            datetime(2025, 3, 5, 9, 15),
+            PaymentMethod.DEBIT_CARD,
+            "1234",
+        ),
+        (
+            "Compra con Tarjeta de Débito ****4321 por $3.500 en MERPAGO*TIENDA "
+            "el 10/01/2025",
+            3500.0,
+            "Merpago*tienda",
+            datetime(2025, 1, 10),
+            PaymentMethod.DEBIT_CARD,
+            "4321",
+        ),
+        # Transfers name the account they leave from
+        (
+            "Se realizó una transferencia por $150.000 desde tu Cuenta ****9876 "
+            "en JUAN PEREZ el 01/02/2025 18:00.",
+            150000.0,
+            "Juan Perez",
+            datetime(2025, 2, 1, 18, 0),
+            PaymentMethod.BANK_TRANSFER,
+            "9876",
+        ),
+        # Generic charge wording, no card digits; the merchant follows the
+        # last "en" before the date
+        (
+            "Se ha realizado un cargo en Chile de $9.990,50 en NETFLIX.COM el "
+            "15/06/2025",
+            9990.5,
+            "Netflix.com",
+            datetime(2025, 6, 15),
+            PaymentMethod.CREDIT_CARD,
+            None,
+        ),
+    ],
+)
+def test_parse_email(email, amount, merchant, transaction_date, payment_method, card):
+    expense = parse_email(email, "alertas@banco.cl")
+
+    assert (
+        expense.amount,
+        expense.merchant,
+        expense.transaction_date,
+        expense.payment_method,
+        expense.card_last_four,
+    ) == (amount, merchant, transaction_date, payment_method, card)
+    assert expense.source_email == "alertas@banco.cl"
+    assert expense.raw_data == email
+
+
+@pytest.mark.parametrize(
+    "email, error",
+    [
+        ("Hola, gracias por tu visita", "No amount found"),
+        ("Compra por $5.000 el 10/01/2025", "No merchant found"),
+    ],
+)
+def test_parse_email_rejects(email, error):
+    with pytest.raises(ValueError, match=error):
+        parse_email(email)
+
+
+def test_raw_webhook_creates_the_parsed_expense(client):
+    response = client.post(
+        "/expenses/webhook/raw",
+        json={"raw_data": CREDIT_CARD_EMAIL, "source_email": "alertas@banco.cl"},
+    )
+    assert response.status_code == 200
+    expense = response.json()
+    assert (expense["amount"], expense["merchant"], expense["payment_method"]) == (
+        71000.0,
+        "El Baco Santiago Cl",
+        "CREDIT_CARD",
+    )
+    # Billed on the card's cycle: the 25th after the purchase
+    assert expense["billing_date"].startswith("2025-07-25")
+
+    response = client.post("/expenses/webhook/raw", json={"raw_data": "Hola"})
+    assert response.status_code == 422
@@ -0,0 +1,70 @@
+"""
+GET /expenses/export streams every matching expense as CSV or NDJSON,
+with the get_expenses filters and no paging.
+"""
+
+import csv
+import io
+import json
+
+
+def create_expenses(client):
+    category_id = client.post("/categories/", json={"name": "Groceries"}).json()["id"]
+    for n, (merchant, payment_method) in enumerate(
+        [("Jumbo", "DEBIT_CARD"), ("Lider", "CREDIT_CARD"), ("Copec", "DEBIT_CARD")]
+    ):
+        client.post(
+            "/expenses/",
+            json={
+                "amount": 1000 * (n + 1),
+                "merchant": merchant,
+                "transaction_date": f"2025-01-{10 + n}T12:00:00",
+                "payment_method": payment_method,
+                "card_last_four": "1234",
+                "category_id": category_id if merchant != "Copec" else None,
+            },
+        )
+
+
+def test_export_csv(client, sync_sessions):
+    create_expenses(client)
+
+    response = client.get("/expenses/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="expenses.csv"' in response.headers["content-disposition"]
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted((row["merchant"], row["amount"]) for row in rows) == [
+        ("Copec", "3000.0"),
+        ("Jumbo", "1000.0"),
+        ("Lider", "2000.0"),
+    ]
+    jumbo = next(row for row in rows if row["merchant"] == "Jumbo")
+    assert jumbo["category_name"] == "Groceries"
+    assert jumbo["payment_method"] == "DEBIT_CARD"
+    assert jumbo["transaction_date"].startswith("2025-01-10T12:00:00")
+
+
+def test_export_ndjson_honours_filters(client, sync_sessions):
+    create_expenses(client)
+
+    response = client.get(
+        "/expenses/export",
+        params={"payment_method": "DEBIT_CARD", "start_date": "2025-01-11T00:00:00"},
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["merchant"], line["category_name"]) for line in lines] == [
+        ("Copec", None)
+    ]
+
+    response = client.get("/expenses/export", params={"merchant": "lid"})
+    assert [json.loads(line)["merchant"] for line in response.text.splitlines()] == [
+        "Lider"
+    ]
+
+
+def test_empty_csv_export_keeps_its_header(client, sync_sessions):
+    response = client.get("/expenses/export", params={"format": "csv"})
+    assert response.text.splitlines()[0].split(",")[:3] == ["id", "amount", "merchant"]
@@ -0,0 +1,68 @@
+"""
+GET /expenses/?fields= reads only the named columns; raw_data comes back
+decompressed from expense_raw, and unknown names are a 400.
+"""
+
+RAW_EMAIL = "Compra por $12.990 en JUMBO con Tarjeta de Crédito ****1234"
+
+
+def create_expenses(client):
+    category_id = client.post("/categories/", json={"name": "Groceries"}).json()["id"]
+    client.post(
+        "/expenses/",
+        json={
+            "amount": 12990,
+            "merchant": "Jumbo",
+            "transaction_date": "2025-01-15T12:00:00",
+            "category_id": category_id,
+            "raw_data": RAW_EMAIL,
+        },
+    )
+    client.post(
+        "/expenses/",
+        json={
+            "amount": 3500,
+            "merchant": "Starbucks",
+            "transaction_date": "2025-01-16T09:00:00",
+        },
+    )
+
+
+def test_fields_projection(client):
+    create_expenses(client)
+
+    response = client.get(
+        "/expenses/", params={"fields": "merchant, raw_data,category_name,merchant"}
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"merchant": "Starbucks", "raw_data": None, "category_name": None},
+        {"merchant": "Jumbo", "raw_data": RAW_EMAIL, "category_name": "Groceries"},
+    ]
+
+    # Plain lists leave raw_data out
+    assert "raw_data" not in client.get("/expenses/").json()[0]
+
+
+def test_fields_projection_pages_with_a_cursor(client):
+    create_expenses(client)
+
+    page = client.get(
+        "/expenses/", params={"fields": "amount", "limit": 1, "use_cursor": True}
+    ).json()
+    assert page["items"] == [{"amount": 3500.0}]
+
+    page = client.get(
+        "/expenses/",
+        params={"fields": "amount", "limit": 1, "cursor": page["next_cursor"]},
+    ).json()
+    assert page == {"items": [{"amount": 12990.0}], "next_cursor": None}
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/expenses/", params={"fields": "amount,password,secret"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Unknown fields: password, secret.")
+
+    response = client.get("/expenses/", params={"fields": " , "})
+    assert response.status_code == 400
@@ -0,0 +1,71 @@
+"""
+Keyset paging on GET /expenses/: pages follow (date, id) descending, so rows
+that tie on the date are neither skipped nor repeated, under either date basis.
+"""
+
+import pytest
+
+
+def create_expenses(client):
+    # Credit card purchases in one cycle: pairs tie on the transaction date,
+    # and all of them tie on the billing date (the 25th)
+    expenses = []
+    for n in range(7):
+        response = client.post(
+            "/expenses/",
+            json={
+                "amount": 1000 + n,
+                "merchant": f"Merchant {n}",
+                "transaction_date": f"2025-01-{10 + n // 2:02d}T12:00:00",
+                "payment_method": "CREDIT_CARD",
+                "card_last_four": "1234",
+            },
+        )
+        assert response.status_code == 200
+        expenses.append(response.json())
+    return expenses
+
+
+def page_through(client, use_billing_date, limit=2):
+    params = {"limit": limit, "use_cursor": True, "use_billing_date": use_billing_date}
+    ids = []
+    while True:
+        body = client.get("/expenses/", params=params).json()
+        assert len(body["items"]) <= limit
+        ids.extend(item["id"] for item in body["items"])
+        if body["next_cursor"] is None:
+            return ids
+        params["cursor"] = body["next_cursor"]
+
+
+@pytest.mark.parametrize("use_billing_date", [False, True])
+def test_keyset_pages_through_ties(client, use_billing_date):
+    expenses = create_expenses(client)
+    date_field = "billing_date" if use_billing_date else "transaction_date"
+    assert len({expense["billing_date"] for expense in expenses}) == 1
+
+    expected = [
+        expense["id"]
+        for expense in sorted(
+            expenses,
+            key=lambda expense: (expense[date_field], expense["id"]),
+            reverse=True,
+        )
+    ]
+    assert page_through(client, use_billing_date) == expected
+
+
+def test_cursor_from_the_other_date_basis_is_rejected(client):
+    create_expenses(client)
+    cursor = client.get(
+        "/expenses/", params={"limit": 2, "use_cursor": True}
+    ).json()["next_cursor"]
+
+    response = client.get(
+        "/expenses/", params={"limit": 2, "cursor": cursor, "use_billing_date": True}
+    )
+    assert response.status_code == 400
+    assert "use_billing_date" in response.json()["detail"]
+
+    response = client.get("/expenses/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+"""
+Categories are loaded in bulk: the number of SQL statements per request
+must not grow with the number of expenses returned.
+"""
+
+import pytest
+
+
+def create_categories(client, count):
+    return [
+        client.post("/categories/", json={"name": f"Category {n}"}).json()["id"]
+        for n in range(count)
+    ]
+
+
+def create_expenses(client, category_ids, count):
+    for n in range(count):
+        response = client.post(
+            "/expenses/",
+            json={
+                "amount": 1000 + n,
+                "merchant": f"Merchant {n}",
+                "transaction_date": f"2025-01-{n % 28 + 1:02d}T12:00:00",
+                "category_id": category_ids[n % len(category_ids)],
+            },
+        )
+        assert response.status_code == 200
+
+
+def count_statements(client, statements, path, **params):
+    statements.clear()
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+    return len(statements), response.json()
+
+
+@pytest.mark.parametrize("use_cursor", [False, True])
+def test_list_statement_count_does_not_grow_with_page_size(
+    client, statements, use_cursor
+):
+    category_ids = create_categories(client, 10)
+    create_expenses(client, category_ids, 120)
+
+    counts = {}
+    for limit in (5, 50, 120):
+        counts[limit], body = count_statements(
+            client, statements, "/expenses/", limit=limit, use_cursor=use_cursor
+        )
+        items = body["items"] if use_cursor else body
+        assert len(items) == limit
+        assert all(item["category"]["id"] == item["category_id"] for item in items)
+
+    assert counts[5] == counts[50] == counts[120]
+
+
+def test_single_expense_paths_load_category_with_the_expense(client, statements):
+    (category_id,) = create_categories(client, 1)
+    payload = {
+        "amount": 4990,
+        "merchant": "Lider Express",
+        "transaction_date": "2025-01-15T12:00:00",
+        "category_id": category_id,
+    }
+
+    created = client.post("/expenses/", json=payload).json()
+    assert created["category"]["id"] == category_id
+
+    statements.clear()
+    fetched = client.get(f"/expenses/{created['id']}").json()
+    assert fetched["category"]["id"] == category_id
+    # The expense row plus one batched category load
+    assert len(statements) == 2
+
+    client.post(
+        "/merchant-rules/",
+        json={"merchant_pattern": "starbucks", "category_id": category_id},
+    )
+    webhook = client.post(
+        "/expenses/webhook",
+        json={
+            "amount": 3500,
+            "merchant": "Starbucks",
+            "transaction_date": "2025-01-16T09:00:00",
+        },
+    ).json()
+    assert webhook["category"]["id"] == category_id
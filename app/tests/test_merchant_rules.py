@@ -0,0 +1,22 @@
+"""
+POST /merchant-rules/test-rule scores a pattern the way categorization does.
+"""
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "merchant, pattern, is_regex, confidence, matches",
+    [
+        ("Starbucks", "STARBUCKS", False, 1.0, True),
+        ("Jumbo", "starbucks", False, 0.14, False),
+        ("UBER TRIP", r"uber\s", True, 1.0, True),
+        ("Uber", "(", True, 0.0, False),
+    ],
+)
+def test_rule_confidence(client, merchant, pattern, is_regex, confidence, matches):
+    body = client.post(
+        "/merchant-rules/test-rule",
+        params={"merchant": merchant, "pattern": pattern, "is_regex": is_regex},
+    ).json()
+    assert (body["confidence"], body["matches"]) == (confidence, matches)
@@ -0,0 +1,88 @@
+"""
+MetricsMiddleware counts requests per route template and status, and sends
+the per-phase timings out in Server-Timing; /metrics exposes the counters.
+"""
+
+from database import get_async_db
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from metrics import MetricsMiddleware, metrics_response, server_timing
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+import pytest
+from routers import categories, expenses
+
+
+@pytest.fixture
+def metrics_client(override_get_async_db):
+    # The conftest app plus the middleware and endpoint main.py adds
+    app = FastAPI()
+    for module in (expenses, categories):
+        app.include_router(module.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_response, include_in_schema=False)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def requests_total(method, route, status):
+    labels = {"method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+
+def test_requests_are_counted_by_route_template(metrics_client):
+    before = {
+        "found": requests_total("GET", "/expenses/{expense_id}", "200"),
+        "missing": requests_total("GET", "/expenses/{expense_id}", "404"),
+        "created": requests_total("POST", "/expenses/", "200"),
+    }
+
+    created = metrics_client.post(
+        "/expenses/",
+        json={
+            "amount": 4990,
+            "merchant": "Lider Express",
+            "transaction_date": "2025-01-15T12:00:00",
+        },
+    ).json()
+    response = metrics_client.get(f"/expenses/{created['id']}")
+    metrics_client.get(f"/expenses/{created['id']}")
+    metrics_client.get("/expenses/999999")
+
+    assert requests_total("GET", "/expenses/{expense_id}", "200") == before["found"] + 2
+    assert requests_total("GET", "/expenses/{expense_id}", "404") == before["missing"] + 1
+    assert requests_total("POST", "/expenses/", "200") == before["created"] + 1
+
+    # The database time of the request, then the total
+    timing = response.headers["server-timing"]
+    assert timing.startswith('db;desc="Database";dur=')
+    assert 'app;desc="Total";dur=' in timing
+
+
+def test_metrics_endpoint_exposes_the_counters(metrics_client):
+    metrics_client.get("/categories/")
+
+    response = metrics_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    families = {
+        family.name: family for family in text_string_to_metric_families(response.text)
+    }
+    assert any(
+        sample.labels == {"method": "GET", "route": "/categories/", "status": "200"}
+        and sample.value >= 1
+        for sample in families["http_requests"].samples
+    )
+    assert "http_request_duration_seconds" in families
+    assert "http_request_phase_seconds" in families
+    assert "categorization_queue_depth" in families
+
+
+def test_server_timing():
+    assert server_timing({"db": 0.0123, "categorization": 0.002}, 0.05) == (
+        'db;desc="Database";dur=12.3, '
+        'categorization;desc="Categorization";dur=2.0, '
+        'app;desc="Total";dur=50.0'
+    )
@@ -0,0 +1,131 @@
+"""
+Alembic: a database at the first revision (c0f59c807e22) upgrades to head
+and ends up with the schema the models describe, its data carried over.
+
+The migrations are Postgres only (pg_type, pg_trgm, UPDATE ... FROM). Set
+TEST_POSTGRES_URL to a scratch database to run this; its public schema is
+dropped and recreated.
+"""
+
+import os
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from database import Base
+import models  # noqa: F401  # Registers the tables on Base.metadata
+from models import Expense
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+APP_DIR = Path(__file__).parent.parent
+
+pytestmark = pytest.mark.skipif(
+    not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set"
+)
+
+# The schema as of c0f59c807e22 (models.py at the time, plus that migration)
+FIRST_REVISION_DDL = """
+    CREATE TYPE paymentmethod AS ENUM (
+        'CREDIT_CARD', 'DEBIT_CARD', 'BANK_TRANSFER', 'CASH'
+    );
+    CREATE TABLE categories (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(100) NOT NULL UNIQUE,
+        description TEXT,
+        color VARCHAR(7),
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    );
+    CREATE TABLE merchant_rules (
+        id SERIAL PRIMARY KEY,
+        merchant_pattern VARCHAR(255) NOT NULL,
+        category_id INTEGER NOT NULL REFERENCES categories (id),
+        is_regex BOOLEAN,
+        priority INTEGER,
+        is_active BOOLEAN,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    );
+    CREATE TABLE expenses (
+        id SERIAL PRIMARY KEY,
+        amount FLOAT NOT NULL,
+        merchant VARCHAR(255) NOT NULL,
+        description TEXT,
+        transaction_date TIMESTAMP WITH TIME ZONE NOT NULL,
+        category_id INTEGER REFERENCES categories (id),
+        payment_method paymentmethod NOT NULL DEFAULT 'DEBIT_CARD',
+        billing_date TIMESTAMP WITH TIME ZONE NOT NULL,
+        card_last_four VARCHAR(4),
+        source_email VARCHAR(255),
+        raw_data TEXT,
+        auto_categorized BOOLEAN,
+        confidence_score FLOAT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    );
+"""
+
+RAW_EMAIL = "Compra por $12.990 en JUMBO con tarjeta terminada en 1234"
+
+
+@pytest.fixture
+def alembic_config(monkeypatch):
+    # env.py prefers DATABASE_POSTGRES_URL over the configured URL
+    monkeypatch.delenv("DATABASE_POSTGRES_URL", raising=False)
+    config = Config(str(APP_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(APP_DIR / "alembic"))
+    config.set_main_option("sqlalchemy.url", POSTGRES_URL.replace("%", "%%"))
+    return config
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(POSTGRES_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_from_first_revision_to_head(engine, alembic_config):
+    with engine.begin() as conn:
+        conn.execute(text(FIRST_REVISION_DDL))
+        category_id = conn.execute(
+            text("INSERT INTO categories (name) VALUES ('Groceries') RETURNING id")
+        ).scalar()
+        conn.execute(
+            text(
+                "INSERT INTO expenses (amount, merchant, transaction_date, "
+                "category_id, payment_method, billing_date, source_email, "
+                "raw_data) VALUES (12990, 'JUMBO', '2025-01-15 12:00+00', "
+                ":category_id, 'DEBIT_CARD', '2025-01-15 12:00+00', "
+                "'alertas@banco.cl', :raw_data)"
+            ),
+            {"category_id": category_id, "raw_data": RAW_EMAIL},
+        )
+    command.stamp(alembic_config, "c0f59c807e22")
+
+    command.upgrade(alembic_config, "head")
+
+    head = ScriptDirectory.from_config(alembic_config).get_current_head()
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT version_num FROM alembic_version"))
+        assert version.scalar() == head
+        assert conn.execute(
+            text("SELECT date_basis, total_amount FROM monthly_rollups ORDER BY 1")
+        ).all() == [("TRANSACTION", 12990), ("BILLING", 12990)]
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == set(table.columns.keys()), table.name
+
+    with Session(engine) as session:
+        expense = session.scalars(select(Expense)).one()
+        assert expense.raw_data == RAW_EMAIL
+        assert expense.fingerprint is not None
@@ -0,0 +1,53 @@
+"""
+POST /expenses/recategorize categorizes expenses added before their rule,
+in a worker thread with its own sync session.
+"""
+
+import json
+
+
+def create_uncategorized(client):
+    for merchant in ("Starbucks", "STARBUCKS", "Unknown Shop"):
+        client.post(
+            "/expenses/",
+            json={
+                "amount": 3500,
+                "merchant": merchant,
+                "transaction_date": "2025-01-16T09:00:00",
+            },
+        )
+    category_id = client.post("/categories/", json={"name": "Coffee"}).json()["id"]
+    client.post(
+        "/merchant-rules/",
+        json={"merchant_pattern": "starbucks", "category_id": category_id},
+    )
+    return category_id
+
+
+def test_recategorize(client, sync_sessions):
+    category_id = create_uncategorized(client)
+
+    body = client.post("/expenses/recategorize", params={"chunk_size": 100}).json()
+    assert (body["total_expenses"], body["categorized"]) == (3, 2)
+    assert body["remaining_uncategorized"] == 1
+
+    listed = client.get("/expenses/").json()
+    assert sorted(
+        (expense["merchant"], expense["category_id"]) for expense in listed
+    ) == [("STARBUCKS", category_id), ("Starbucks", category_id), ("Unknown Shop", None)]
+
+
+def test_recategorize_streams_progress(client, sync_sessions):
+    create_uncategorized(client)
+
+    response = client.post(
+        "/expenses/recategorize", params={"chunk_size": 100, "stream_progress": True}
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {
+        "processed": 3,
+        "total_expenses": 3,
+        "categorized": 2,
+        "chunks": 1,
+        "done": True,
+    }
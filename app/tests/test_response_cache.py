@@ -0,0 +1,76 @@
+"""
+GET /categories/ and GET /merchant-rules/ are served from the response cache
+with a strong ETag; If-None-Match gets a 304 without a query, and writes
+change the ETag.
+"""
+
+import pytest
+
+
+def test_category_list_etag(client, statements):
+    client.post("/categories/", json={"name": "Groceries"})
+
+    first = client.get("/categories/")
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and first.headers["cache-control"] == "no-cache"
+    assert [category["name"] for category in first.json()] == ["Groceries"]
+
+    statements.clear()
+    response = client.get("/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    # Cached bodies are also served without a query
+    assert client.get("/categories/").json() == first.json()
+    assert statements == []
+
+    client.post("/categories/", json={"name": "Transport"})
+    response = client.get("/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [category["name"] for category in response.json()] == [
+        "Groceries",
+        "Transport",
+    ]
+
+
+@pytest.mark.parametrize(
+    "if_none_match, status",
+    [
+        ("{etag}", 304),
+        ('W/{etag}, "other"', 304),
+        ("*", 304),
+        ('"other"', 200),
+    ],
+)
+def test_merchant_rules_if_none_match(client, if_none_match, status):
+    category_id = client.post("/categories/", json={"name": "Coffee"}).json()["id"]
+    client.post(
+        "/merchant-rules/",
+        json={"merchant_pattern": "starbucks", "category_id": category_id},
+    )
+    etag = client.get("/merchant-rules/").headers["etag"]
+
+    response = client.get(
+        "/merchant-rules/",
+        headers={"If-None-Match": if_none_match.format(etag=etag)},
+    )
+    assert response.status_code == status
+
+
+def test_category_write_changes_the_merchant_rules_etag(client):
+    category_id = client.post("/categories/", json={"name": "Coffee"}).json()["id"]
+    client.post(
+        "/merchant-rules/",
+        json={"merchant_pattern": "starbucks", "category_id": category_id},
+    )
+    # Each active_only variant is cached under its own key
+    etag = client.get("/merchant-rules/").headers["etag"]
+    active = client.get("/merchant-rules/", params={"active_only": True})
+    assert active.json()[0]["category"]["name"] == "Coffee"
+
+    # Rules embed their category, so renaming it must not serve the old body
+    client.put(f"/categories/{category_id}", json={"name": "Cafe"})
+    response = client.get("/merchant-rules/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["category"]["name"] == "Cafe"
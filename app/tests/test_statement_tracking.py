@@ -0,0 +1,77 @@
+"""
+Per-request statement tracking: strict mode catches N+1 queries, and the
+slow-query log never contains parameter values.
+"""
+
+import asyncio
+import logging
+
+from conftest import STRICT_REPEAT_LIMIT
+import database
+from database import (
+    RepeatedStatementError,
+    current_query_stats,
+    get_db,
+    track_queries,
+)
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from models import Category
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+
+def test_strict_mode_fails_on_repeated_statement_shape(async_engine):
+    async def load_one_by_one(count):
+        async with AsyncSession(async_engine) as session:
+            with track_queries() as stats:
+                for category_id in range(1, count + 1):
+                    await session.get(Category, category_id)
+        return stats
+
+    stats = asyncio.run(load_one_by_one(STRICT_REPEAT_LIMIT))
+    assert stats.statements == STRICT_REPEAT_LIMIT
+
+    with pytest.raises(RepeatedStatementError):
+        asyncio.run(load_one_by_one(STRICT_REPEAT_LIMIT + 1))
+
+
+def test_slow_query_log_redacts_parameters(client, monkeypatch, caplog):
+    monkeypatch.setattr(database, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="expense_tracker.slow_query"):
+        response = client.post(
+            "/expenses/",
+            json={
+                "amount": 123456,
+                "merchant": "Farmacia Secreta",
+                "transaction_date": "2025-01-15T12:00:00",
+            },
+        )
+    assert response.status_code == 200
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("slow query") for message in messages)
+    assert not any(
+        "Farmacia Secreta" in message or "123456" in message for message in messages
+    )
+
+
+def test_get_db_tracks_a_sync_route(database_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{database_path}")
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(engine))
+
+    app = FastAPI()
+
+    @app.get("/categories")
+    def list_categories(db: Session = Depends(get_db)):
+        db.scalars(select(Category)).all()
+        return current_query_stats().as_dict()
+
+    with TestClient(app) as client:
+        for _ in range(2):
+            response = client.get("/categories")
+            assert response.status_code == 200
+            assert response.json()["statements"] == 1
+    engine.dispose()
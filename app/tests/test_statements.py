@@ -0,0 +1,153 @@
+"""
+Bank statement import: amount parsing, the CSV and OFX readers, and the
+all-or-nothing POST /expenses/import.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from models import PaymentMethod
+import pytest
+from services.amounts import parse_amount
+from services.statements import iter_csv_rows, iter_ofx_rows
+
+
+@pytest.mark.parametrize(
+    "text, amount",
+    [
+        ("$12.345", 12345.0),
+        ("CLP 5.990", 5990.0),
+        ("1.234.567", 1234567.0),
+        ("12.345,67", 12345.67),
+        ("-1,234.50", -1234.5),
+        ("12,50", 12.5),
+        ("12.5", 12.5),
+        # One separator and three digits: thousands, unless the units are 0
+        ("1,500", 1500.0),
+        ("0.500", 0.5),
+        ("0,500", 0.5),
+        ("-0.500", -0.5),
+        (".500", 0.5),
+    ],
+)
+def test_parse_amount(text, amount):
+    assert parse_amount(text) == amount
+
+
+@pytest.mark.parametrize("text", ["", "-", "abc", "1-2"])
+def test_parse_amount_rejects(text):
+    with pytest.raises(ValueError, match="Invalid amount"):
+        parse_amount(text)
+
+
+def test_csv_rows():
+    lines = [
+        "Fecha,Comercio,Monto,Glosa\n",
+        "15/01/2025,JUMBO,-12.990,Compra\n",
+        "\n",
+        "16/01/2025,COPEC,\"$45.000\",\n",
+        "32/01/2025,UBER,5.000,\n",
+        "17/01/2025,,1.000,\n",
+    ]
+    rows = list(iter_csv_rows(lines, PaymentMethod.CREDIT_CARD, "1234"))
+
+    assert rows[0] == (
+        2,
+        {
+            "transaction_date": datetime(2025, 1, 15),
+            "amount": 12990.0,
+            "merchant": "JUMBO",
+            "description": "Compra",
+            "payment_method": PaymentMethod.CREDIT_CARD,
+            "card_last_four": "1234",
+        },
+    )
+    assert (rows[1][0], rows[1][1]["amount"]) == (4, 45000.0)
+    # Rejected rows keep their line numbers; the blank line is skipped
+    assert [(line, str(error)) for line, error in rows[2:]] == [
+        (5, "Invalid date: '32/01/2025'"),
+        (6, "Missing merchant"),
+    ]
+
+
+def test_csv_header_must_name_the_required_columns():
+    with pytest.raises(ValueError, match="amount"):
+        list(iter_csv_rows(["Fecha,Comercio\n", "15/01/2025,JUMBO\n"]))
+
+
+# SGML OFX: no closing tags on elements, nor on the last transaction
+SGML_OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX>
+<CREDITCARDMSGSRSV1>
+<CCSTMTTRNRS>
+<CCSTMTRS>
+<CURDEF>CLP
+<CCACCTFROM>
+<ACCTID>4567890123451234
+</CCACCTFROM>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250115120000[-3:CLT]
+<TRNAMT>-12990
+<NAME>JUMBO
+<MEMO>Compra nacional
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20250116
+<TRNAMT>50000
+<NAME>PAGO TARJETA
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250117
+<TRNAMT>-3500.50
+<NAME>STARBUCKS
+"""
+
+
+def test_ofx_sgml_rows():
+    rows = list(iter_ofx_rows(SGML_OFX.splitlines(keepends=True)))
+
+    assert rows[0] == (
+        13,
+        {
+            "amount": 12990.0,
+            "merchant": "JUMBO",
+            "description": "Compra nacional",
+            "transaction_date": datetime(
+                2025, 1, 15, 12, 0, tzinfo=timezone(timedelta(hours=-3))
+            ),
+            # A credit card statement; the account number gives the card
+            "payment_method": PaymentMethod.CREDIT_CARD,
+            "card_last_four": "1234",
+        },
+    )
+    line, credit = rows[1]
+    assert (line, str(credit)) == (20, "Credit transaction, not an expense")
+    assert rows[2][0] == 26
+    assert (rows[2][1]["merchant"], rows[2][1]["amount"]) == ("STARBUCKS", 3500.5)
+
+
+def test_failed_import_imports_nothing(client, sync_sessions):
+    valid = "".join(
+        f"15/01/2025,Comercio {n},{1000 + n}\n" for n in range(1500)
+    ).encode()
+    # Undecodable bytes after the first batch has been loaded
+    content = b"Fecha,Comercio,Monto\n" + valid + b"16/01/2025,Caf\xe9,1000\n"
+
+    response = client.post(
+        "/expenses/import", files={"file": ("movimientos.csv", content)}
+    )
+    assert response.status_code == 400
+    assert client.get("/expenses/").json() == []
+    summary = client.get("/expenses/analytics/summary").json()
+    assert summary["transaction_count"] == 0
+
+    response = client.post(
+        "/expenses/import",
+        files={"file": ("movimientos.csv", b"Fecha,Comercio,Monto\n" + valid)},
+    )
+    assert response.json()["imported"] == 1500
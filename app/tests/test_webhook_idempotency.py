@@ -0,0 +1,65 @@
+"""
+Webhook deliveries are idempotent: a payload received again returns the
+expense its first delivery created instead of inserting a duplicate.
+"""
+
+PAYLOAD = {
+    "amount": 3500,
+    "merchant": "Starbucks",
+    "transaction_date": "2025-01-16T09:00:00",
+    "source_email": "alertas@banco.cl",
+    "raw_data": "Compra por $3.500 en STARBUCKS con tarjeta terminada en 1234",
+}
+
+
+def expense_count(client):
+    return len(client.get("/expenses/", params={"limit": 100}).json())
+
+
+def test_redelivered_webhook_returns_the_first_expense(client):
+    first = client.post("/expenses/webhook", json=PAYLOAD).json()
+    again = client.post("/expenses/webhook", json=PAYLOAD).json()
+
+    assert again["id"] == first["id"]
+    assert expense_count(client) == 1
+
+    other = client.post("/expenses/webhook", json={**PAYLOAD, "amount": 4000}).json()
+    assert other["id"] != first["id"]
+
+
+def test_batch_reports_duplicates(client):
+    first = client.post("/expenses/webhook", json=PAYLOAD).json()
+    new = {**PAYLOAD, "amount": 1990}
+
+    body = client.post("/expenses/webhook/batch", json=[PAYLOAD, new, new]).json()
+
+    assert (body["created"], body["duplicates"], body["failed"]) == (1, 2, 0)
+    statuses = [(item["status"], item["expense_id"]) for item in body["results"]]
+    assert statuses[0] == ("duplicate", first["id"])
+    assert statuses[1][0] == "created"
+    assert statuses[2] == ("duplicate", statuses[1][1])
+    assert expense_count(client) == 2
+
+
+def test_redelivery_with_a_new_date_is_a_duplicate(client):
+    # Parsers fall back to the current time when the email has no date
+    first = client.post("/expenses/webhook", json=PAYLOAD).json()
+    again = client.post(
+        "/expenses/webhook", json={**PAYLOAD, "transaction_date": "2025-01-17T10:30:00"}
+    ).json()
+
+    assert again["id"] == first["id"]
+    assert expense_count(client) == 1
+
+
+def test_payloads_without_raw_data_or_source_are_not_deduplicated(client):
+    # Two purchases of the same amount at the same time
+    purchase = {k: PAYLOAD[k] for k in ("amount", "merchant", "transaction_date")}
+    first = client.post("/expenses/webhook", json=purchase).json()
+    second = client.post("/expenses/webhook", json=purchase).json()
+    assert second["id"] != first["id"]
+
+    body = client.post("/expenses/webhook/batch", json=[purchase, purchase]).json()
+    assert (body["created"], body["duplicates"], body["failed"]) == (2, 0, 0)
+    assert len({item["expense_id"] for item in body["results"]}) == 2
+    assert expense_count(client) == 4
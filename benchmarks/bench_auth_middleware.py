@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+API key middleware benchmark: @app.middleware("http") vs ApiKeyMiddleware.
+
+Mounts the same two endpoints, a small JSON response and a streamed body,
+behind the previous BaseHTTPMiddleware key check and behind the pure ASGI
+ApiKeyMiddleware, and calls the ASGI apps directly (no server or socket,
+so only the middleware and routing differ). Reports requests per second
+for the JSON endpoint at each concurrency level, and time to first chunk
+and total time for the stream:
+
+    python benchmarks/bench_auth_middleware.py --requests 20000 \\
+        --concurrency 1 50 --chunks 2000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from auth import ApiKeyMiddleware, hash_key  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, StreamingResponse  # noqa: E402
+
+API_KEY = "bench-key"
+CHUNK = b"x" * 4096
+
+
+def add_endpoints(app: FastAPI, chunks: int) -> FastAPI:
+    @app.get("/expenses/")
+    async def small():
+        return {"items": [{"id": n, "amount": 1000 + n} for n in range(20)]}
+
+    @app.get("/expenses/export")
+    async def stream():
+        async def body():
+            for _ in range(chunks):
+                yield CHUNK
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    return app
+
+
+def legacy_app(chunks: int) -> FastAPI:
+    """The key check as it was: BaseHTTPMiddleware and a plain comparison."""
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def api_key_middleware(request: Request, call_next):
+        if request.url.path in ["/docs", "/redoc", "/openapi.json", "/health", "/metrics"]:
+            return await call_next(request)
+        api_key = request.headers.get("x-api-key")
+        if not api_key:
+            return JSONResponse(status_code=401, content={"detail": "API key is required."})
+        if api_key != API_KEY:
+            return JSONResponse(status_code=403, content={"detail": "Invalid API key."})
+        return await call_next(request)
+
+    return add_endpoints(app, chunks)
+
+
+def asgi_app(chunks: int) -> FastAPI:
+    app = FastAPI()
+    # A few scoped keys besides the full-access one, as in a real deployment
+    keys = [(bytes.fromhex(hash_key(API_KEY)), "all")] + [
+        (bytes.fromhex(hash_key(f"other-{n}")), scope)
+        for n, scope in enumerate(("read", "webhook", "mcp"))
+    ]
+    app.add_middleware(ApiKeyMiddleware, keys=keys)
+    return add_endpoints(app, chunks)
+
+
+async def call(app, path: str) -> tuple[float, float, int]:
+    """(seconds to first body chunk, seconds to the end, status) of one GET."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"x-api-key", API_KEY.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    first_chunk = None
+    status = 0
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        # Like a server: the (empty) body, then disconnect once answered
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal first_chunk, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if first_chunk is None:
+                first_chunk = time.perf_counter()
+            if not message.get("more_body", False):
+                response_done.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    end = time.perf_counter()
+    return (first_chunk or end) - start, end - start, status
+
+
+async def throughput(app, requests: int, concurrency: int) -> float:
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            _, _, status = await call(app, "/expenses/")
+            assert status == 200, status
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+async def streaming(app, repeat: int) -> tuple[float, float]:
+    """Best time to first chunk and best total time of the stream, in ms."""
+    runs = [await call(app, "/expenses/export") for _ in range(repeat)]
+    return min(run[0] for run in runs) * 1000, min(run[1] for run in runs) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50])
+    parser.add_argument(
+        "--chunks", type=int, default=2000, help="4 KiB chunks per streamed response"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    apps = {
+        "http middleware": legacy_app(args.chunks),
+        "pure ASGI": asgi_app(args.chunks),
+    }
+    for app in apps.values():
+        await throughput(app, 200, 1)  # warm up routing and validation
+
+    print(f"{'middleware':<16} {'clients':>8} {'req/s':>10}")
+    for concurrency in args.concurrency:
+        for name, app in apps.items():
+            rps = await throughput(app, args.requests, concurrency)
+            print(f"{name:<16} {concurrency:>8} {rps:>10.0f}")
+
+    size_mb = args.chunks * len(CHUNK) / 1024 / 1024
+    print(f"\nstream of {size_mb:.1f} MiB")
+    print(f"{'middleware':<16} {'first chunk ms':>15} {'total ms':>10}")
+    for name, app in apps.items():
+        first, total = await streaming(app, args.repeat)
+        print(f"{name:<16} {first:>15.2f} {total:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Categorization latency benchmark.
+
+Times ExpenseCategorizationService matching against synthetic merchant rule
+sets of increasing size, comparing the compiled rule set with the previous
+per-call path (rescoring every rule with legacy_confidence).
+The database is not involved: both paths receive the rules in memory, so
+the legacy numbers exclude the per-expense rules query it used to issue.
+
+Usage:
+    python benchmarks/bench_categorization.py [--sizes 1000 10000 50000]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from fuzzywuzzy import fuzz  # noqa: E402
+from services.categorization import (  # noqa: E402
+    CompiledRuleSet,
+    ExpenseCategorizationService,
+)
+
+WORDS = [
+    "super", "lider", "jumbo", "unimarc", "copec", "shell", "falabella",
+    "ripley", "paris", "cruz", "verde", "salcobrand", "uber", "cabify",
+    "rappi", "pedidos", "ya", "starbucks", "baco", "santiago", "express",
+    "farmacia", "mall", "plaza", "costanera", "sodimac", "easy", "entel",
+    "movistar", "netflix", "spotify", "metro", "bip", "latam", "sky",
+]
+
+
+def make_rules(count: int, rng: random.Random) -> list[SimpleNamespace]:
+    """Generate rules in priority order; roughly 1 in 20 is a regex."""
+    rules = []
+    for rule_id in range(1, count + 1):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        if rule_id % 20 == 0:
+            pattern = r"\b" + r".*".join(words) + r"\b"
+            is_regex = True
+        else:
+            pattern = " ".join(words) + f" {rule_id}"
+            is_regex = False
+        rules.append(
+            SimpleNamespace(
+                id=rule_id,
+                category_id=rng.randint(1, 9),
+                merchant_pattern=pattern,
+                is_regex=is_regex,
+                priority=rng.randint(1, 10),
+            )
+        )
+    rules.sort(key=lambda r: (-r.priority, r.id))
+    return rules
+
+
+def make_merchants(count: int, rng: random.Random) -> list[str]:
+    return [
+        " ".join(rng.sample(WORDS, rng.randint(1, 4))).upper() + " CL"
+        for _ in range(count)
+    ]
+
+
+def legacy_confidence(merchant: str, pattern: str, is_regex: bool) -> float:
+    """Per-rule scoring of the pre-compiled path (regex compiled per call)."""
+    if is_regex:
+        try:
+            return 100.0 if re.search(pattern, merchant, re.IGNORECASE) else 0.0
+        except re.error:
+            return 0.0
+    return float(fuzz.ratio(merchant.lower(), pattern.lower()))
+
+
+def legacy_categorize(service, rules, merchant):
+    """The pre-compiled-cache loop, minus its per-call rules query."""
+    best_match = None
+    best_confidence = 0.0
+    for rule in rules:
+        confidence = legacy_confidence(merchant, rule.merchant_pattern, rule.is_regex)
+        if confidence > best_confidence and confidence >= service.fuzzy_threshold:
+            best_match = rule
+            best_confidence = confidence
+            if confidence >= 95:
+                break
+    return best_match, best_confidence
+
+
+def time_calls(func, merchants):
+    samples = []
+    for merchant in merchants:
+        start = time.perf_counter()
+        func(merchant)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--merchants", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    merchants = make_merchants(args.merchants, rng)
+    service = ExpenseCategorizationService(db=None)
+
+    print(f"{'rules':>8} {'path':>9} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for size in args.sizes:
+        rules = make_rules(size, rng)
+
+        start = time.perf_counter()
+        compiled = CompiledRuleSet.from_rules(rules)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        results = {
+            "legacy": time_calls(
+                lambda m, rules=rules: legacy_categorize(service, rules, m), merchants
+            ),
+            "compiled": time_calls(
+                lambda m, compiled=compiled: compiled.match(m, service.fuzzy_threshold),
+                merchants,
+            ),
+        }
+        for path, stats in results.items():
+            print(
+                f"{size:>8} {path:>9} {stats['mean_ms']:>10.3f} "
+                f"{stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f}"
+            )
+        print(f"{size:>8} {'build':>9} {build_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Email parser throughput benchmark.
+
+Parses synthetic Spanish bank notification emails (credit card, debit card
+and transfer wording, in the formats the n8n flow receives) with
+services.email_parser and reports emails per second. No database needed.
+
+Usage:
+    python benchmarks/bench_email_parser.py [--emails 10000] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from services.email_parser import (  # noqa: E402
+    detect_payment_method,
+    extract_card_last_four,
+    parse_email,
+)
+
+MERCHANTS = [
+    "EL BACO SANTIAGO CL", "LIDER EXPRESS", "JUMBO COSTANERA", "COPEC RUTA 68",
+    "MERPAGO*TIENDA", "UBER TRIP", "CRUZ VERDE 123", "STARBUCKS PLAZA",
+    "FALABELLA.COM", "NETFLIX.COM", "SODIMAC HOMECENTER", "PEDIDOSYA*RESTO",
+]
+
+TEMPLATES = [
+    (
+        "Julio Andres Andrade Gomez: Te informamos que se ha realizado una "
+        "compra por ${amount} con Tarjeta de Crédito ****{card} en {merchant} "
+        "el {date} {time}. Revisa Saldos y Movimientos en App Mi Banco"
+    ),
+    (
+        "Te informamos que se ha realizado una compra por ${amount} con cargo "
+        "a Cuenta ****{card} en {merchant} el {date} {time}. Si no reconoces "
+        "este movimiento llámanos"
+    ),
+    (
+        "Se realizó una transferencia por ${amount} desde tu Cuenta ****{card} "
+        "en {merchant} el {date} {time}."
+    ),
+]
+
+
+def make_emails(count: int, rng: random.Random) -> list[str]:
+    emails = []
+    for _ in range(count):
+        amount = f"{rng.randint(500, 500000):,}".replace(",", ".")
+        emails.append(
+            rng.choice(TEMPLATES).format(
+                amount=amount,
+                card=f"{rng.randint(0, 9999):04d}",
+                merchant=rng.choice(MERCHANTS),
+                date=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+                time=f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+            )
+        )
+    return emails
+
+
+def throughput(func, emails, repeat: int) -> dict:
+    rates = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for email in emails:
+            func(email)
+        rates.append(len(emails) / (time.perf_counter() - start))
+    return {"median": statistics.median(rates), "best": max(rates)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--emails", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    emails = make_emails(args.emails, random.Random(args.seed))
+
+    print(f"{'step':>22} {'median emails/s':>16} {'best emails/s':>14}")
+    for name, func in (
+        ("parse_email", parse_email),
+        ("detect_payment_method", detect_payment_method),
+        ("extract_card_last_four", extract_card_last_four),
+    ):
+        stats = throughput(func, emails, args.repeat)
+        print(f"{name:>22} {stats['median']:>16,.0f} {stats['best']:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
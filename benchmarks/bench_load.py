@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+HTTP load benchmark for a running API instance.
+
+Opens N concurrent clients against the given endpoints and reports
+throughput and latency percentiles per concurrency level. To compare the
+sync routers with the async ones, start the server from each commit in
+turn (same database, same worker count) and run this against both:
+
+    uvicorn main:app --app-dir app --workers 1 &
+    python benchmarks/bench_load.py --base-url http://localhost:8000 \\
+        --api-key $API_KEY --concurrency 50 200 1000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/expenses/?limit=50",
+    "/categories/",
+    "/merchant-rules/",
+    "/expenses/analytics/summary",
+]
+
+
+async def run_level(
+    base_url: str, headers: dict, paths: list[str], concurrency: int, requests: int
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=60
+    ) as client:
+
+        async def worker():
+            nonlocal errors
+            for index in remaining:
+                path = paths[index % len(paths)]
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument(
+        "--requests", type=int, default=5000, help="Requests per concurrency level"
+    )
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    args = parser.parse_args()
+
+    headers = {"x-api-key": args.api_key} if args.api_key else {}
+
+    print(
+        f"{'clients':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'errors':>7}"
+    )
+    for concurrency in args.concurrency:
+        result = await run_level(
+            args.base_url, headers, args.paths, concurrency, args.requests
+        )
+        print(
+            f"{concurrency:>8} {result['throughput_rps']:>10.1f} "
+            f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+            f"{result['p99_ms']:>9.1f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+"""
+Load and latency benchmark suite for the expense tracker API.
+
+    seed     generate the dataset and load it into Postgres (drops tables)
+    run      drive every router endpoint and write a JSON report
+    compare  diff two JSON reports, e.g. from two commits
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from . import dataset, report
+from .scenarios import SCENARIOS
+
+
+def seed(args) -> None:
+    # Imported here: the loader imports the application, run/compare do not
+    from .loader import load
+
+    def progress(loaded: int, total: int) -> None:
+        print(f"{loaded:>10,} / {total:,} expenses", file=sys.stderr)
+
+    summary = load(
+        args.database_url,
+        rows=args.rows,
+        category_count=args.categories,
+        rule_count=args.rules,
+        seed=args.seed,
+        months=args.months,
+        payment_mix=args.payment_mix,
+        progress=progress,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+def run(args) -> None:
+    from .runner import run as run_scenarios
+
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.only or any(scenario.name.startswith(name) for name in args.only)
+    ]
+    if not scenarios:
+        sys.exit("no scenario matches --only")
+
+    print(report.HEADER, file=sys.stderr)
+    results = asyncio.run(
+        run_scenarios(
+            args.base_url,
+            {"x-api-key": args.api_key} if args.api_key else {},
+            scenarios,
+            args.concurrency,
+            args.requests,
+            args.seed,
+            args.months,
+            progress=lambda result: print(report.format_row(result), file=sys.stderr),
+        )
+    )
+    report.write_report(
+        report.build_report(
+            results,
+            label=args.label,
+            base_url=args.base_url,
+            seed=args.seed,
+            months=args.months,
+            requests=args.requests,
+            concurrency=args.concurrency,
+        ),
+        args.output,
+    )
+
+
+def compare(args) -> None:
+    with open(args.base) as base_file, open(args.head) as head_file:
+        base, head = json.load(base_file), json.load(head_file)
+
+    rows = report.compare(base, head, args.metric)
+    print(
+        f"{'scenario':<32} {'clients':>7} "
+        + " ".join(f"{name:>16}" for name in report.METRICS)
+    )
+    for row in rows:
+        cells = " ".join(
+            f"{row[name]['head']:>8.1f} {row[name]['change']:>+7.1%}"
+            for name in report.METRICS
+        )
+        print(f"{row['scenario']:<32} {row['concurrency']:>7} {cells}")
+
+    if args.max_regression is not None:
+        worst = [
+            row
+            for row in rows
+            if row[args.metric]["regression"] * 100 > args.max_regression
+        ]
+        if worst:
+            sys.exit(
+                f"{len(worst)} scenario(s) regressed more than "
+                f"{args.max_regression}% on {args.metric}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loadtest", description=__doc__.splitlines()[1]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="load the synthetic dataset")
+    seed_parser.add_argument("--rows", type=int, default=100000)
+    seed_parser.add_argument("--categories", type=int, default=len(dataset.CATALOG))
+    seed_parser.add_argument("--rules", type=int, default=200)
+    seed_parser.add_argument(
+        "--payment-mix",
+        type=dataset.parse_payment_mix,
+        default=dataset.DEFAULT_PAYMENT_MIX,
+        help="e.g. CREDIT_CARD=55,DEBIT_CARD=30,BANK_TRANSFER=10,CASH=5",
+    )
+    seed_parser.add_argument(
+        "--database-url", default=os.getenv("BENCH_DATABASE_URL")
+    )
+    seed_parser.set_defaults(handler=seed)
+
+    run_parser = commands.add_parser("run", help="benchmark a running API")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--api-key", default=os.getenv("API_KEY", ""))
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    run_parser.add_argument(
+        "--requests",
+        type=int,
+        default=500,
+        help="Requests per scenario and concurrency level (scaled by weight)",
+    )
+    run_parser.add_argument(
+        "--only", nargs="+", help="Scenario name prefixes, e.g. expenses.list"
+    )
+    run_parser.add_argument("--label", help="Free text stored in the report")
+    run_parser.add_argument("--output", help="Report path (default: stdout)")
+    run_parser.set_defaults(handler=run)
+
+    for command in (seed_parser, run_parser):
+        command.add_argument("--seed", type=int, default=42)
+        command.add_argument("--months", type=int, default=24)
+
+    compare_parser = commands.add_parser("compare", help="diff two reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument(
+        "--metric", choices=list(report.METRICS), default="p95_ms"
+    )
+    compare_parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Exit with status 1 if any scenario regressed more (percent)",
+    )
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    if args.command == "seed" and (
+        not args.database_url or not args.database_url.startswith("postgresql")
+    ):
+        parser.error("a Postgres --database-url (or BENCH_DATABASE_URL) is required")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Deterministic synthetic data: categories, merchant rules and expenses.
+
+Everything is derived from a seed, so the same arguments produce the same
+rows on every machine and every commit. Expenses are generated lazily, so
+millions of rows never sit in memory at once. No application imports here;
+loader.py writes the rows to Postgres.
+"""
+
+import random
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+
+# Expenses span the months before this instant (fixed, not "now", so a run
+# next year generates the same dates)
+END_DATE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# (category, description, color, CLP amount range, merchants)
+CATALOG = [
+    ("Supermercado", "Compras de supermercado", "#2E7D32", (3000, 180000),
+     ["JUMBO", "LIDER", "SANTA ISABEL", "UNIMARC", "TOTTUS", "ACUENTA"]),
+    ("Restaurantes", "Restaurantes y cafés", "#EF6C00", (2500, 75000),
+     ["STARBUCKS", "JUAN MAESTRO", "DOMINOS PIZZA", "TELEPIZZA", "MCDONALDS",
+      "EL BACO", "LA PICCOLA ITALIA", "FUENTE ALEMANA"]),
+    ("Delivery", "Pedidos a domicilio", "#D84315", (5000, 45000),
+     ["RAPPI", "PEDIDOSYA", "UBER EATS", "JUSTO"]),
+    ("Transporte", "Apps de transporte y transporte público", "#1565C0",
+     (800, 35000),
+     ["UBER", "CABIFY", "DIDI", "METRO DE SANTIAGO", "RED MOVILIDAD", "TURBUS"]),
+    ("Combustible", "Bencina y estaciones de servicio", "#455A64",
+     (10000, 90000), ["COPEC", "SHELL", "ARAMCO"]),
+    ("Farmacia", "Farmacias", "#00897B", (1500, 60000),
+     ["CRUZ VERDE", "SALCOBRAND", "FARMACIAS AHUMADA", "DR SIMI"]),
+    ("Servicios básicos", "Luz, agua y gas", "#6D4C41", (15000, 120000),
+     ["ENEL", "AGUAS ANDINAS", "METROGAS", "CGE", "ESSBIO"]),
+    ("Telefonía e Internet", "Planes móviles, fibra y TV", "#5E35B1",
+     (9990, 45990), ["ENTEL", "MOVISTAR", "WOM", "VTR", "CLARO"]),
+    ("Tiendas", "Grandes tiendas", "#AD1457", (5000, 350000),
+     ["FALABELLA", "RIPLEY", "PARIS", "HITES", "LA POLAR"]),
+    ("Hogar", "Mejoramiento del hogar", "#8D6E63", (3000, 250000),
+     ["SODIMAC", "EASY", "CONSTRUMART", "IKEA"]),
+    ("Suscripciones", "Streaming y servicios digitales", "#C62828",
+     (3500, 15000),
+     ["NETFLIX", "SPOTIFY", "DISNEY PLUS", "MAX", "APPLE.COM/BILL"]),
+    ("Entretención", "Cine, conciertos y eventos", "#F9A825", (4000, 120000),
+     ["CINEPLANET", "CINEMARK", "PUNTOTICKET", "TICKETMASTER"]),
+    ("Viajes", "Pasajes y alojamiento", "#0277BD", (30000, 900000),
+     ["LATAM AIRLINES", "SKY AIRLINE", "JETSMART", "BOOKING.COM"]),
+    ("Salud", "Consultas y exámenes", "#00838F", (10000, 250000),
+     ["CLINICA ALEMANA", "INTEGRAMEDICA", "REDSALUD", "CLINICA SANTA MARIA"]),
+    ("Educación", "Libros y cursos", "#283593", (5000, 150000),
+     ["BUSCALIBRE", "UDEMY", "LIBRERIA ANTARTICA"]),
+    ("Compras online", "Marketplaces", "#FF8F00", (3000, 200000),
+     ["MERCADO LIBRE", "AMAZON", "ALIEXPRESS", "SHEIN"]),
+    ("Conveniencia", "Tiendas de conveniencia", "#7CB342", (1000, 15000),
+     ["OK MARKET", "PRONTO COPEC", "SPACIO 1"]),
+]
+
+# Merchants billed online carry no branch in the bank notification
+ONLINE = {
+    "Delivery", "Servicios básicos", "Telefonía e Internet", "Suscripciones",
+    "Compras online",
+}
+
+LOCATIONS = [
+    "SANTIAGO", "PROVIDENCIA", "LAS CONDES", "NUNOA", "VITACURA", "MAIPU",
+    "LA FLORIDA", "PUENTE ALTO", "VINA DEL MAR", "VALPARAISO", "CONCEPCION",
+    "ANTOFAGASTA", "LA SERENA", "TEMUCO", "PUERTO MONTT",
+]
+
+DEFAULT_PAYMENT_MIX = {
+    "CREDIT_CARD": 0.55,
+    "DEBIT_CARD": 0.30,
+    "BANK_TRANSFER": 0.10,
+    "CASH": 0.05,
+}
+
+CREDIT_CARDS = ["4412", "8830", "1975"]
+DEBIT_CARDS = ["2201", "6758"]
+
+SOURCE_EMAILS = [
+    "enviodigital@bancochile.cl",
+    "notificaciones@santander.cl",
+    "alertas@bancoestado.cl",
+    "avisos@bci.cl",
+]
+
+# Share of expenses left uncategorized, so /recategorize has work to do
+UNCATEGORIZED_SHARE = 0.15
+
+
+def parse_payment_mix(text: str) -> dict[str, float]:
+    """Parse "CREDIT_CARD=55,DEBIT_CARD=30,..." into normalized weights."""
+    weights = {}
+    for part in text.split(","):
+        method, _, weight = part.partition("=")
+        method = method.strip().upper()
+        if method not in DEFAULT_PAYMENT_MIX:
+            raise ValueError(f"Unknown payment method: {method!r}")
+        weights[method] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Payment mix weights must add up to more than 0")
+    return {method: weight / total for method, weight in weights.items()}
+
+
+def categories(count: int) -> list[dict]:
+    """count category rows: the catalog first, then numbered extras."""
+    rows = [
+        {"name": name, "description": description, "color": color}
+        for name, description, color, _, _ in CATALOG[:count]
+    ]
+    rows.extend(
+        {"name": f"Categoría {index}", "description": None, "color": None}
+        for index in range(len(rows) + 1, count + 1)
+    )
+    return rows
+
+
+def merchants(category_count: int) -> list[tuple[str, int, tuple[int, int]]]:
+    """(merchant base name, category id, amount range) of the used catalog."""
+    return [
+        (merchant, category_id, amounts)
+        for category_id, (_, _, _, amounts, names) in enumerate(
+            CATALOG[:category_count], start=1
+        )
+        for merchant in names
+    ]
+
+
+def merchant_rules(count: int, category_count: int, seed: int) -> list[dict]:
+    """
+    count merchant rule rows.
+
+    One fuzzy rule per catalog merchant, then one regex rule per category
+    matching all its merchants, then low-priority filler rules that never
+    match real merchants but still cost a comparison each.
+    """
+    rng = random.Random(f"{seed}:rules")
+    known = merchants(category_count)
+    rows = [
+        {
+            "merchant_pattern": merchant.lower(),
+            "category_id": category_id,
+            "is_regex": False,
+            "priority": 5,
+            "is_active": True,
+        }
+        for merchant, category_id, _ in known
+    ]
+    for category_id in sorted({category_id for _, category_id, _ in known}):
+        names = [merchant for merchant, owner, _ in known if owner == category_id]
+        rows.append(
+            {
+                "merchant_pattern": r"^(%s)\b" % "|".join(
+                    name.replace(".", r"\.") for name in names
+                ),
+                "category_id": category_id,
+                "is_regex": True,
+                "priority": 3,
+                "is_active": True,
+            }
+        )
+    index = 0
+    while len(rows) < count:
+        index += 1
+        rows.append(
+            {
+                "merchant_pattern": f"comercio asociado {index:06d}",
+                "category_id": rng.randint(1, category_count),
+                "is_regex": False,
+                "priority": 1,
+                "is_active": rng.random() > 0.1,
+            }
+        )
+    return rows[:count]
+
+
+def merchant_name(rng: random.Random, category_count: int) -> tuple[str, int, int]:
+    """A merchant as written in bank notifications, its category and amount."""
+    category_index = rng.randrange(min(category_count, len(CATALOG)))
+    name, _, _, (low, high), names = CATALOG[category_index]
+    merchant = rng.choice(names)
+    if name not in ONLINE:
+        merchant = f"{merchant} {rng.choice(LOCATIONS)}"
+        if rng.random() < 0.5:
+            merchant += " CL"
+    # CLP has no cents; prices end in 0 (or 990)
+    amount = rng.randint(low, high)
+    amount = amount - amount % 1000 + 990 if rng.random() < 0.3 else amount - amount % 10
+    return merchant, category_index + 1, max(amount, 10)
+
+
+def payment(rng: random.Random, payment_mix: dict[str, float]) -> tuple[str, str | None]:
+    """A payment method drawn from the mix and its card digits, if any."""
+    method = rng.choices(list(payment_mix), weights=list(payment_mix.values()))[0]
+    if method == "CREDIT_CARD":
+        return method, rng.choice(CREDIT_CARDS)
+    if method == "DEBIT_CARD":
+        return method, rng.choice(DEBIT_CARDS)
+    return method, None
+
+
+def transaction_date(rng: random.Random, months: int) -> datetime:
+    # Chilean local time is UTC-3/-4; purchases cluster in waking hours
+    day = rng.randrange(months * 30)
+    minute = rng.randint(11 * 60, 26 * 60)  # 08:00 to 23:00 local
+    return END_DATE - timedelta(days=day + 1) + timedelta(minutes=minute)
+
+
+def expenses(
+    count: int,
+    category_count: int,
+    seed: int,
+    months: int = 24,
+    payment_mix: dict[str, float] = DEFAULT_PAYMENT_MIX,
+) -> Iterator[dict]:
+    """
+    count expense rows, generated one at a time.
+
+    Rows carry the payment method as its string value and no billing date;
+    the loader computes billing dates with the application's billing rules.
+    """
+    rng = random.Random(f"{seed}:expenses")
+    for _ in range(count):
+        merchant, category_id, amount = merchant_name(rng, category_count)
+        method, card_last_four = payment(rng, payment_mix)
+        categorized = rng.random() >= UNCATEGORIZED_SHARE
+        yield {
+            "amount": float(amount),
+            "merchant": merchant,
+            "description": f"Compra en {merchant}",
+            "transaction_date": transaction_date(rng, months),
+            "category_id": category_id if categorized else None,
+            "payment_method": method,
+            "card_last_four": card_last_four,
+            "source_email": rng.choice(SOURCE_EMAILS),
+            "auto_categorized": categorized,
+            "confidence_score": round(rng.uniform(0.8, 1.0), 2) if categorized else None,
+        }
+
+
+def format_clp(amount: float) -> str:
+    """71000 -> "$71.000", as Chilean banks write amounts."""
+    return "$" + f"{amount:,.0f}".replace(",", ".")
+
+
+def notification_email(rng: random.Random, category_count: int, months: int = 24) -> str:
+    """A bank notification email in the wording parsed by services.email_parser."""
+    merchant, _, amount = merchant_name(rng, category_count)
+    method, card_last_four = payment(rng, DEFAULT_PAYMENT_MIX)
+    when = transaction_date(rng, months).strftime("%d/%m/%Y %H:%M")
+    if method == "CREDIT_CARD":
+        return (
+            f"Te informamos que se ha realizado una compra por {format_clp(amount)} "
+            f"con Tarjeta de Crédito ****{card_last_four} en {merchant} el {when}."
+        )
+    if method == "DEBIT_CARD":
+        return (
+            f"Se realizó un cargo en tu cuenta ****{card_last_four} por "
+            f"{format_clp(amount)} en {merchant} el {when}."
+        )
+    return (
+        f"Se realizó una transferencia por {format_clp(amount)} en {merchant} "
+        f"el {when}."
+    )
+
+
+def statement_csv(rng: random.Random, rows: int, category_count: int, months: int = 24) -> str:
+    """A bank statement export in Spanish CSV headers, as /expenses/import takes."""
+    lines = ["Fecha,Comercio,Monto"]
+    for _ in range(rows):
+        merchant, _, amount = merchant_name(rng, category_count)
+        when = transaction_date(rng, months).strftime("%d/%m/%Y")
+        lines.append(f'{when},"{merchant}","{format_clp(amount)}"')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,133 @@
+"""
+Load a generated dataset into a Postgres database.
+
+Drops and recreates the application tables, inserts categories and rules,
+COPYs expenses in batches (billing dates computed by the application's
+billing service) and rebuilds the monthly rollups, so the database looks
+like one that received the same expenses through the API.
+"""
+
+import csv
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+from database import Base  # noqa: E402
+from models import Category, Expense, MerchantRule, PaymentMethod  # noqa: E402
+from services.billing import billing_service  # noqa: E402
+from services.rollups import rebuild_rollups  # noqa: E402
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from . import dataset  # noqa: E402
+
+COPY_COLUMNS = (
+    "amount",
+    "merchant",
+    "description",
+    "transaction_date",
+    "category_id",
+    "payment_method",
+    "billing_date",
+    "card_last_four",
+    "source_email",
+    "auto_categorized",
+    "confidence_score",
+)
+
+
+def _copy_expenses(session, rows: list[dict]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in (row[column] for column in COPY_COLUMNS)
+            ]
+        )
+    buffer.seek(0)
+
+    cursor = session.connection().connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Expense.__tablename__} ({', '.join(COPY_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def load(
+    database_url: str,
+    rows: int,
+    category_count: int,
+    rule_count: int,
+    seed: int,
+    months: int = 24,
+    payment_mix: dict[str, float] = dataset.DEFAULT_PAYMENT_MIX,
+    batch_size: int = 50000,
+    progress=None,
+) -> dict:
+    """Recreate the tables with the generated dataset; return counts and timings."""
+    engine = create_engine(database_url)
+    if engine.dialect.name != "postgresql" or engine.dialect.driver != "psycopg2":
+        raise ValueError("loading needs a postgresql+psycopg2 URL (uses COPY)")
+    session_factory = sessionmaker(bind=engine)
+
+    started = time.perf_counter()
+    with session_factory() as session:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+
+        session.execute(insert(Category), dataset.categories(category_count))
+        session.execute(
+            insert(MerchantRule),
+            dataset.merchant_rules(rule_count, category_count, seed),
+        )
+        session.commit()
+
+        # Fresh tables: no per-card configs, every card on the default day
+        billing_service.invalidate_card_configs()
+        billing_service.load_card_configs(session)
+
+        loaded = 0
+        batch = []
+        for row in dataset.expenses(rows, category_count, seed, months, payment_mix):
+            row["billing_date"] = billing_service.calculate_billing_date(
+                row["transaction_date"],
+                PaymentMethod(row["payment_method"]),
+                row["card_last_four"],
+            )
+            batch.append(row)
+            if len(batch) == batch_size:
+                _copy_expenses(session, batch)
+                session.commit()
+                loaded += len(batch)
+                batch.clear()
+                if progress:
+                    progress(loaded, rows)
+        if batch:
+            _copy_expenses(session, batch)
+            loaded += len(batch)
+        session.commit()
+        loaded_at = time.perf_counter()
+
+        rebuild_rollups(session)
+        session.execute(text("ANALYZE"))
+        session.commit()
+    engine.dispose()
+
+    return {
+        "expenses": loaded,
+        "categories": category_count,
+        "merchant_rules": rule_count,
+        "seed": seed,
+        "months": months,
+        "load_seconds": round(loaded_at - started, 2),
+        "total_seconds": round(time.perf_counter() - started, 2),
+    }
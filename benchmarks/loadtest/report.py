@@ -0,0 +1,106 @@
+"""
+JSON reports and the comparison of two of them.
+
+A report is one JSON document: run metadata (commit, seed, concurrency,
+dataset size) and one result per scenario and concurrency level. Reports
+from two commits, run with the same arguments against the same dataset,
+can be compared scenario by scenario.
+"""
+
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Metrics compared, and whether a higher value is better
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results: list[dict], **meta) -> dict:
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            **meta,
+        },
+        "results": results,
+    }
+
+
+def write_report(report: dict, path: str | None) -> None:
+    """Write the report to a file, or stdout when no path is given."""
+    text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    if path:
+        Path(path).write_text(text)
+    else:
+        print(text, end="")
+
+
+def format_row(result: dict) -> str:
+    return (
+        f"{result['scenario']:<32} {result['concurrency']:>7} "
+        f"{result['throughput_rps']:>9.1f} {result['p50_ms']:>9.1f} "
+        f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['errors']:>7}"
+    )
+
+
+HEADER = (
+    f"{'scenario':<32} {'clients':>7} {'req/s':>9} {'p50 ms':>9} "
+    f"{'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+)
+
+
+def compare(base: dict, head: dict, metric: str = "p95_ms") -> list[dict]:
+    """
+    Per scenario and concurrency level, the change of every metric.
+
+    change is (head - base) / base; regression is that change signed so
+    that positive always means worse (slower, or fewer requests per second).
+    Rows present in only one report are left out.
+    """
+    base_results = {
+        (result["scenario"], result["concurrency"]): result
+        for result in base["results"]
+    }
+    rows = []
+    for result in head["results"]:
+        key = (result["scenario"], result["concurrency"])
+        before = base_results.get(key)
+        if before is None:
+            continue
+        row = {"scenario": key[0], "concurrency": key[1]}
+        for name, higher_is_better in METRICS.items():
+            change = (
+                (result[name] - before[name]) / before[name] if before[name] else 0.0
+            )
+            row[name] = {
+                "base": before[name],
+                "head": result[name],
+                "change": round(change, 4),
+                "regression": round(-change if higher_is_better else change, 4),
+            }
+        rows.append(row)
+    rows.sort(key=lambda row: row[metric]["regression"], reverse=True)
+    return rows
@@ -0,0 +1,133 @@
+"""
+Drive the scenarios against a running API and collect latencies.
+
+Each scenario runs once per concurrency level: that many clients share the
+scenario's requests and send them back to back over keep-alive
+connections. Request i of a scenario at a level is always built from the
+same Random, so two runs with the same seed send the same requests.
+"""
+
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+from .scenarios import Context, Scenario
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def discover(client: httpx.AsyncClient, months: int) -> Context:
+    """Read the ids the scenarios need from the API itself."""
+    categories = (await client.get("/categories/")).raise_for_status().json()
+    rules = (await client.get("/merchant-rules/")).raise_for_status().json()
+    expenses = (
+        await client.get("/expenses/", params={"limit": 1000, "fields": "id"})
+    ).raise_for_status().json()
+    if not categories or not expenses:
+        raise RuntimeError("the database has no categories or expenses; seed it first")
+    return Context(
+        category_ids=[category["id"] for category in categories],
+        rule_ids=[rule["id"] for rule in rules] or [0],
+        expense_ids=[expense["id"] for expense in expenses],
+        months=months,
+    )
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    context: Context,
+    concurrency: int,
+    requests: int,
+    seed: int,
+) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    errors = skipped = response_bytes = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors, skipped, response_bytes
+        for index in remaining:
+            rng = random.Random(f"{seed}:{scenario.name}:{concurrency}:{index}")
+            request = scenario.build(rng, context)
+            if request is None:
+                skipped += 1
+                continue
+            start = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, **request)
+                status = str(response.status_code)
+                failed = response.status_code >= 400
+                response_bytes += len(response.content)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            errors += failed
+            if not failed and scenario.record:
+                scenario.record(context, request, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario.name,
+        "method": scenario.method,
+        "route": scenario.route,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "skipped": skipped,
+        "errors": errors,
+        "status_counts": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "response_bytes": response_bytes,
+    }
+
+
+async def run(
+    base_url: str,
+    headers: dict,
+    scenarios: list[Scenario],
+    concurrency_levels: list[int],
+    requests: int,
+    seed: int,
+    months: int,
+    progress=None,
+) -> list[dict]:
+    """Run every scenario at every concurrency level; one result per pair."""
+    limits = httpx.Limits(
+        max_connections=max(concurrency_levels),
+        max_keepalive_connections=max(concurrency_levels),
+    )
+    results = []
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=300
+    ) as client:
+        context = await discover(client, months)
+        for concurrency in concurrency_levels:
+            for scenario in scenarios:
+                count = max(1, round(requests * scenario.weight))
+                result = await run_scenario(
+                    client, scenario, context, concurrency, count, seed
+                )
+                results.append(result)
+                if progress:
+                    progress(result)
+    return results
@@ -0,0 +1,473 @@
+"""
+One scenario per endpoint in app/routers.
+
+A scenario builds the keyword arguments of one httpx request from a
+per-request Random, so the same seed sends the same requests. Scenarios
+run in list order: writes that create rows come before the updates and
+deletes that consume them, and deletes only ever remove rows created by
+the benchmark itself, never the loaded dataset.
+"""
+
+import random
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from . import dataset
+
+
+@dataclass
+class Context:
+    """What the scenarios know about the database under test."""
+
+    category_ids: list[int]
+    rule_ids: list[int]
+    expense_ids: list[int]  # A sample of loaded expenses, for reads
+    months: int = 24
+    # Rows created during the run, consumed by the delete scenarios
+    created_expenses: deque = field(default_factory=deque)
+    created_categories: deque = field(default_factory=deque)
+    created_rules: deque = field(default_factory=deque)
+    configured_cards: deque = field(default_factory=deque)
+
+    @property
+    def category_count(self) -> int:
+        return len(self.category_ids)
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    route: str  # Route template, as reported
+    # Returns the request kwargs (url, params, json, files), or None when
+    # there is nothing left to act on (the request is skipped)
+    build: Callable[[random.Random, Context], dict | None]
+    weight: float = 1.0  # Share of --requests sent to this scenario
+    # Records what the response created (ids for later scenarios)
+    record: Callable[[Context, dict, object], None] | None = None
+
+
+def _expense_body(rng: random.Random, context: Context) -> dict:
+    merchant, _, amount = dataset.merchant_name(rng, context.category_count)
+    method, card_last_four = dataset.payment(rng, dataset.DEFAULT_PAYMENT_MIX)
+    return {
+        "amount": amount,
+        "merchant": merchant,
+        "description": f"Compra en {merchant}",
+        "transaction_date": dataset.transaction_date(rng, context.months).isoformat(),
+        "payment_method": method,
+        "card_last_four": card_last_four,
+        "source_email": rng.choice(dataset.SOURCE_EMAILS),
+    }
+
+
+def _month_range(rng: random.Random, context: Context) -> dict:
+    """A whole month within the dataset (answered from the rollups)."""
+    end = dataset.END_DATE
+    index = end.year * 12 + end.month - 1 - rng.randint(1, context.months)
+    start = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+    index += 1
+    after = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+    return {
+        "start_date": start.isoformat(),
+        "end_date": (after - timedelta(microseconds=1)).isoformat(),
+    }
+
+
+def _day_range(rng: random.Random, context: Context) -> dict:
+    """A two-week window that does not line up with months (scans expenses)."""
+    start = dataset.transaction_date(rng, context.months).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    end = start + timedelta(days=14)
+    return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+
+def _record_id(pool: str):
+    def record(context: Context, request: dict, response) -> None:
+        getattr(context, pool).append(response.json()["id"])
+
+    return record
+
+
+def _record_card(context: Context, request: dict, response) -> None:
+    card = request["url"].rsplit("/", 1)[-1]
+    if card not in context.configured_cards:
+        context.configured_cards.append(card)
+
+
+def _pop(pool: str, build):
+    # Deletes consume rows created earlier in the run
+    def build_delete(rng: random.Random, context: Context) -> dict | None:
+        rows = getattr(context, pool)
+        return build(rows.popleft()) if rows else None
+
+    return build_delete
+
+
+SCENARIOS = [
+    # Categories
+    Scenario(
+        "categories.create",
+        "POST",
+        "/categories/",
+        lambda rng, context: {
+            "url": "/categories/",
+            "json": {
+                "name": f"Bench {rng.getrandbits(48):012x}",
+                "description": "Creada por el benchmark",
+                "color": "#%06X" % rng.getrandbits(24),
+            },
+        },
+        weight=0.2,
+        record=_record_id("created_categories"),
+    ),
+    Scenario(
+        "categories.list",
+        "GET",
+        "/categories/",
+        lambda rng, context: {"url": "/categories/"},
+    ),
+    Scenario(
+        "categories.get",
+        "GET",
+        "/categories/{category_id}",
+        lambda rng, context: {
+            "url": f"/categories/{rng.choice(context.category_ids)}"
+        },
+    ),
+    Scenario(
+        "categories.update",
+        "PUT",
+        "/categories/{category_id}",
+        lambda rng, context: {
+            "url": f"/categories/{rng.choice(context.category_ids)}",
+            "json": {"description": f"Actualizada {rng.randrange(10**6)}"},
+        },
+        weight=0.2,
+    ),
+    # Merchant rules
+    Scenario(
+        "merchant_rules.create",
+        "POST",
+        "/merchant-rules/",
+        lambda rng, context: {
+            "url": "/merchant-rules/",
+            "json": {
+                "merchant_pattern": f"comercio bench {rng.getrandbits(32):08x}",
+                "category_id": rng.choice(context.category_ids),
+                "priority": 1,
+            },
+        },
+        weight=0.2,
+        record=_record_id("created_rules"),
+    ),
+    Scenario(
+        "merchant_rules.list",
+        "GET",
+        "/merchant-rules/",
+        lambda rng, context: {
+            "url": "/merchant-rules/",
+            "params": {"active_only": rng.random() < 0.5},
+        },
+    ),
+    Scenario(
+        "merchant_rules.get",
+        "GET",
+        "/merchant-rules/{rule_id}",
+        lambda rng, context: {"url": f"/merchant-rules/{rng.choice(context.rule_ids)}"},
+    ),
+    Scenario(
+        "merchant_rules.update",
+        "PUT",
+        "/merchant-rules/{rule_id}",
+        lambda rng, context: {
+            "url": f"/merchant-rules/{rng.choice(context.rule_ids)}",
+            "json": {"priority": rng.randint(1, 5)},
+        },
+        weight=0.2,
+    ),
+    Scenario(
+        "merchant_rules.test_rule",
+        "POST",
+        "/merchant-rules/test-rule",
+        lambda rng, context: {
+            "url": "/merchant-rules/test-rule",
+            "params": {
+                "merchant": dataset.merchant_name(rng, context.category_count)[0],
+                "pattern": rng.choice(dataset.CATALOG)[4][0].lower(),
+            },
+        },
+    ),
+    # Billing configs (a changed cycle recomputes every expense of the card)
+    Scenario(
+        "billing_configs.set",
+        "PUT",
+        "/billing-configs/{card_last_four}",
+        lambda rng, context: {
+            "url": f"/billing-configs/{rng.choice(dataset.CREDIT_CARDS)}",
+            "json": {
+                "credit_card_billing_day": rng.choice([5, 15, 25]),
+                "timezone": "America/Santiago",
+            },
+        },
+        weight=0.02,
+        record=_record_card,
+    ),
+    Scenario(
+        "billing_configs.list",
+        "GET",
+        "/billing-configs/",
+        lambda rng, context: {"url": "/billing-configs/"},
+    ),
+    Scenario(
+        "billing_configs.get",
+        "GET",
+        "/billing-configs/{card_last_four}",
+        lambda rng, context: (
+            {"url": f"/billing-configs/{rng.choice(context.configured_cards)}"}
+            if context.configured_cards
+            else None
+        ),
+    ),
+    # Expenses: writes
+    Scenario(
+        "expenses.create",
+        "POST",
+        "/expenses/",
+        lambda rng, context: {"url": "/expenses/", "json": _expense_body(rng, context)},
+        record=_record_id("created_expenses"),
+    ),
+    Scenario(
+        "expenses.webhook",
+        "POST",
+        "/expenses/webhook",
+        lambda rng, context: {
+            "url": "/expenses/webhook",
+            "json": {**_expense_body(rng, context), "payment_method": None},
+        },
+        record=_record_id("created_expenses"),
+    ),
+    Scenario(
+        "expenses.webhook_batch",
+        "POST",
+        "/expenses/webhook/batch",
+        lambda rng, context: {
+            "url": "/expenses/webhook/batch",
+            "json": [_expense_body(rng, context) for _ in range(50)],
+        },
+        weight=0.2,
+    ),
+    Scenario(
+        "expenses.webhook_raw",
+        "POST",
+        "/expenses/webhook/raw",
+        lambda rng, context: {
+            "url": "/expenses/webhook/raw",
+            "json": {
+                "raw_data": dataset.notification_email(
+                    rng, context.category_count, context.months
+                ),
+                "source_email": rng.choice(dataset.SOURCE_EMAILS),
+            },
+        },
+        record=_record_id("created_expenses"),
+    ),
+    Scenario(
+        "expenses.webhook_raw_batch",
+        "POST",
+        "/expenses/webhook/raw/batch",
+        lambda rng, context: {
+            "url": "/expenses/webhook/raw/batch",
+            "json": [
+                {
+                    "raw_data": dataset.notification_email(
+                        rng, context.category_count, context.months
+                    )
+                }
+                for _ in range(50)
+            ],
+        },
+        weight=0.2,
+    ),
+    Scenario(
+        "expenses.import",
+        "POST",
+        "/expenses/import",
+        lambda rng, context: {
+            "url": "/expenses/import",
+            "params": {"payment_method": "DEBIT_CARD"},
+            "files": {
+                "file": (
+                    "cartola.csv",
+                    dataset.statement_csv(
+                        rng, 200, context.category_count, context.months
+                    ).encode(),
+                    "text/csv",
+                )
+            },
+        },
+        weight=0.05,
+    ),
+    Scenario(
+        "expenses.update",
+        "PUT",
+        "/expenses/{expense_id}",
+        lambda rng, context: (
+            {
+                "url": f"/expenses/{rng.choice(context.created_expenses)}",
+                "json": {"amount": float(rng.randint(1000, 90000))},
+            }
+            if context.created_expenses
+            else None
+        ),
+        weight=0.5,
+    ),
+    # Expenses: reads
+    Scenario(
+        "expenses.get",
+        "GET",
+        "/expenses/{expense_id}",
+        lambda rng, context: {"url": f"/expenses/{rng.choice(context.expense_ids)}"},
+    ),
+    Scenario(
+        "expenses.list",
+        "GET",
+        "/expenses/",
+        lambda rng, context: {
+            "url": "/expenses/",
+            "params": {"limit": 50, "skip": rng.choice([0, 0, 50, 500])},
+        },
+    ),
+    Scenario(
+        "expenses.list_filtered",
+        "GET",
+        "/expenses/",
+        lambda rng, context: {
+            "url": "/expenses/",
+            "params": {
+                "limit": 50,
+                "category_id": rng.choice(context.category_ids),
+                "payment_method": rng.choice(list(dataset.DEFAULT_PAYMENT_MIX)),
+                **_month_range(rng, context),
+            },
+        },
+    ),
+    Scenario(
+        "expenses.list_merchant",
+        "GET",
+        "/expenses/",
+        lambda rng, context: {
+            "url": "/expenses/",
+            "params": {
+                "limit": 50,
+                "merchant": rng.choice(rng.choice(dataset.CATALOG)[4]).lower(),
+                "merchant_search": rng.choice(["contains", "similar"]),
+            },
+        },
+    ),
+    Scenario(
+        "expenses.list_cursor_fields",
+        "GET",
+        "/expenses/",
+        lambda rng, context: {
+            "url": "/expenses/",
+            "params": {
+                "limit": 100,
+                "use_cursor": True,
+                "fields": "id,amount,merchant,transaction_date,category_name",
+            },
+        },
+    ),
+    Scenario(
+        "expenses.compact",
+        "GET",
+        "/expenses/compact",
+        lambda rng, context: {
+            "url": "/expenses/compact",
+            "params": {"limit": 50, **_day_range(rng, context)},
+        },
+    ),
+    Scenario(
+        "expenses.export",
+        "GET",
+        "/expenses/export",
+        lambda rng, context: {
+            "url": "/expenses/export",
+            "params": {
+                "format": rng.choice(["ndjson", "csv"]),
+                **_month_range(rng, context),
+            },
+        },
+        weight=0.1,
+    ),
+    Scenario(
+        "expenses.analytics_summary",
+        "GET",
+        "/expenses/analytics/summary",
+        lambda rng, context: {
+            "url": "/expenses/analytics/summary",
+            "params": {
+                "use_billing_date": rng.random() < 0.5,
+                **(
+                    _month_range(rng, context)
+                    if rng.random() < 0.5
+                    else _day_range(rng, context)
+                ),
+            },
+        },
+    ),
+    Scenario(
+        "expenses.billing_summary",
+        "GET",
+        "/expenses/analytics/billing-summary",
+        lambda rng, context: {
+            "url": "/expenses/analytics/billing-summary",
+            "params": _month_range(rng, context),
+        },
+    ),
+    Scenario(
+        "expenses.recategorize",
+        "POST",
+        "/expenses/recategorize",
+        lambda rng, context: {"url": "/expenses/recategorize"},
+        weight=0.02,
+    ),
+    # Deletes, last: they only remove rows created above
+    Scenario(
+        "expenses.delete",
+        "DELETE",
+        "/expenses/{expense_id}",
+        _pop("created_expenses", lambda expense_id: {"url": f"/expenses/{expense_id}"}),
+        weight=0.5,
+    ),
+    Scenario(
+        "merchant_rules.delete",
+        "DELETE",
+        "/merchant-rules/{rule_id}",
+        _pop("created_rules", lambda rule_id: {"url": f"/merchant-rules/{rule_id}"}),
+        weight=0.2,
+    ),
+    Scenario(
+        "categories.delete",
+        "DELETE",
+        "/categories/{category_id}",
+        _pop(
+            "created_categories",
+            lambda category_id: {"url": f"/categories/{category_id}"},
+        ),
+        weight=0.2,
+    ),
+    Scenario(
+        "billing_configs.delete",
+        "DELETE",
+        "/billing-configs/{card_last_four}",
+        _pop(
+            "configured_cards",
+            lambda card: {"url": f"/billing-configs/{card}"},
+        ),
+        weight=0.02,
+    ),
+]